@@ -0,0 +1,246 @@
+"""
+Local Google Form Replica
+Serves a copy of the assignment form's structure from 127.0.0.1 so benchmarks
+never touch the live form: role="listitem" question blocks with headings, text
+inputs, a textarea, a date input, a "Submit" span, the FB_PUBLIC_LOAD_DATA_ JSON
+the schema cache reads, and a formResponse confirmation page.
+
+With sections > 1 the questions are split over several pages the way Google
+serves multi-section forms: each page posts back with continue=1 and the
+earlier answers as hidden inputs, pageHistory grows by one per page, and a
+response is only accepted once pageHistory covers every section.
+"""
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# (entry id, heading, FB_PUBLIC_LOAD_DATA_ type code, input element)
+QUESTIONS = [
+    (1001, 'Full Name', 0, 'text'),
+    (1002, 'Contact Number', 0, 'text'),
+    (1003, 'Email ID', 0, 'text'),
+    (1004, 'Full Address', 1, 'textarea'),
+    (1005, 'Pin Code', 0, 'text'),
+    (1006, 'Date of Birth', 9, 'date'),
+    (1007, 'Gender', 0, 'text'),
+    (1008, 'Type this code: GNFPYC', 0, 'text'),
+]
+
+FORM_PATH = '/forms/d/e/benchmark/viewform'
+RESPONSE_PATH = '/forms/d/e/benchmark/formResponse'
+
+
+def split_sections(sections=1):
+    """QUESTIONS split into `sections` consecutive pages"""
+    sections = max(1, min(sections, len(QUESTIONS)))
+    size = -(-len(QUESTIONS) // sections)
+    return [QUESTIONS[i:i + size] for i in range(0, len(QUESTIONS), size)]
+
+
+def load_data(sections=1):
+    """FB_PUBLIC_LOAD_DATA_ in the shape src.form_schema.parse_schema reads"""
+    items = []
+    for number, questions in enumerate(split_sections(sections)):
+        if number:
+            # Page break item (type 8) opening the next section
+            items.append([9000 + number, f'Section {number + 1}', None, 8, None])
+        for entry_id, heading, type_code, _ in questions:
+            answer = [entry_id, None, 1]
+            if type_code == 9:
+                # Date question flags: [include_time, include_year]
+                answer += [None, None, None, None, [0, 1]]
+            items.append([len(items), heading, None, type_code, [answer]])
+    return [None, [None, items, None, None, None, None, None, None, 'Benchmark Form']]
+
+
+def _question_html(entry_id, heading, element):
+    name = f'entry.{entry_id}'
+    if element == 'textarea':
+        field = f'<textarea name="{name}" required></textarea>'
+    else:
+        field = f'<input type="{element}" name="{name}" required>'
+    return (f'<div role="listitem"><div role="heading">{html.escape(heading)}'
+            f' <span aria-label="Required question">*</span></div>{field}</div>')
+
+
+PAGE_HTML = """<!DOCTYPE html>
+<html><head><title>Benchmark Form</title></head>
+<body>
+<form id="mG61Hd" method="POST" action="formResponse">
+<input type="hidden" name="fbzx" value="-4242">
+{hidden}<div role="list">{questions}</div>
+<div role="button" id="{button_id}"><span>{button}</span></div>
+</form>
+<script>document.getElementById('{button_id}').onclick = function () {{
+    var form = document.getElementById('mG61Hd');
+    {before_submit}form.submit();
+}};</script>
+<script>var FB_PUBLIC_LOAD_DATA_ = {data};</script>
+</body></html>
+"""
+
+
+def form_html(sections=1, page=0, answers=None):
+    """
+    One page of the form. Multi-section pages carry pageHistory and the answers
+    given on earlier pages as hidden inputs, like Google's own form does.
+    """
+    pages = split_sections(sections)
+    last = page == len(pages) - 1
+    hidden = ''
+    if len(pages) > 1:
+        history = ','.join(str(i) for i in range(page + 1))
+        hidden = f'<input type="hidden" name="pageHistory" value="{history}">\n'
+        for name, values in (answers or {}).items():
+            if name.startswith('entry.'):
+                hidden += (f'<input type="hidden" name="{html.escape(name)}" '
+                           f'value="{html.escape(values[0])}">\n')
+    continue_js = ("var c = document.createElement('input'); c.type = 'hidden'; "
+                   "c.name = 'continue'; c.value = '1'; form.appendChild(c); ")
+    return PAGE_HTML.format(
+        hidden=hidden,
+        questions=''.join(_question_html(e, h, el) for e, h, _, el in pages[page]),
+        button_id='submit' if last else 'next',
+        button='Submit' if last else 'Next',
+        before_submit='' if last else continue_js,
+        data=json.dumps(load_data(sections)),
+    )
+
+
+FORM_HTML = form_html()
+
+CONFIRMATION_HTML = """<!DOCTYPE html>
+<html><head><title>Benchmark Form</title></head>
+<body><div role="main"><div>Benchmark Form</div>
+<div>Your response has been recorded.</div></div></body></html>
+"""
+
+
+class FormReplica:
+    """
+    Threaded HTTP server for the replica form.
+    latency: seconds added to every request to mimic a real round trip.
+    sections: number of pages the questions are split over.
+    """
+
+    def __init__(self, latency=0.0, sections=1):
+        self.latency = latency
+        self.pages = split_sections(sections)
+        self.sections = len(self.pages)
+        self.form_html = form_html(self.sections)
+        self.submissions = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}{FORM_PATH}'
+
+    @staticmethod
+    def _answered(fields, questions):
+        def answered(entry_id):
+            key = f'entry.{entry_id}'
+            # Browsers post a date input as one value, HTTP mode as _year/_month/_day parts
+            return bool(fields.get(key, [''])[0] or fields.get(f'{key}_day', [''])[0])
+        return all(answered(entry_id) for entry_id, *_ in questions)
+
+    def _history(self, fields):
+        """Sections the response says it went through"""
+        history = fields.get('pageHistory', ['0'])[0]
+        return {int(n) for n in history.split(',') if n.strip().isdigit()}
+
+    def _continue(self, fields):
+        """Page to render after a Next click: the next one, or this one again if unanswered"""
+        page = max(self._history(fields) or {0})
+        if self._answered(fields, self.pages[page]):
+            page = min(page + 1, self.sections - 1)
+        return form_html(self.sections, page, fields)
+
+    def _accept(self, fields):
+        """Record a response if every question was answered; returns False otherwise"""
+        ok = (self._answered(fields, QUESTIONS) and
+              self._history(fields) >= set(range(self.sections)))
+        with self._lock:
+            if ok:
+                self.submissions.append(fields)
+            else:
+                self.rejected += 1
+        return ok
+
+    def start(self):
+        replica = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out as separate writes; without this, keep-alive
+            # requests stall ~40 ms on Nagle + delayed ACK and swamp the measurement
+            disable_nagle_algorithm = True
+
+            def _send(self, body, status=200):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if replica.latency:
+                    time.sleep(replica.latency)
+                path = urlparse(self.path).path
+                if path == FORM_PATH:
+                    self._send(replica.form_html)
+                elif path == RESPONSE_PATH:
+                    self._send(CONFIRMATION_HTML)
+                else:
+                    self._send('Not found', 404)
+
+            def do_POST(self):
+                if replica.latency:
+                    time.sleep(replica.latency)
+                length = int(self.headers.get('Content-Length', 0))
+                fields = parse_qs(self.rfile.read(length).decode('utf-8'))
+                if urlparse(self.path).path != RESPONSE_PATH:
+                    self._send('Not found', 404)
+                elif 'continue' in fields:
+                    self._send(replica._continue(fields))
+                elif replica._accept(fields):
+                    self._send(CONFIRMATION_HTML)
+                else:
+                    # Google re-renders the form when validation fails
+                    self._send(replica.form_html)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='form-replica',
+                         daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    with FormReplica() as replica:
+        print(f"Serving replica form at {replica.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
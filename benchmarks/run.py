@@ -0,0 +1,297 @@
+"""
+Offline Benchmark Suite
+Runs each submit strategy against the local form replica (and EmailSender against
+a local SMTP sink) and reports throughput, per-row / per-field latency and memory
+per worker. Results can be saved as a named baseline and later runs compared to it.
+
+    python -m benchmarks.run                                 # http + email
+    python -m benchmarks.run --strategies browser-keys,browser-bulk,http --rows 20
+    python -m benchmarks.run --save laptop                   # write baselines/laptop.json
+    python -m benchmarks.run --compare laptop                # exit 1 on a regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Runnable as `python benchmarks/run.py` as well as `python -m benchmarks.run`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.replica import FormReplica
+from benchmarks.smtp_sink import SMTPSink
+from config.config import Config
+from src.browser_health import process_tree_rss_mb
+from src.profiling import disable_profiling, enable_profiling
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+STRATEGIES = ('browser-keys', 'browser-bulk', 'http', 'email')
+
+# metric -> True if higher is better
+COMPARED_METRICS = {
+    'per_second': True,
+    'row_p50_ms': False,
+    'row_p95_ms': False,
+    'field_p50_ms': False,
+    'mem_per_worker_mb': False,
+}
+
+
+def sample_row(i):
+    return {
+        'Full Name': f'Bench User {i}',
+        'Contact Number': f'98{i:08d}'[:10],
+        'Email ID': f'bench{i}@example.com',
+        'Full Address': f'{i} Benchmark Street, Test City',
+        'Pin Code': '560001',
+        'Date of Birth': '15/08/1995',
+        'Gender': 'Other',
+        'Verification Code': 'GNFPYC',
+    }
+
+
+class PeakMemory:
+    """Samples the process tree's RSS in the background and keeps the peak"""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.baseline = process_tree_rss_mb()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, process_tree_rss_mb() or 0)
+
+    def __enter__(self):
+        if self.baseline is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.baseline is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, process_tree_rss_mb() or 0)
+
+    def per_worker(self, workers):
+        if self.baseline is None:
+            return None
+        return round((self.peak - self.baseline) / workers, 1)
+
+
+def _quiet(verbose):
+    """Swallow the per-row console output unless --verbose"""
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+def bench_submit(strategy, rows, workers, latency, headless, verbose, sections=1):
+    from src.batch_runner import BatchRunner
+    from src.form_schema import SchemaCache
+
+    mode, fill = ('http', 'keys') if strategy == 'http' else ('browser', strategy.split('-')[1])
+    with FormReplica(latency=latency, sections=sections) as replica, tempfile.TemporaryDirectory() as tmp:
+        runner = BatchRunner(replica.url, workers=workers, mode=mode, fill_strategy=fill,
+                             headless=headless, screenshot_dir=os.path.join(tmp, 'shots'),
+                             schema_cache=SchemaCache(os.path.join(tmp, 'schema')))
+        profiler = enable_profiling()
+        try:
+            with PeakMemory() as memory, _quiet(verbose):
+                summary = runner.run((i, sample_row(i)) for i in range(1, rows + 1))
+        finally:
+            disable_profiling()
+        steps = profiler.summary()
+        accepted = len(replica.submissions)
+
+    field_step = {'browser-keys': 'fill_field', 'browser-bulk': 'bulk_fill'}.get(strategy)
+    field = steps.get(field_step, {})
+    row = steps.get('row', {})
+    fields_per_call = len(sample_row(0)) if strategy == 'browser-bulk' else 1
+    return {
+        'rows': rows,
+        'workers': workers,
+        'succeeded': summary['succeeded'],
+        'accepted_by_server': accepted,
+        'elapsed_s': round(summary['elapsed'], 3),
+        'per_second': round(summary['succeeded'] / summary['elapsed'], 2) if summary['elapsed'] else 0,
+        'row_p50_ms': row.get('p50_ms'),
+        'row_p95_ms': row.get('p95_ms'),
+        'field_p50_ms': round(field['p50_ms'] / fields_per_call, 1) if field else None,
+        'field_p95_ms': round(field['p95_ms'] / fields_per_call, 1) if field else None,
+        'mem_per_worker_mb': memory.per_worker(workers),
+        'steps': steps,
+    }
+
+
+def _bench_screenshot(path):
+    """A confirmation-sized PNG so the email carries a realistic attachment"""
+    from PIL import Image, ImageDraw
+    image = Image.new('RGB', (1280, 900), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1280, 120), fill=(103, 58, 183))
+    for y in range(160, 880, 22):
+        draw.text((60, y), 'Your response has been recorded. ' * 6, fill=(60, 60, 60))
+    image.save(path)
+    return path
+
+
+def bench_email(rows, workers, verbose):
+    from src.email_sender import EmailSender
+    from src.smtp_pool import SMTPPool
+
+    overrides = {'MAIL_USERNAME': Config.MAIL_USERNAME or 'bench@example.com',
+                 'TO_EMAIL': 'to@example.com', 'CC_EMAIL': 'cc@example.com'}
+    saved = {name: getattr(Config, name) for name in overrides}
+    with SMTPSink() as sink, tempfile.TemporaryDirectory() as tmp:
+        screenshot = _bench_screenshot(os.path.join(tmp, 'confirmation.png'))
+        for name, value in overrides.items():
+            setattr(Config, name, value)
+        pool = SMTPPool('127.0.0.1', sink.port, use_tls=False, size=workers)
+        profiler = enable_profiling()
+        try:
+            with PeakMemory() as memory, _quiet(verbose):
+                start = time.perf_counter()
+                sender = EmailSender()
+                with ThreadPoolExecutor(workers) as executor:
+                    sent = sum(executor.map(
+                        lambda i: sender.send_assignment_email(
+                            screenshot, 'https://example.com/repo', f'Bench User {i}', pool=pool),
+                        range(rows)))
+                elapsed = time.perf_counter() - start
+        finally:
+            disable_profiling()
+            pool.close()
+            for name, value in saved.items():
+                setattr(Config, name, value)
+        steps = profiler.summary()
+        received, connections = sink.messages, sink.connections
+
+    send = steps.get('mail.send', {})
+    return {
+        'rows': rows,
+        'workers': workers,
+        'succeeded': sent,
+        'accepted_by_server': received,
+        'smtp_connections': connections,
+        'elapsed_s': round(elapsed, 3),
+        'per_second': round(sent / elapsed, 2) if elapsed else 0,
+        'row_p50_ms': send.get('p50_ms'),
+        'row_p95_ms': send.get('p95_ms'),
+        'field_p50_ms': None,
+        'field_p95_ms': None,
+        'mem_per_worker_mb': memory.per_worker(workers),
+        'steps': steps,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against a saved baseline"""
+    regressions = []
+    for strategy, current in results.items():
+        previous = baseline.get('results', {}).get(strategy)
+        if not previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or \
+                    (not higher_is_better and change > tolerance):
+                regressions.append(f"{strategy} {metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def print_results(results):
+    print("\n" + "=" * 80)
+    print("  BENCHMARK RESULTS (local replica)")
+    print("=" * 80)
+    print(f"  {'strategy':<14}{'ok/rows':>9}{'per s':>9}{'row p50':>10}{'row p95':>10}"
+          f"{'field p50':>11}{'MB/worker':>11}")
+    for strategy, r in results.items():
+        print(f"  {strategy:<14}{r['succeeded']:>4}/{r['rows']:<4}{r['per_second']:>9}"
+              f"{str(r['row_p50_ms']):>10}{str(r['row_p95_ms']):>10}"
+              f"{str(r['field_p50_ms']):>11}{str(r['mem_per_worker_mb']):>11}")
+    print("-" * 80)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks")
+    parser.add_argument('--strategies', default='http,email',
+                        help=f"Comma-separated subset of: {', '.join(STRATEGIES)}")
+    parser.add_argument('--rows', type=int, default=50, help="Submissions per strategy")
+    parser.add_argument('--workers', type=int, default=2, help="Parallel workers per strategy")
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help="Delay the replica adds to every request, to mimic a network")
+    parser.add_argument('--sections', type=int, default=1,
+                        help="Pages the replica form is split over (multi-section forms)")
+    parser.add_argument('--headed', action='store_true', help="Show the browser windows")
+    parser.add_argument('--save', metavar='NAME', help="Save results as baselines/NAME.json")
+    parser.add_argument('--compare', metavar='NAME', help="Compare against baselines/NAME.json")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Relative change counted as a regression (default 0.15)")
+    parser.add_argument('--json', metavar='FILE', help="Also write the full results to FILE")
+    parser.add_argument('--verbose', action='store_true', help="Show per-row output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    strategies = [s.strip() for s in args.strategies.split(',') if s.strip()]
+    unknown = set(strategies) - set(STRATEGIES)
+    if unknown:
+        raise SystemExit(f"Unknown strategies: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for strategy in strategies:
+        print(f"⏱ Benchmarking {strategy} ({args.rows} rows, {args.workers} workers)...")
+        if strategy == 'email':
+            results[strategy] = bench_email(args.rows, args.workers, args.verbose)
+        else:
+            results[strategy] = bench_submit(strategy, args.rows, args.workers,
+                                             args.latency_ms / 1000, not args.headed,
+                                             args.verbose, args.sections)
+    print_results(results)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'settings': {'rows': args.rows, 'workers': args.workers, 'latency_ms': args.latency_ms,
+                     'sections': args.sections},
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Baseline saved: {path}")
+    if args.compare:
+        path = os.path.join(BASELINE_DIR, f'{args.compare}.json')
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('settings') != report['settings']:
+            print(f"⚠ Baseline was recorded with different settings: {baseline.get('settings')}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("✗ Regressions against baseline:")
+            for line in regressions:
+                print(f"  • {line}")
+            sys.exit(1)
+        print(f"✓ No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Local SMTP Sink
+Accepts and discards mail on 127.0.0.1 so EmailSender can be benchmarked without
+a real provider. Counts connections and messages (no TLS, AUTH always succeeds).
+Set `drop` to 'MAIL' or 'DATA' to hang up once at that point (after the message
+for 'DATA'), like a provider closing an idle or overloaded connection.
+"""
+import socketserver
+import threading
+
+
+class SMTPSink:
+    """Minimal threaded SMTP server that swallows every message"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        self.connections = 0
+        self.drop = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            # Multi-line replies are several small writes; don't let Nagle delay them
+            disable_nagle_algorithm = True
+
+            def reply(self, line):
+                self.wfile.write((line + '\r\n').encode('ascii'))
+
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                self.reply('220 benchmark sink')
+                in_data, size = False, 0
+                for raw in self.rfile:
+                    if in_data:
+                        if raw.rstrip(b'\r\n') == b'.':
+                            in_data = False
+                            with sink._lock:
+                                sink.messages += 1
+                                sink.bytes += size
+                            if sink._take_drop('DATA'):
+                                break
+                            self.reply('250 OK')
+                        else:
+                            size += len(raw)
+                        continue
+                    command = raw.decode('ascii', 'replace').split(' ', 1)[0].strip().upper()
+                    if command == 'MAIL' and sink._take_drop('MAIL'):
+                        break
+                    if command in ('EHLO', 'HELO'):
+                        self.reply('250-benchmark sink')
+                        self.reply('250 AUTH PLAIN LOGIN')
+                    elif command == 'AUTH':
+                        self.reply('235 Authentication successful')
+                    elif command == 'DATA':
+                        in_data, size = True, 0
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                    elif command == 'QUIT':
+                        self.reply('221 Bye')
+                        break
+                    else:
+                        self.reply('250 OK')
+
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True).start()
+        return self
+
+    def _take_drop(self, point):
+        with self._lock:
+            if self.drop != point:
+                return False
+            self.drop = None
+            return True
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -19,6 +19,15 @@ class Config:
     MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'True') == 'True'
     MAIL_USE_SSL = os.getenv('MAIL_USE_SSL', 'False') == 'True'
     
+    # Mail transport: 'smtp' (standard library) or 'flask' (Flask-Mail)
+    MAIL_TRANSPORT = os.getenv('MAIL_TRANSPORT', 'smtp')
+    
+    # SMTP connection pool for bulk sending (messages per connection before reconnecting)
+    SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 2))
+    SMTP_MAX_MESSAGES = int(os.getenv('SMTP_MAX_MESSAGES', 100))
+    # In-memory cache (MB) of static attachments such as the resume, read once per run
+    MAIL_ATTACHMENT_CACHE_MB = float(os.getenv('MAIL_ATTACHMENT_CACHE_MB', 64))
+    
     # Email Recipients
     TO_EMAIL = os.getenv('TO_EMAIL', 'tech@themedius.ai')
     CC_EMAIL = os.getenv('CC_EMAIL', 'hr@themedius.ai')
@@ -43,6 +52,109 @@ class Config:
     # Screenshot Configuration
     SCREENSHOT_DIR = 'screenshots'
     SCREENSHOT_FILENAME = 'form_confirmation.png'
+    # CSS selector of the element to capture on the confirmation page (empty = whole viewport)
+    SCREENSHOT_ELEMENT = os.getenv('SCREENSHOT_ELEMENT', '')
+    
+    # Screenshot post-processing (single mode, and off the browser workers in --pipeline mode)
+    SCREENSHOT_OPTIMIZE = os.getenv('SCREENSHOT_OPTIMIZE', 'False') == 'True'
+    SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'png')  # png, jpeg or webp
+    SCREENSHOT_MAX_WIDTH = int(os.getenv('SCREENSHOT_MAX_WIDTH', 0))  # 0 = keep size
+    SCREENSHOT_COLORS = int(os.getenv('SCREENSHOT_COLORS', 0))  # PNG palette size, 0 = true colour
+    SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', 80))  # jpeg/webp
+    SCREENSHOT_MAX_KB = int(os.getenv('SCREENSHOT_MAX_KB', 0))  # size budget, 0 = none
+    SCREENSHOT_KEEP_ORIGINAL = os.getenv('SCREENSHOT_KEEP_ORIGINAL', 'False') == 'True'
+    SCREENSHOT_WORKERS = int(os.getenv('SCREENSHOT_WORKERS', 2))
+    SCREENSHOT_POOL = os.getenv('SCREENSHOT_POOL', 'thread')  # thread or process
+    
+    # Evidence mode (--evidence): record the confirmation URL, text, a values hash and a
+    # compressed DOM snapshot in one archive instead of PNGs. PNGs are then only taken
+    # on failure, or for EVIDENCE_SAMPLE_RATE (0-1) of confirmed responses
+    EVIDENCE_MODE = os.getenv('EVIDENCE_MODE', 'False') == 'True'
+    EVIDENCE_PATH = os.getenv('EVIDENCE_PATH', os.path.join('screenshots', 'evidence.archive'))
+    EVIDENCE_COMPRESSION = os.getenv('EVIDENCE_COMPRESSION', 'gzip')  # gzip, zstd or none
+    EVIDENCE_DOM = os.getenv('EVIDENCE_DOM', 'True') == 'True'
+    EVIDENCE_SAMPLE_RATE = float(os.getenv('EVIDENCE_SAMPLE_RATE', 0))
+    
+    # Submission backend: 'browser' (Selenium) or 'http' (direct POST to formResponse)
+    SUBMIT_MODE = os.getenv('SUBMIT_MODE', 'browser')
+    
+    # Minimum seconds between field actions (anti-throttling); 0 = condition-driven only
+    MIN_ACTION_DELAY = float(os.getenv('MIN_ACTION_DELAY', 0))
+    
+    # Browser fill strategy: 'keys' (type into each field) or 'bulk' (one script call)
+    FILL_STRATEGY = os.getenv('FILL_STRATEGY', 'keys')
+    
+    # Browser startup: headless low-footprint profile and pre-spawned warm sessions
+    HEADLESS = os.getenv('HEADLESS', 'False') == 'True'
+    PREWARM_SESSIONS = os.getenv('PREWARM_SESSIONS', 'False') == 'True'
+    
+    # Page load: 'eager' stops waiting at DOMContentLoaded; blocked resource types
+    # (image, font, media, analytics) and extra URL patterns are dropped via CDP
+    PAGE_LOAD_STRATEGY = os.getenv('PAGE_LOAD_STRATEGY', 'normal')
+    BLOCK_RESOURCES = [t.strip() for t in os.getenv('BLOCK_RESOURCES', '').split(',') if t.strip()]
+    BLOCK_URLS = [u.strip() for u in os.getenv('BLOCK_URLS', '').split(',') if u.strip()]
+    
+    # Form schema cache (labels, entry ids, types, formats), re-checked after the TTL
+    SCHEMA_CACHE_DIR = os.getenv('SCHEMA_CACHE_DIR', os.path.join('.cache', 'form_schema'))
+    SCHEMA_TTL = int(os.getenv('SCHEMA_TTL', 86400))
+    
+    # Retries: per field in place, then whole-form reloads in the same browser session
+    FIELD_RETRIES = int(os.getenv('FIELD_RETRIES', 2))
+    PAGE_RETRIES = int(os.getenv('PAGE_RETRIES', 1))
+    RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 0.5))
+    RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 8))
+    # Circuit breaker: pause all workers after this many failed rows in a row
+    CIRCUIT_FAILURES = int(os.getenv('CIRCUIT_FAILURES', 5))
+    CIRCUIT_RESET = float(os.getenv('CIRCUIT_RESET', 60))
+    
+    # Adaptive rate limits shared by all workers, per second (0 = unlimited).
+    # They start at the max and back off automatically when errors/throttling rise.
+    SUBMIT_RATE = float(os.getenv('SUBMIT_RATE', 0))
+    SUBMIT_BURST = int(os.getenv('SUBMIT_BURST', 1))
+    MAIL_RATE = float(os.getenv('MAIL_RATE', 0))
+    MAIL_BURST = int(os.getenv('MAIL_BURST', 1))
+    
+    # Long-running browser workers: replace a worker's Chrome after this many
+    # responses or once its process tree passes this much RSS (MB); 0 = no limit
+    BROWSER_MAX_SUBMISSIONS = int(os.getenv('BROWSER_MAX_SUBMISSIONS', 200))
+    BROWSER_MAX_RSS_MB = float(os.getenv('BROWSER_MAX_RSS_MB', 1200))
+    
+    # Submission ledger (SQLite) used to resume interrupted runs without duplicates
+    LEDGER_PATH = os.getenv('LEDGER_PATH', os.path.join('.cache', 'ledger.db'))
+    # Re-run jobs an earlier run filled but never confirmed (they may already be on the
+    # form); by default they are held for you to check the form's responses first
+    RETRY_AMBIGUOUS = os.getenv('RETRY_AMBIGUOUS', 'False') == 'True'
+    
+    # Batch Configuration
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 2))
+    # JSON spec mapping job-file columns (or the settings above) to form labels; empty =
+    # the job file's columns are the form labels
+    FIELD_MAPPING = os.getenv('FIELD_MAPPING', '')
+    # Validate/normalize the whole job file first, split into .valid/.rejected files
+    # written to PREFLIGHT_DIR
+    PREFLIGHT_VALIDATION = os.getenv('PREFLIGHT_VALIDATION', 'True') == 'True'
+    PREFLIGHT_DIR = os.getenv('PREFLIGHT_DIR', 'preflight')
+    # "label fragment=format" rules checked on questions the schema has no format for
+    # (formats: email, phone, pin, date). phone = 10-digit Indian number, pin = 6 digits
+    PREFLIGHT_LABEL_FORMATS = os.getenv('PREFLIGHT_LABEL_FORMATS',
+                                        'email=email,date of birth=date')
+    
+    # Distributed mode (--coordinator / --worker): rows per lease, seconds a lease lives
+    # without a heartbeat, and how often a failed row is handed out before giving up
+    COORDINATOR_ADDRESS = os.getenv('COORDINATOR_ADDRESS', '127.0.0.1:8765')
+    COORDINATOR_TOKEN = os.getenv('COORDINATOR_TOKEN', '')
+    LEASE_SIZE = int(os.getenv('LEASE_SIZE', 10))
+    LEASE_TTL = float(os.getenv('LEASE_TTL', 120))
+    LEASE_MAX_ATTEMPTS = int(os.getenv('LEASE_MAX_ATTEMPTS', 2))
+    
+    # Pipeline Configuration (--batch ... --pipeline)
+    EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', 2))
+    PIPELINE_REPORT_INTERVAL = float(os.getenv('PIPELINE_REPORT_INTERVAL', 0))
+    
+    # Profiling (--profile): per-step JSON lines, and an optional Prometheus text file
+    PROFILE_PATH = os.getenv('PROFILE_PATH', 'profile.jsonl')
+    METRICS_PATH = os.getenv('METRICS_PATH', '')
+    METRICS_INTERVAL = float(os.getenv('METRICS_INTERVAL', 15))
     
     @staticmethod
     def validate_config():
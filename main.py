@@ -2,16 +2,349 @@
 Main execution script for Google Form Automation Assignment
 Orchestrates form filling and email sending
 """
+import argparse
 import os
 import sys
 from config.config import Config
-from src.form_filler import automate_google_form
-from src.email_sender import send_assignment_submission
+from src.retry import CircuitBreaker, RetryPolicy
 
+# Selenium, requests and the mail transport are imported where they are used,
+# so `--help`, HTTP-only and browser-only runs only pay for what they load.
 
-def main():
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Google Form automation & email submission")
+    parser.add_argument('--mode', choices=['browser', 'http'], default=Config.SUBMIT_MODE,
+                        help="Submit through Chrome (browser) or a direct POST (http)")
+    parser.add_argument('--fill', choices=['keys', 'bulk'], default=Config.FILL_STRATEGY,
+                        help="Browser mode: type each value (keys) or set all values in one script (bulk)")
+    parser.add_argument('--headless', action='store_true', default=Config.HEADLESS,
+                        help="Run Chrome headless with a low-footprint profile")
+    parser.add_argument('--page-load', choices=['normal', 'eager'], default=Config.PAGE_LOAD_STRATEGY,
+                        help="eager: start filling at DOMContentLoaded instead of waiting for every resource")
+    parser.add_argument('--block', metavar='TYPES', default=','.join(Config.BLOCK_RESOURCES),
+                        help="Comma-separated resource types to block: image,font,media,analytics")
+    parser.add_argument('--prewarm', action='store_true', default=Config.PREWARM_SESSIONS,
+                        help="Batch mode: pre-spawn and warm one browser per worker before reading jobs")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="Submit every row of a .csv/.jsonl file instead of the .env details")
+    parser.add_argument('--workers', type=int, default=Config.BATCH_WORKERS,
+                        help="Number of parallel browser workers in batch mode")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Batch mode: also email each submission, overlapping browser work and SMTP")
+    parser.add_argument('--mapping', metavar='FILE', default=Config.FIELD_MAPPING or None,
+                        help="JSON spec mapping input columns (or .env settings) to form labels")
+    parser.add_argument('--no-validate', action='store_false', dest='validate',
+                        default=Config.PREFLIGHT_VALIDATION,
+                        help="Batch mode: skip pre-flight validation of the job file")
+    parser.add_argument('--validate-only', action='store_true',
+                        help="Validate the --batch file into .valid/.rejected files "
+                             "(in PREFLIGHT_DIR) and exit")
+    parser.add_argument('--coordinator', nargs='?', const=Config.COORDINATOR_ADDRESS,
+                        metavar='HOST:PORT',
+                        help="Serve the --batch file as leases to distributed workers instead of running it")
+    parser.add_argument('--worker', metavar='URL',
+                        help="Pull rows from a coordinator (e.g. http://10.0.0.5:8765) instead of a file")
+    parser.add_argument('--rate', type=float, default=Config.SUBMIT_RATE,
+                        help="Max form submissions per second across all workers (0 = unlimited)")
+    parser.add_argument('--mail-rate', type=float, default=Config.MAIL_RATE,
+                        help="Max emails per second across all email workers (0 = unlimited)")
+    parser.add_argument('--evidence', nargs='?', const=Config.EVIDENCE_PATH, metavar='FILE',
+                        default=Config.EVIDENCE_PATH if Config.EVIDENCE_MODE else None,
+                        help="Archive compressed confirmation records instead of PNGs "
+                             "(PNGs only on failure or when sampled)")
+    parser.add_argument('--results', metavar='FILE',
+                        help="Append per-row batch results (JSON lines) to this file")
+    parser.add_argument('--refresh-schema', action='store_true',
+                        help="Drop the cached form schema and re-read it from the form")
+    parser.add_argument('--ledger', metavar='FILE', default=Config.LEDGER_PATH,
+                        help="SQLite ledger of finished jobs; reruns skip what already went through")
+    parser.add_argument('--no-ledger', action='store_true',
+                        help="Don't read or record the ledger (resubmit and re-email everything)")
+    parser.add_argument('--retry-ambiguous', action='store_true', default=Config.RETRY_AMBIGUOUS,
+                        help="Re-run jobs an earlier run filled but never confirmed "
+                             "(held by default: the form may already have them)")
+    parser.add_argument('--profile', nargs='?', const=Config.PROFILE_PATH, metavar='FILE',
+                        help="Time every step, append JSON lines to FILE and print p50/p95/p99")
+    parser.add_argument('--metrics', metavar='FILE', default=Config.METRICS_PATH or None,
+                        help="Keep a Prometheus text-format file of step timings up to date")
+    return parser.parse_args(argv)
+
+
+def browser_options(args):
+    """GoogleFormFiller keyword arguments shared by single and batch runs"""
+    return {
+        'min_delay': Config.MIN_ACTION_DELAY,
+        'fill_strategy': args.fill,
+        'headless': args.headless,
+        'page_load_strategy': args.page_load,
+        'blocked_resources': [t.strip() for t in args.block.split(',') if t.strip()],
+        'blocked_urls': Config.BLOCK_URLS,
+        'schema_cache': schema_cache(),
+        'screenshot_element': Config.SCREENSHOT_ELEMENT or None,
+        'field_retry': RetryPolicy(Config.FIELD_RETRIES + 1, Config.RETRY_BASE_DELAY / 2,
+                                   Config.RETRY_MAX_DELAY),
+        'page_retry': page_retry(),
+        'recycle_policy': recycle_policy(),
+        'evidence': evidence_archive(args),
+    }
+
+
+def page_retry():
+    """Retry policy for a whole form (browser reload, or the HTTP POST)"""
+    return RetryPolicy(Config.PAGE_RETRIES + 1, Config.RETRY_BASE_DELAY * 2, Config.RETRY_MAX_DELAY)
+
+
+def recycle_policy():
+    from src.browser_health import RecyclePolicy
+    return RecyclePolicy(Config.BROWSER_MAX_SUBMISSIONS, Config.BROWSER_MAX_RSS_MB)
+
+
+def evidence_archive(args):
+    """EvidenceArchive for --evidence, or None"""
+    if not args.evidence:
+        return None
+    from src.evidence import EvidenceArchive
+    return EvidenceArchive(args.evidence, compression=Config.EVIDENCE_COMPRESSION,
+                           keep_dom=Config.EVIDENCE_DOM, sample_rate=Config.EVIDENCE_SAMPLE_RATE)
+
+
+def circuit_breaker():
+    return CircuitBreaker(Config.CIRCUIT_FAILURES, Config.CIRCUIT_RESET)
+
+
+def submit_limiter(args):
+    from src.rate_limit import create_limiter
+    return create_limiter('submissions', args.rate, Config.SUBMIT_BURST)
+
+
+def schema_cache():
+    from src.form_schema import SchemaCache
+    return SchemaCache(Config.SCHEMA_CACHE_DIR, ttl=Config.SCHEMA_TTL)
+
+
+def screenshot_processor():
+    """ScreenshotProcessor from Config, or None if post-processing is off"""
+    if not Config.SCREENSHOT_OPTIMIZE:
+        return None
+    from src.screenshots import ScreenshotProcessor
+    return ScreenshotProcessor.from_config()
+
+
+def open_ledger(args):
+    if args.no_ledger:
+        return None
+    from src.ledger import SubmissionLedger
+    return SubmissionLedger(args.ledger)
+
+
+def field_mapping(args):
+    """The compiled --mapping spec, or None when the job file's columns are the form labels"""
+    if not args.mapping:
+        return None
+    from src.field_mapping import compile_mapping
+    return compile_mapping(args.mapping)
+
+
+def job_rows(args, mapping):
+    """Lazily mapped rows of the job file, or None to let the runner read it as-is"""
+    if mapping is None:
+        return None
+    from src.batch_runner import read_rows
+    return mapping.map_rows(read_rows(args.batch))
+
+
+def run_preflight(args, mapping=None):
+    """Split the job file into valid and rejected rows; the batch then runs the valid ones"""
+    from src.validation import parse_label_formats, preflight, print_preflight
+    
+    try:
+        label_formats = parse_label_formats(Config.PREFLIGHT_LABEL_FORMATS)
+    except ValueError as e:
+        print(f"✗ PREFLIGHT_LABEL_FORMATS: {e}")
+        sys.exit(1)
+    
+    if args.mode == 'http':
+        schema = None
+        try:
+            from src.http_submitter import HttpFormSubmitter
+            submitter = HttpFormSubmitter(Config.FORM_URL, schema_cache=schema_cache())
+            if submitter.setup():
+                schema = submitter.schema
+            submitter.close()
+        except Exception as e:
+            print(f"ℹ Could not load the form schema for validation: {e}")
+    else:
+        # Browser mode never fetches the form over HTTP: use the schema a browser
+        # run cached, if any (the first run checks formats only)
+        schema = schema_cache().load(Config.FORM_URL)
+    summary = preflight(args.batch, schema, mapping=mapping, label_formats=label_formats,
+                        output_dir=Config.PREFLIGHT_DIR)
+    print_preflight(summary)
+    if not summary['valid'] and not args.validate_only:
+        print("✗ No valid rows to submit")
+        sys.exit(1)
+    return summary
+
+
+def run_batch_mode(args, ledger=None, form_url=None, rows=None, on_result=None,
+                   should_submit=None):
+    """
+    Submit a whole job file with a pool of browser workers.
+    Distributed workers pass `rows` (from coordinator leases), `on_result` and
+    `should_submit` (is the row's lease still held) instead.
+    """
+    from src.batch_runner import run_batch
+    form_url = form_url or Config.FORM_URL
+    
+    print("=" * 80)
+    print("  GOOGLE FORM AUTOMATION - BATCH MODE")
+    print("=" * 80)
+    print(f"Form URL: {form_url}")
+    print(f"Input: {args.worker or args.batch}")
+    print(f"Workers: {args.workers}")
+    print(f"Mode: {args.mode}")
+    
+    if args.pipeline:
+        # Screenshots are post-processed in the pipeline's own stage, off the browser workers
+        summary = run_pipeline_mode(args, send_email=args.pipeline, ledger=ledger,
+                                    form_url=form_url, rows=rows, on_result=on_result,
+                                    should_submit=should_submit)
+    else:
+        summary = run_batch(form_url, args.batch, workers=args.workers,
+                            results_path=args.results, mode=args.mode, prewarm=args.prewarm,
+                            ledger=ledger, breaker=circuit_breaker(),
+                            submit_limiter=submit_limiter(args), rows=rows,
+                            on_result=on_result, should_submit=should_submit,
+                            retry_ambiguous=args.retry_ambiguous, **browser_options(args))
+    if summary['failed']:
+        sys.exit(1)
+
+
+def run_coordinator_mode(args, ledger=None, rows=None):
+    """Hand the job file out to --worker processes in leases and collect their results"""
+    from src.distributed import run_coordinator
+    
+    host, _, port = args.coordinator.rpartition(':')
+    print("=" * 80)
+    print("  GOOGLE FORM AUTOMATION - COORDINATOR")
+    print("=" * 80)
+    print(f"Form URL: {Config.FORM_URL}")
+    print(f"Input: {args.batch}")
+    summary = run_coordinator(Config.FORM_URL, args.batch, host=host or '127.0.0.1',
+                              port=int(port), lease_size=Config.LEASE_SIZE,
+                              lease_ttl=Config.LEASE_TTL, max_attempts=Config.LEASE_MAX_ATTEMPTS,
+                              ledger=ledger, results_path=args.results,
+                              token=Config.COORDINATOR_TOKEN, rows=rows,
+                              retry_ambiguous=args.retry_ambiguous)
+    if summary['failed']:
+        sys.exit(1)
+
+
+def run_worker_mode(args, ledger=None):
+    """Run leased rows from a coordinator through the usual batch / pipeline flow"""
+    from src.distributed import LeaseClient
+    
+    client = LeaseClient(args.worker, token=Config.COORDINATOR_TOKEN)
+    try:
+        info = client.hello()
+        print(f"🛰 Connected to coordinator {args.worker} as {client.node}")
+        return run_batch_mode(args, ledger, form_url=info['form_url'], rows=client.rows(),
+                              on_result=client.report, should_submit=client.holds)
+    finally:
+        client.close()
+
+
+def run_pipeline_mode(args, send_email=True, ledger=None, form_url=None, rows=None,
+                      on_result=None, should_submit=None):
+    """Batch mode with form filling, screenshot handling and email delivery overlapped"""
+    from src.batch_runner import BatchRunner
+    from src.email_sender import create_sender, send_assignment_submission
+    from src.pipeline import run_pipeline
+    from src.smtp_pool import SMTPPool
+    
+    # One sender and one set of persistent SMTP connections for every email in the run
+    sender = create_sender() if send_email else None
+    smtp_pool = SMTPPool.from_config(size=Config.EMAIL_WORKERS)
+    if args.mail_rate != Config.MAIL_RATE:
+        from src.rate_limit import create_limiter
+        smtp_pool.limiter = create_limiter('mail', args.mail_rate, Config.MAIL_BURST)
+    processor = screenshot_processor()
+    
+    def email_row(screenshot_path, form_data):
+        return send_assignment_submission(
+            screenshot_path=screenshot_path,
+            github_repo=Config.GITHUB_REPO,
+            your_name=form_data.get('Full Name') or Config.YOUR_NAME,
+            pool=smtp_pool,
+            sender=sender,
+        )
+    
+    runner = BatchRunner(form_url or Config.FORM_URL, workers=args.workers,
+                         results_path=args.results, mode=args.mode, prewarm=args.prewarm,
+                         ledger=ledger, breaker=circuit_breaker(),
+                         submit_limiter=submit_limiter(args), on_result=on_result,
+                         should_submit=should_submit, retry_ambiguous=args.retry_ambiguous,
+                         **browser_options(args))
+    try:
+        return run_pipeline(runner, args.batch,
+                            postprocess_fn=processor.process if processor else None,
+                            email_fn=email_row if send_email else None,
+                            email_workers=Config.EMAIL_WORKERS,
+                            postprocess_workers=Config.SCREENSHOT_WORKERS,
+                            report_interval=Config.PIPELINE_REPORT_INTERVAL or None,
+                            rows=rows)
+    finally:
+        smtp_pool.close()
+        if smtp_pool.limiter and send_email:
+            from src.rate_limit import print_limiter
+            print_limiter(smtp_pool.limiter.summary(), 'mail')
+        if processor:
+            processor.close()
+
+
+def main(argv=None):
     """Main execution function"""
+    args = parse_args(argv)
+    if args.refresh_schema:
+        schema_cache().invalidate(Config.FORM_URL)
     
+    profiler = None
+    if args.profile or args.metrics:
+        from src.profiling import enable_profiling
+        profiler = enable_profiling(args.profile, args.metrics, Config.METRICS_INTERVAL)
+    ledger = open_ledger(args)
+    try:
+        if args.worker:
+            return run_worker_mode(args, ledger)
+        if not args.batch:
+            if args.coordinator:
+                print("✗ --coordinator needs a job file (--batch FILE)")
+                sys.exit(1)
+            return run_single_mode(args, ledger)
+        mapping = field_mapping(args)
+        if args.validate or args.validate_only:
+            summary = run_preflight(args, mapping)
+            if args.validate_only:
+                return
+            # The valid file is already mapped to form labels
+            args.batch, mapping = summary['valid_path'], None
+        if args.coordinator:
+            return run_coordinator_mode(args, ledger, rows=job_rows(args, mapping))
+        return run_batch_mode(args, ledger, rows=job_rows(args, mapping))
+    finally:
+        if ledger:
+            ledger.close()
+        if profiler:
+            from src.profiling import disable_profiling, print_profile
+            disable_profiling()
+            print_profile(profiler.summary())
+            if args.profile:
+                print(f"Step records: {args.profile}")
+
+
+def run_single_mode(args, ledger=None):
+    """Fill the form once with the .env details and email the confirmation"""
     print("=" * 80)
     print("  GOOGLE FORM AUTOMATION & EMAIL SUBMISSION")
     print("  Python (Selenium) Assignment - The Medius.ai")
@@ -39,31 +372,87 @@ def main():
     print(f"CC: {Config.CC_EMAIL}")
     print("-" * 80)
     
-    # Prepare form data - IN CORRECT ORDER
-    form_data = {
-        'Full Name': Config.YOUR_NAME,
-        'Contact Number': Config.CONTACT_NUMBER,
-        'Email ID': Config.YOUR_EMAIL,
-        'Full Address': Config.YOUR_ADDRESS,
-        'Pin Code': Config.PIN_CODE,
-        'Date of Birth': Config.DATE_OF_BIRTH,  # Will be handled separately
-        'Gender': Config.GENDER,
-        'Verification Code': Config.VERIFICATION_CODE,
-    }
+    # Prepare form data from the .env settings (or a --mapping spec over them), in form order
+    from src.field_mapping import CONFIG_MAPPING, compile_mapping
+    settings = {name: value for name, value in vars(Config).items()
+                if name.isupper() and isinstance(value, str)}
+    form_data = compile_mapping(args.mapping or CONFIG_MAPPING)(settings)
     
     print("\n" + "=" * 80)
     print("STEP 1: FILLING GOOGLE FORM AUTOMATICALLY")
     print("=" * 80)
     
-    # Fill and submit form
-    screenshot_path = automate_google_form(Config.FORM_URL, form_data)
-    
-    if not screenshot_path:
-        print("\n✗ Failed to complete form automation")
-        sys.exit(1)
+    # Check the ledger so a rerun never submits or emails the same details twice
+    key = job = on_filled = None
+    if ledger:
+        from src.ledger import EMAILED, FILLED, SUBMITTED, is_ambiguous, is_done, job_key
+        key = job_key(Config.FORM_URL, form_data)
+        job = ledger.begin(key, Config.FORM_URL)
+        if job['state'] == EMAILED:
+            print("\n✓ These details were already submitted and emailed in an earlier run")
+            print("  (use --no-ledger to submit them again)")
+            return
+        if is_ambiguous(job['state']) and not args.retry_ambiguous:
+            print("\n⏸ An earlier run filled the form with these details but never confirmed")
+            print("  the submission, so the form may already have it. Check its responses,")
+            print("  then rerun with --retry-ambiguous if it is missing.")
+            sys.exit(1)
+        on_filled = lambda: ledger.advance(key, FILLED)
     
-    print(f"\n✅ Form automation completed!")
-    print(f"✓ Screenshot saved: {screenshot_path}")
+    # Fill and submit form
+    if job and is_done(job['state'], SUBMITTED):
+        result = job['result']
+        screenshot_path = result if result and os.path.exists(result) else None
+        print("\n✓ Form already submitted in an earlier run, going straight to the email")
+    elif args.mode == 'http':
+        from src.http_submitter import submit_google_form
+        response_url = submit_google_form(Config.FORM_URL, form_data, schema_cache=schema_cache(),
+                                          on_filled=on_filled, retry=page_retry(),
+                                          evidence=evidence_archive(args))
+        if not response_url:
+            if ledger:
+                ledger.fail(key, 'http submit failed')
+            print("\n✗ Failed to submit form over HTTP")
+            sys.exit(1)
+        if ledger:
+            ledger.advance(key, SUBMITTED, response_url)
+        # No browser, so there is no confirmation screenshot to attach
+        screenshot_path = None
+        if args.evidence:
+            print(f"\n✅ Form submitted over HTTP\n✓ Evidence recorded: {response_url}")
+        else:
+            print(f"\n✅ Form submitted over HTTP: {response_url}")
+    else:
+        from src.form_filler import automate_google_form
+        screenshot_path = automate_google_form(Config.FORM_URL, form_data, on_filled=on_filled,
+                                               **browser_options(args))
+        
+        if not screenshot_path:
+            if ledger:
+                ledger.fail(key, 'fill or submit failed')
+            print("\n✗ Failed to complete form automation")
+            sys.exit(1)
+        if ledger:
+            ledger.advance(key, SUBMITTED, screenshot_path)
+        
+        print(f"\n✅ Form automation completed!")
+        if not os.path.exists(screenshot_path):
+            # Evidence mode without a sampled PNG: the proof is the archive record
+            print(f"✓ Evidence recorded: {screenshot_path}")
+            screenshot_path = None
+        else:
+            print(f"✓ Screenshot saved: {screenshot_path}")
+        processor = screenshot_processor() if screenshot_path else None
+        if processor:
+            try:
+                screenshot_path = processor.process(screenshot_path)
+                if ledger:
+                    ledger.set_result(key, screenshot_path)
+            except Exception as e:
+                # The unprocessed screenshot is still a valid attachment
+                print(f"⚠ Screenshot post-processing failed: {e}")
+            finally:
+                processor.close()
     
     # Prepare additional info with resume and past projects
     resume_path = Config.RESUME_PATH if Config.RESUME_PATH else None
@@ -78,6 +467,7 @@ def main():
     print("=" * 80)
     
     # Send email
+    from src.email_sender import send_assignment_submission
     email_sent = send_assignment_submission(
         screenshot_path=screenshot_path,
         github_repo=Config.GITHUB_REPO,
@@ -87,6 +477,8 @@ def main():
     )
     
     if email_sent:
+        if ledger:
+            ledger.advance(key, EMAILED)
         print("\n" + "=" * 80)
         print("  ✅ ASSIGNMENT SUBMISSION COMPLETED SUCCESSFULLY!")
         print("=" * 80)
@@ -104,7 +496,8 @@ def main():
         print("=" * 80)
     else:
         print("\n✗ Failed to send email")
-        print(f"\nScreenshot saved at: {screenshot_path}")
+        if screenshot_path:
+            print(f"\nScreenshot saved at: {screenshot_path}")
         sys.exit(1)
 
 
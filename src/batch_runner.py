@@ -0,0 +1,497 @@
+"""
+Batch Submission Module
+Streams rows from a CSV/JSONL file and submits them with a pool of
+GoogleFormFiller workers, each reusing one browser across many responses.
+"""
+import collections
+import csv
+import json
+import os
+import queue
+import threading
+import time
+
+from src.form_schema import SchemaCache
+from src.ledger import EMAILED, FILLED, SUBMITTED, is_ambiguous, is_done, job_key
+from src.profiling import span
+from src.rate_limit import print_limiter
+
+# Sentinel placed on the work queue to tell a worker to shut down
+_STOP = object()
+
+# Optional column carrying a row's number in the original job file (written by
+# pre-flight validation), so split files keep the input's row numbers
+ROW_COLUMN = '_row'
+
+# Extra attempts for a row refused by throttling, when a submit rate limiter is active
+THROTTLE_RETRIES = 3
+
+# Failed row numbers kept for the summary; the rest are only counted (every row's
+# outcome is in the --results file)
+FAILED_ROWS_SAMPLE = 100
+
+
+def read_rows(path):
+    """
+    Lazily yield (row_number, form_data) pairs from a .csv or .jsonl file.
+    CSV headers / JSON keys must match the form labels used in form_data.
+    A ROW_COLUMN value, when present, is used as the row number.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if ext == '.csv':
+            for i, row in enumerate(csv.DictReader(f), 1):
+                yield _numbered(i, row)
+        elif ext in ('.jsonl', '.ndjson'):
+            for i, line in enumerate(f, 1):
+                line = line.strip()
+                if line:
+                    yield _numbered(i, json.loads(line))
+        else:
+            raise ValueError(f"Unsupported input file type: {ext} (use .csv or .jsonl)")
+
+
+def _numbered(i, row):
+    row = _clean_row(row)
+    number = row.pop(ROW_COLUMN, '')
+    return (int(number) if number.isdigit() else i), row
+
+
+def _clean_row(row):
+    """Convert every value to a string; missing values become ''"""
+    return {str(k).strip(): '' if v is None else str(v).strip() for k, v in row.items() if k}
+
+
+class RowResult:
+    """Outcome of a single submitted row"""
+
+    def __init__(self, row_number, success, screenshot_path=None, error=None,
+                 duration=0.0, worker_id=None, page_load=None):
+        self.row_number = row_number
+        self.success = success
+        self.screenshot_path = screenshot_path
+        self.error = error
+        self.duration = duration
+        self.worker_id = worker_id
+        self.page_load = page_load
+        # Set by the pipeline's email stage; None when no email was attempted
+        self.emailed = None
+        # Ledger idempotency key, and the ledger state found when the row was read
+        self.key = None
+        self.ledger_state = None
+        # True when the ledger showed this row was already submitted by an earlier run
+        self.skipped = False
+        # True when the ledger showed an earlier run filled this row but never confirmed it
+        self.held = False
+        # True when should_submit() refused the row (e.g. its coordinator lease was lost)
+        self.dropped = False
+        # Per-field errors the form rejected the row with: [{'field', 'message'}]
+        self.field_errors = []
+        # Memory of the worker's browser right after this row (MB), to follow it over time
+        self.rss_mb = None
+
+    def to_dict(self):
+        return {
+            'row': self.row_number,
+            'success': self.success,
+            'screenshot': self.screenshot_path,
+            'error': self.error,
+            'duration': round(self.duration, 3),
+            'worker': self.worker_id,
+            'page_load': self.page_load,
+            'emailed': self.emailed,
+            'skipped': self.skipped,
+            'held': self.held,
+            'dropped': self.dropped,
+            'field_errors': self.field_errors,
+            'rss_mb': self.rss_mb,
+        }
+
+
+class BatchRunner:
+    """Runs a job file through N parallel workers that keep their browser open"""
+
+    def __init__(self, form_url, workers=2, screenshot_dir='screenshots',
+                 results_path=None, queue_size=None, mode='browser', min_delay=0.0,
+                 fill_strategy='keys', headless=False, prewarm=False,
+                 page_load_strategy='normal', blocked_resources=(), blocked_urls=(),
+                 schema_cache=None, screenshot_element=None, ledger=None,
+                 field_retry=None, page_retry=None, breaker=None, submit_limiter=None,
+                 on_result=None, recycle_policy=None, evidence=None, should_submit=None,
+                 retry_ambiguous=False):
+        if mode not in ('browser', 'http'):
+            raise ValueError(f"Unknown submit mode: {mode} (use 'browser' or 'http')")
+        self.form_url = form_url
+        self.mode = mode
+        self.min_delay = min_delay
+        self.fill_strategy = fill_strategy
+        self.headless = headless
+        self.prewarm = prewarm
+        self.page_load_strategy = page_load_strategy
+        self.blocked_resources = blocked_resources
+        self.blocked_urls = blocked_urls
+        # One schema cache for all workers, so the form is parsed at most once per run
+        self.schema_cache = schema_cache or SchemaCache()
+        self.screenshot_element = screenshot_element
+        # RetryPolicy per field and per page reload (None = the filler's defaults)
+        self.field_retry = field_retry
+        self.page_retry = page_retry
+        # RecyclePolicy for each worker's browser (None = the filler's default)
+        self.recycle_policy = recycle_policy
+        # Optional EvidenceArchive shared by every worker (proof of submission without PNGs)
+        self.evidence = evidence
+        # worker id -> the latest GoogleFormFiller.memory_stats()
+        self.worker_memory = {}
+        # Optional CircuitBreaker shared by every worker: pauses all of them when rows keep failing
+        self.breaker = breaker
+        # Optional AdaptiveRateLimiter every worker draws a token from before submitting
+        self.submit_limiter = submit_limiter
+        # Optional SubmissionLedger: finished rows are skipped, progress survives crashes
+        self.ledger = ledger
+        # Re-run rows an earlier run left filled-but-unconfirmed instead of holding them
+        self.retry_ambiguous = retry_ambiguous
+        # Optional callback(RowResult) for every finished row, e.g. to report it to a coordinator
+        self.on_result = on_result
+        # Optional callback(row_number) -> bool asked right before each row is submitted;
+        # refused rows are dropped, e.g. queued rows of a lease the coordinator took back
+        self.should_submit = should_submit
+        self.driver_pool = None
+        self.workers = max(1, int(workers))
+        self.screenshot_dir = screenshot_dir
+        self.results_path = results_path
+        # Bounded so huge job files are streamed instead of loaded up front
+        self.jobs = queue.Queue(maxsize=queue_size or self.workers * 2)
+        # Running totals instead of every RowResult, so memory stays flat however long the file
+        self.counts = collections.Counter()
+        # The first FAILED_ROWS_SAMPLE failed row numbers
+        self.failed_rows = []
+        self.transfer_kb = 0.0
+        self._lock = threading.Lock()
+        self._results_file = None
+        # In HTTP mode all workers share one pooled session and one label -> entry map
+        self._http_submitter = None
+
+    def create_worker(self, worker_id):
+        """Build the per-worker submitter (one browser per worker)"""
+        # Imported per mode so HTTP runs never load Selenium (and vice versa)
+        if self.mode == 'http':
+            from src.http_submitter import RETRY_STATUSES, HttpFormSubmitter
+            with self._lock:
+                if self._http_submitter is None:
+                    # With a rate limiter, 429s are retried through the limiter (submit_row),
+                    # not straight away by the submitter
+                    statuses = RETRY_STATUSES - {429} if self.submit_limiter else RETRY_STATUSES
+                    self._http_submitter = HttpFormSubmitter(self.form_url, pool_size=self.workers,
+                                                             schema_cache=self.schema_cache,
+                                                             retry=self.page_retry,
+                                                             retry_statuses=statuses,
+                                                             evidence=self.evidence)
+            return self._http_submitter if self._http_submitter.setup() else None
+        from src.form_filler import GoogleFormFiller
+        filler = GoogleFormFiller(self.form_url, screenshot_dir=self.screenshot_dir,
+                                  min_delay=self.min_delay, fill_strategy=self.fill_strategy,
+                                  headless=self.headless, driver_pool=self.driver_pool,
+                                  page_load_strategy=self.page_load_strategy,
+                                  blocked_resources=self.blocked_resources,
+                                  blocked_urls=self.blocked_urls,
+                                  schema_cache=self.schema_cache,
+                                  screenshot_element=self.screenshot_element,
+                                  field_retry=self.field_retry, page_retry=self.page_retry,
+                                  recycle_policy=self.recycle_policy, evidence=self.evidence)
+        if not filler.setup_driver():
+            filler.close()
+            return None
+        return filler
+
+    def start_prewarm(self):
+        """Start one browser per worker in the background, before any job is read"""
+        if self.mode == 'browser' and self.driver_pool is None:
+            from src.driver_manager import DriverPool
+            print(f"🔥 Pre-spawning {self.workers} browser session(s)...")
+            self.driver_pool = DriverPool(self.workers, headless=self.headless,
+                                          warm_url=self.form_url,
+                                          page_load_strategy=self.page_load_strategy,
+                                          blocked_resources=self.blocked_resources,
+                                          blocked_urls=self.blocked_urls).start()
+        return self
+
+    def reap_orphans(self):
+        """Clean up browsers left behind by earlier runs that crashed"""
+        if self.mode == 'browser':
+            from src.browser_health import reap_orphaned_drivers
+            reap_orphaned_drivers()
+
+    def close_worker(self, filler):
+        """Release a worker from create_worker(); the shared HTTP submitter is closed in shutdown()"""
+        if filler is not None and filler is not self._http_submitter:
+            filler.close()
+
+    def open_results(self):
+        if self.results_path and self._results_file is None:
+            self._results_file = open(self.results_path, 'a', encoding='utf-8')
+
+    def shutdown(self):
+        """Close resources shared by all workers"""
+        if self._results_file:
+            self._results_file.close()
+            self._results_file = None
+        if self._http_submitter:
+            self._http_submitter.close()
+            self._http_submitter = None
+        if self.driver_pool:
+            self.driver_pool.close()
+            self.driver_pool = None
+
+    def _worker(self, worker_id):
+        filler = self.create_worker(worker_id)
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is _STOP:
+                    break
+                row_number, form_data = job
+                if filler is None:
+                    # Keep draining so the producer never blocks on a dead worker
+                    self.record(RowResult(row_number, False, error='driver setup failed',
+                                           worker_id=worker_id))
+                    continue
+                self.record(self.submit_row(filler, worker_id, row_number, form_data))
+        finally:
+            self.close_worker(filler)
+
+    def submit_row(self, filler, worker_id, row_number, form_data):
+        """Submit one row with a worker from create_worker() and time it"""
+        if self.should_submit and not self.should_submit(row_number):
+            result = RowResult(row_number, False, error='dropped: lease lost', worker_id=worker_id)
+            result.dropped = True
+            return result
+        key = job = None
+        if self.ledger:
+            key = job_key(self.form_url, form_data)
+            job = self.ledger.begin(key, self.form_url, row_number)
+            if is_done(job['state'], SUBMITTED):
+                result = RowResult(row_number, True, job['result'], worker_id=worker_id)
+                result.key, result.ledger_state, result.skipped = key, job['state'], True
+                return result
+            if is_ambiguous(job['state']) and not self.retry_ambiguous:
+                # Died between the submit click and its outcome: the form may already have it
+                result = RowResult(row_number, False, error='ambiguous: filled in an earlier run '
+                                   'but never confirmed', worker_id=worker_id)
+                result.key, result.ledger_state, result.held = key, job['state'], True
+                return result
+
+        probe = self.breaker.wait() if self.breaker else None
+        start = time.perf_counter()
+        filler.screenshot_tag = f"row{row_number}"
+        on_filled = (lambda: self.ledger.advance(key, FILLED)) if key else None
+        # A throttled attempt goes back through the (now slower) limiter instead of failing the row
+        attempts = 1 + (THROTTLE_RETRIES if self.submit_limiter else 0)
+        field_errors = []
+        for _ in range(attempts):
+            if self.submit_limiter:
+                self.submit_limiter.acquire()
+            with span('row', row=row_number, worker=worker_id) as row_span:
+                try:
+                    screenshot_path = filler.submit_response(form_data, on_filled=on_filled)
+                    error = None if screenshot_path else 'fill or submit failed'
+                except Exception as e:
+                    screenshot_path, error = None, str(e)
+                row_span.ok = bool(screenshot_path)
+            throttled = not screenshot_path and filler.was_throttled()
+            field_errors = [] if screenshot_path else filler.validation_errors()
+            if field_errors:
+                error = 'invalid: ' + '; '.join(
+                    f"{e['field']}: {e['message']}" if e['field'] else e['message']
+                    for e in field_errors
+                )
+            # A row the form rejected as invalid is the data's fault, not a sign the
+            # form or the rate is in trouble
+            healthy = bool(screenshot_path or field_errors)
+            if self.submit_limiter:
+                self.submit_limiter.record(healthy, throttled)
+            if not throttled:
+                break
+            error = 'throttled by the form'
+        if self.breaker:
+            self.breaker.record(healthy, probe)
+        if key:
+            if screenshot_path:
+                self.ledger.advance(key, SUBMITTED, screenshot_path)
+            else:
+                self.ledger.fail(key, error)
+        result = RowResult(row_number, bool(screenshot_path), screenshot_path, error,
+                           time.perf_counter() - start, worker_id,
+                           getattr(filler, 'last_load_stats', None))
+        result.key, result.ledger_state = key, job['state'] if job else None
+        result.field_errors = field_errors
+        if hasattr(filler, 'memory_stats'):
+            stats = filler.memory_stats()
+            result.rss_mb = stats['last_mb']
+            with self._lock:
+                self.worker_memory[worker_id] = stats
+        return result
+
+    def mark_processed(self, result):
+        """Store the post-processed screenshot path for a submitted row"""
+        if self.ledger and result.key:
+            self.ledger.set_result(result.key, result.screenshot_path)
+
+    def mark_emailed(self, result):
+        if self.ledger and result.key:
+            self.ledger.advance(result.key, EMAILED)
+
+    def record(self, result):
+        """Store a RowResult, append it to the results file and print it"""
+        if result.dropped:
+            # Not this node's row any more: it isn't counted or reported as a failure
+            with self._lock:
+                self.counts['dropped'] += 1
+            print(f"↷ Row {result.row_number} [worker {result.worker_id}] dropped "
+                  f"(lease lost; the row was handed to another worker)")
+            return
+        with self._lock:
+            self.tally(result)
+            if self._results_file:
+                self._results_file.write(json.dumps(result.to_dict()) + '\n')
+                self._results_file.flush()
+        if self.on_result:
+            self.on_result(result)
+        if result.held:
+            print(f"⏸ Row {result.row_number} [worker {result.worker_id}] held: filled in an "
+                  f"earlier run but never confirmed (check the form's responses, then rerun "
+                  f"with --retry-ambiguous if it is missing)")
+            return
+        status = '✓' if result.success and result.emailed is not False else '✗'
+        detail = result.screenshot_path if result.success else result.error
+        if result.skipped:
+            detail = f"already {result.ledger_state} in an earlier run"
+        if result.emailed is not None:
+            detail = f"{detail} (email {'sent' if result.emailed else 'failed'})"
+        print(f"{status} Row {result.row_number} [worker {result.worker_id}] "
+              f"{result.duration:.1f}s - {detail}")
+
+    def tally(self, result):
+        """Add a finished row to the running totals (call with the lock held)"""
+        self.counts['total'] += 1
+        if result.success:
+            self.counts['succeeded'] += 1
+        elif result.held:
+            self.counts['held'] += 1
+        else:
+            self.counts['failed'] += 1
+            if len(self.failed_rows) < FAILED_ROWS_SAMPLE:
+                self.failed_rows.append(result.row_number)
+        if result.skipped:
+            self.counts['skipped'] += 1
+        # Only count emails sent by this run, not ones the ledger says went out before
+        if result.emailed and result.ledger_state != EMAILED:
+            self.counts['emailed'] += 1
+        if result.page_load:
+            self.counts['page_loads'] += 1
+            self.transfer_kb += result.page_load['transfer_kb']
+
+    def run(self, rows):
+        """Submit every (row_number, form_data) pair and return a summary dict"""
+        print(f"\n🚀 Starting {self.mode} batch with {self.workers} worker(s)...")
+        self.reap_orphans()
+        if self.prewarm:
+            self.start_prewarm()
+        self.open_results()
+
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"form-worker-{i}", daemon=True)
+            for i in range(1, self.workers + 1)
+        ]
+        for t in threads:
+            t.start()
+        try:
+            for job in rows:
+                self.jobs.put(job)
+        finally:
+            for _ in threads:
+                self.jobs.put(_STOP)
+            for t in threads:
+                t.join()
+            self.shutdown()
+
+        return self.summary(time.perf_counter() - start)
+
+    def summary(self, elapsed):
+        total, succeeded = self.counts['total'], self.counts['succeeded']
+        return {
+            'total': total,
+            'succeeded': succeeded,
+            'failed': self.counts['failed'],
+            'elapsed': round(elapsed, 2),
+            'per_minute': round(total / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            'failed_rows': sorted(self.failed_rows),
+            'skipped': self.counts['skipped'],
+            'held': self.counts['held'],
+            'dropped': self.counts['dropped'],
+            'page_loads': self.counts['page_loads'],
+            'transfer_kb': round(self.transfer_kb, 1),
+            'submit_rate': self.submit_limiter.summary() if self.submit_limiter else None,
+            'browser_memory': dict(sorted(self.worker_memory.items())),
+            'evidence': dict(self.evidence.summary(), path=self.evidence.path)
+                        if self.evidence else None,
+        }
+
+
+def print_summary(summary):
+    print("\n" + "-" * 80)
+    print("BATCH SUMMARY:")
+    print("-" * 80)
+    print(f"Rows: {summary['total']}  ✓ {summary['succeeded']}  ✗ {summary['failed']}")
+    if summary['skipped']:
+        print(f"Skipped (already submitted in an earlier run): {summary['skipped']}")
+    if summary.get('held'):
+        print(f"Held (filled in an earlier run but never confirmed): {summary['held']} "
+              f"- check the form's responses, then rerun with --retry-ambiguous")
+    if summary.get('dropped'):
+        print(f"Dropped (lease lost, handed to another worker): {summary['dropped']}")
+    print(f"Elapsed: {summary['elapsed']}s  Throughput: {summary['per_minute']} submissions/min")
+    if summary['page_loads']:
+        avg_kb = summary['transfer_kb'] / summary['page_loads']
+        print(f"Bandwidth: {summary['transfer_kb']} KB over {summary['page_loads']} page loads "
+              f"({avg_kb:.1f} KB/load)")
+    if summary['submit_rate']:
+        print_limiter(summary['submit_rate'], 'submissions')
+    if summary.get('browser_memory'):
+        print("Browser memory per worker:")
+        for worker_id, m in summary['browser_memory'].items():
+            print(f"  worker {worker_id}: now {m['last_mb']} MB, peak {m['peak_mb']} MB, "
+                  f"{m['submissions']} responses, {m['recycles']} recycle(s)")
+    if summary.get('evidence'):
+        from src.evidence import print_evidence
+        print_evidence(summary['evidence'], summary['evidence']['path'])
+    if summary['failed_rows']:
+        more = summary['failed'] - len(summary['failed_rows'])
+        print(f"Failed rows: {', '.join(map(str, summary['failed_rows']))}"
+              + (f" (and {more} more)" if more > 0 else ""))
+    print("-" * 80)
+
+
+def run_batch(form_url, input_path, workers=2, results_path=None, mode='browser',
+              min_delay=0.0, fill_strategy='keys', headless=False, prewarm=False,
+              page_load_strategy='normal', blocked_resources=(), blocked_urls=(),
+              schema_cache=None, screenshot_element=None, ledger=None, field_retry=None,
+              page_retry=None, breaker=None, submit_limiter=None, rows=None, on_result=None,
+              recycle_policy=None, evidence=None, should_submit=None, retry_ambiguous=False):
+    """
+    Convenience function to submit every row of a CSV/JSONL file
+    (or of `rows`, an iterable of (row_number, form_data) pairs, when given)
+    """
+    runner = BatchRunner(form_url, workers=workers, results_path=results_path, mode=mode,
+                         min_delay=min_delay, fill_strategy=fill_strategy,
+                         headless=headless, prewarm=prewarm,
+                         page_load_strategy=page_load_strategy,
+                         blocked_resources=blocked_resources, blocked_urls=blocked_urls,
+                         schema_cache=schema_cache, screenshot_element=screenshot_element,
+                         ledger=ledger, field_retry=field_retry, page_retry=page_retry,
+                         breaker=breaker, submit_limiter=submit_limiter, on_result=on_result,
+                         recycle_policy=recycle_policy, evidence=evidence,
+                         should_submit=should_submit, retry_ambiguous=retry_ambiguous)
+    summary = runner.run(read_rows(input_path) if rows is None else rows)
+    print_summary(summary)
+    return summary
@@ -0,0 +1,195 @@
+"""
+Browser Health
+Keeps long-running browser workers within bounds: measures the memory of a
+driver's process tree, decides when a browser should be recycled, and reaps
+chromedriver / Chrome processes left behind by workers that died without
+quitting their browser. Process inspection reads /proc, so it is Linux-only;
+elsewhere the helpers return None / 0 and recycling falls back to counts.
+"""
+import os
+import signal
+import threading
+import time
+
+# Chrome started by chromedriver always gets this flag; a hand-opened Chrome doesn't
+AUTOMATION_FLAG = '--remote-debugging-port='
+BROWSER_NAMES = ('chrome', 'chromium', 'chromium-browse', 'google-chrome', 'headless_shell')
+
+
+def _rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _process_table():
+    """{pid: (ppid, command name)} for every process, or {} off Linux"""
+    table = {}
+    if not os.path.isdir('/proc'):
+        return table
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', encoding='ascii', errors='replace') as f:
+                stat = f.read()
+            # The command name may contain spaces; fields after ')' are fixed
+            name = stat[stat.index('(') + 1:stat.rindex(')')]
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        table[int(entry)] = (ppid, name)
+    return table
+
+
+def process_tree_rss_mb(root_pid=None):
+    """RSS of a process plus every descendant (Chrome, chromedriver), or None off Linux"""
+    if not os.path.isdir('/proc'):
+        return None
+    root_pid = root_pid or os.getpid()
+    children = {}
+    for pid, (ppid, _) in _process_table().items():
+        children.setdefault(ppid, []).append(pid)
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += _rss_kb(pid)
+        stack.extend(children.get(pid, ()))
+    return total / 1024
+
+
+# chromedriver PIDs of sessions this process started and hasn't quit yet
+_live_drivers = set()
+_live_lock = threading.Lock()
+
+
+def _driver_pid(driver):
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def register_driver(driver):
+    """Mark a session's chromedriver as live, so it is never reaped as an orphan"""
+    pid = _driver_pid(driver)
+    if pid:
+        with _live_lock:
+            _live_drivers.add(pid)
+
+
+def unregister_driver(driver):
+    with _live_lock:
+        _live_drivers.discard(_driver_pid(driver))
+
+
+def _descendants(table, roots):
+    """The given PIDs plus every process below them"""
+    children = {}
+    for pid, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    found, stack = set(), list(roots)
+    while stack:
+        pid = stack.pop()
+        if pid not in found:
+            found.add(pid)
+            stack.extend(children.get(pid, ()))
+    return found
+
+
+def driver_rss_mb(driver):
+    """Memory of one Selenium session: its chromedriver and every Chrome process under it"""
+    pid = _driver_pid(driver)
+    return process_tree_rss_mb(pid) if pid else None
+
+
+class RecyclePolicy:
+    """
+    When to replace a worker's browser with a fresh one:
+    after `max_submissions` responses, or once its process tree uses more than
+    `max_rss_mb` (0 / None disables either limit).
+    """
+
+    def __init__(self, max_submissions=200, max_rss_mb=1200):
+        self.max_submissions = max_submissions or 0
+        self.max_rss_mb = max_rss_mb or 0
+
+    def reason(self, submissions, rss_mb):
+        """Why the browser should be recycled now, or None"""
+        if self.max_submissions and submissions >= self.max_submissions:
+            return f"{submissions} submissions"
+        if self.max_rss_mb and rss_mb and rss_mb > self.max_rss_mb:
+            return f"{rss_mb:.0f} MB RSS"
+        return None
+
+
+def _cmdline(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def _owned(pid):
+    try:
+        return os.stat(f'/proc/{pid}').st_uid == os.getuid()
+    except OSError:
+        return False
+
+
+def find_orphaned_drivers():
+    """
+    PIDs of chromedriver processes, and Chrome processes started by one, whose
+    parent has died (they were re-parented to init or a subreaper).
+    Only processes owned by the current user are considered, and never this
+    process's own descendants or a live session's processes.
+    When this process is PID 1 (e.g. a container's main process) nothing is
+    reported: every re-parented process is then our child, sibling workers'
+    live drivers included.
+    """
+    if os.getpid() == 1:
+        return []
+    table = _process_table()
+    with _live_lock:
+        live = set(_live_drivers)
+    protected = _descendants(table, live | {os.getpid()})
+    orphans = []
+    for pid, (ppid, name) in table.items():
+        if pid in protected:
+            continue
+        parent = table.get(ppid, (None, ''))[1]
+        if ppid != 1 and parent not in ('systemd', 'init'):
+            continue
+        if name == 'chromedriver' or (name in BROWSER_NAMES and AUTOMATION_FLAG in _cmdline(pid)):
+            if _owned(pid):
+                orphans.append(pid)
+    return orphans
+
+
+def reap_orphaned_drivers(grace=3.0):
+    """Terminate orphaned chromedriver / Chrome processes; returns how many were found"""
+    orphans = find_orphaned_drivers()
+    if not orphans:
+        return 0
+    for pid in orphans:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline and any(os.path.exists(f'/proc/{pid}') for pid in orphans):
+        time.sleep(0.1)
+    for pid in orphans:
+        if os.path.exists(f'/proc/{pid}'):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+    print(f"🧹 Reaped {len(orphans)} orphaned chromedriver/Chrome process(es)")
+    return len(orphans)
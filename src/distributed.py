@@ -0,0 +1,486 @@
+"""
+Distributed Workers
+A coordinator process shards a job file into leases and hands them out over a
+small JSON-over-HTTP protocol; worker processes on any number of machines pull
+leases and run the rows through the usual fill -> submit -> email flow.
+
+    POST /hello      -> form URL and lease settings
+    POST /lease      -> up to `lease_size` rows, {"wait": s} or {"done": true}
+    POST /heartbeat  -> extend the caller's leases, report which were lost and
+                        which of their rows were revoked (done elsewhere)
+    POST /report     -> the result of one row
+
+A lease that is not extended before it expires (the worker died or hung) goes
+back in the queue and its unfinished rows are handed to another worker. Workers
+check that a row's lease is still held right before submitting it, so rows
+queued locally from a lost lease are dropped rather than submitted twice.
+"""
+import collections
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.batch_runner import FAILED_ROWS_SAMPLE, read_rows
+from src.ledger import SUBMITTED, is_ambiguous, is_done, job_key
+
+DEFAULT_PORT = 8765
+TOKEN_HEADER = 'X-Coordinator-Token'
+
+
+class Lease:
+    """Rows handed to one worker node, valid until `expires`"""
+
+    def __init__(self, node, rows, ttl):
+        self.id = uuid.uuid4().hex[:12]
+        self.node = node
+        # row_number -> form_data for rows not reported yet
+        self.rows = dict(rows)
+        self.expires = time.monotonic() + ttl
+
+
+class Coordinator:
+    """
+    Serves leases for one job file.
+    lease_size: rows per lease; lease_ttl: seconds a lease lives without a heartbeat.
+    A row whose submission failed is handed out again until it was tried `max_attempts` times.
+    """
+
+    def __init__(self, form_url, rows, host='127.0.0.1', port=DEFAULT_PORT, lease_size=10,
+                 lease_ttl=120.0, max_attempts=2, ledger=None, results_path=None, token=None,
+                 retry_ambiguous=False):
+        self.form_url = form_url
+        self.host = host
+        self.port = port
+        self.lease_size = max(1, int(lease_size))
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max(1, int(max_attempts))
+        # Optional SubmissionLedger: rows submitted by an earlier run are never handed out
+        self.ledger = ledger
+        # Hand out rows an earlier run left filled-but-unconfirmed instead of holding them
+        self.retry_ambiguous = retry_ambiguous
+        self.results_path = results_path
+        self.token = token or None
+        self._rows = iter(rows)
+        self._exhausted = False
+        self._requeued = collections.deque()
+        # lease id -> rows taken out of that (still active) lease, told at the next heartbeat
+        self._revoked = collections.defaultdict(set)
+        self._attempts = collections.Counter()
+        self.leases = {}
+        self.results = {}
+        self.nodes = collections.Counter()
+        self.skipped = 0
+        self.held = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._results_file = None
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _next_row(self):
+        """Next row to hand out: reassigned rows first, then the job file"""
+        if self._requeued:
+            return self._requeued.popleft()
+        while not self._exhausted:
+            try:
+                row_number, form_data = next(self._rows)
+            except StopIteration:
+                self._exhausted = True
+                break
+            if self.ledger:
+                job = self.ledger.begin(job_key(self.form_url, form_data), self.form_url, row_number)
+                if is_done(job['state'], SUBMITTED):
+                    self.skipped += 1
+                    continue
+                if is_ambiguous(job['state']) and not self.retry_ambiguous:
+                    # The form may already have it: don't risk a duplicate
+                    self.held += 1
+                    print(f"⏸ Row {row_number} held: filled in an earlier run but never confirmed")
+                    continue
+            return row_number, form_data
+        return None
+
+    def _expire(self):
+        """Requeue the unfinished rows of leases nobody extended in time"""
+        now = time.monotonic()
+        for lease in [l for l in self.leases.values() if l.expires <= now]:
+            del self.leases[lease.id]
+            self._revoked.pop(lease.id, None)
+            self.expired += 1
+            self._requeued.extend(lease.rows.items())
+            print(f"⏰ Lease {lease.id} from {lease.node} expired, "
+                  f"reassigning {len(lease.rows)} row(s)")
+
+    def _check_finished(self):
+        if self._exhausted and not self._requeued and not self.leases:
+            self._finished.set()
+
+    def lease(self, node):
+        with self._lock:
+            self._expire()
+            rows = []
+            while len(rows) < self.lease_size:
+                row = self._next_row()
+                if row is None:
+                    break
+                rows.append(row)
+            if not rows:
+                self._check_finished()
+                if self._finished.is_set():
+                    return {'done': True}
+                # Rows are still out on other leases and may come back if those expire
+                return {'wait': min(5.0, self.lease_ttl / 4)}
+            lease = Lease(node, rows, self.lease_ttl)
+            self.leases[lease.id] = lease
+        return {'lease': lease.id, 'ttl': self.lease_ttl, 'rows': rows}
+
+    def heartbeat(self, lease_ids):
+        """
+        Extend live leases; returns the ids that were already expired or finished,
+        and the rows of live leases that must not be submitted any more
+        """
+        with self._lock:
+            lost, revoked = [], []
+            for lease_id in lease_ids:
+                lease = self.leases.get(lease_id)
+                if lease is None:
+                    lost.append(lease_id)
+                else:
+                    lease.expires = time.monotonic() + self.lease_ttl
+                    revoked.extend(self._revoked.pop(lease_id, ()))
+        return {'lost': lost, 'revoked': revoked}
+
+    def _withdraw(self, row_number):
+        """
+        Take a row that already went through out of the requeue and any active
+        lease; returns its form_data if it was found
+        """
+        form_data = None
+        for row in list(self._requeued):
+            if row[0] == row_number:
+                self._requeued.remove(row)
+                form_data = row[1]
+        for lease in list(self.leases.values()):
+            if row_number in lease.rows:
+                form_data = lease.rows.pop(row_number)
+                self._revoked[lease.id].add(row_number)
+                if not lease.rows:
+                    del self.leases[lease.id]
+                    self._revoked.pop(lease.id, None)
+        return form_data
+
+    def report(self, node, lease_id, result):
+        row_number = result['row']
+        with self._lock:
+            lease = self.leases.get(lease_id)
+            form_data = lease.rows.pop(row_number, None) if lease else None
+            if lease and not lease.rows:
+                del self.leases[lease_id]
+            if row_number in self.results and self.results[row_number]['success']:
+                # A late report for a row that was reassigned and already went through
+                return {'ok': True}
+            if form_data is None and result['success']:
+                # Its lease expired but the row did go through: don't hand it out again,
+                # and take it back from a node it was already reassigned to
+                form_data = self._withdraw(row_number)
+            self._attempts[row_number] += 1
+            if (not result['success'] and not result.get('held') and form_data is not None
+                    and self._attempts[row_number] < self.max_attempts):
+                # Give another node a go (e.g. this one could not start a browser)
+                self._requeued.append((row_number, form_data))
+            result = dict(result, node=node)
+            self.results[row_number] = result
+            self.nodes[node] += 1
+            if self._results_file:
+                self._results_file.write(json.dumps(result) + '\n')
+                self._results_file.flush()
+            self._check_finished()
+        if self.ledger and result['success'] and form_data is not None:
+            key = job_key(self.form_url, form_data)
+            self.ledger.advance(key, SUBMITTED, result.get('screenshot'))
+        status = '✓' if result['success'] and result.get('emailed') is not False else '✗'
+        print(f"{status} Row {row_number} [{node}] - "
+              f"{result.get('screenshot') if result['success'] else result.get('error')}")
+        return {'ok': True}
+
+    def hello(self):
+        return {'form_url': self.form_url, 'lease_size': self.lease_size,
+                'lease_ttl': self.lease_ttl}
+
+    def start(self):
+        coordinator = self
+        routes = {
+            '/hello': lambda body: coordinator.hello(),
+            '/lease': lambda body: coordinator.lease(body['node']),
+            '/heartbeat': lambda body: coordinator.heartbeat(body.get('leases', [])),
+            '/report': lambda body: coordinator.report(body['node'], body['lease'], body['result']),
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _send(self, payload, status=200):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                if coordinator.token and self.headers.get(TOKEN_HEADER) != coordinator.token:
+                    return self._send({'error': 'bad token'}, 403)
+                route = routes.get(self.path)
+                if route is None:
+                    return self._send({'error': 'not found'}, 404)
+                try:
+                    self._send(route(json.loads(body or b'{}')))
+                except (KeyError, TypeError, ValueError) as e:
+                    self._send({'error': f'bad request: {e}'}, 400)
+
+            def log_message(self, *args):
+                pass
+
+        if self.results_path:
+            self._results_file = open(self.results_path, 'a', encoding='utf-8')
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='coordinator',
+                         daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._results_file:
+            self._results_file.close()
+            self._results_file = None
+
+    def run(self, linger=5.0):
+        """
+        Serve leases until every row is reported, then return a batch summary.
+        The server stays up `linger` seconds longer so idle workers hear they are done.
+        """
+        start = time.perf_counter()
+        if self._server is None:
+            self.start()
+        print(f"\n🛰 Coordinator listening on {self.url} "
+              f"({self.lease_size} rows/lease, {self.lease_ttl:g}s TTL)")
+        try:
+            while not self._finished.wait(1.0):
+                with self._lock:
+                    self._expire()
+                    self._check_finished()
+            time.sleep(linger)
+        finally:
+            self.stop()
+        return self.summary(time.perf_counter() - start)
+
+    def summary(self, elapsed):
+        results = list(self.results.values())
+        succeeded = sum(1 for r in results if r['success'])
+        held = sum(1 for r in results if r.get('held'))
+        total = len(results) + self.skipped + self.held
+        return {
+            'total': total,
+            'succeeded': succeeded + self.skipped,
+            'failed': len(results) - succeeded - held,
+            'elapsed': round(elapsed, 2),
+            'per_minute': round(len(results) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            'failed_rows': sorted(r['row'] for r in results
+                                  if not r['success'] and not r.get('held'))[:FAILED_ROWS_SAMPLE],
+            'skipped': self.skipped,
+            'held': self.held + held,
+            'page_loads': 0,
+            'transfer_kb': 0.0,
+            'submit_rate': None,
+            'emailed': sum(1 for r in results if r.get('emailed')),
+            'expired_leases': self.expired,
+            'nodes': dict(self.nodes),
+        }
+
+
+class LeaseClient:
+    """
+    Worker-side connection to a Coordinator.
+    rows() yields (row_number, form_data) from successive leases, so it can feed
+    BatchRunner.run / SubmissionPipeline.run directly; report(result) is the
+    runner's on_result hook. A background thread keeps held leases alive.
+    """
+
+    def __init__(self, url, token=None, node=None, timeout=10.0, retry=None):
+        import requests
+        from src.retry import RetryPolicy
+        self.url = url.rstrip('/')
+        self.node = node or f"{socket.gethostname()}-{os.getpid()}"
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy(5, 0.5, 8.0)
+        self.session = requests.Session()
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+        self._connection_errors = (requests.exceptions.ConnectionError,
+                                   requests.exceptions.Timeout)
+        # lease id -> row numbers not reported yet
+        self._held = {}
+        self._row_lease = {}
+        self._lost = set()
+        # lease id -> when the coordinator will expire it, as last extended (monotonic)
+        self._expires = {}
+        # Rows the coordinator took back from a lease we still hold
+        self._revoked = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self.lease_ttl = None
+
+    def _post(self, path, payload=None):
+        def post():
+            response = self.session.post(self.url + path, json=payload or {}, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        return self.retry.call(post, retry_if=lambda result: False,
+                               retry_on=self._connection_errors)
+
+    def hello(self):
+        """Fetch the coordinator's settings (form URL, lease TTL)"""
+        info = self._post('/hello')
+        self.lease_ttl = info['lease_ttl']
+        return info
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.lease_ttl / 3):
+            with self._lock:
+                lease_ids = list(self._held)
+            if not lease_ids:
+                continue
+            sent = time.monotonic()
+            try:
+                reply = self._post('/heartbeat', {'leases': lease_ids})
+            except Exception as e:
+                print(f"⚠ Heartbeat to coordinator failed: {e}")
+                continue
+            lost, revoked = reply['lost'], reply.get('revoked', [])
+            with self._lock:
+                for lease_id in lease_ids:
+                    if lease_id not in lost and lease_id in self._expires:
+                        self._expires[lease_id] = sent + self.lease_ttl
+                self._lost.update(lost)
+                for lease_id in lost:
+                    self._held.pop(lease_id, None)
+                    self._expires.pop(lease_id, None)
+                self._revoked.update(revoked)
+            if lost:
+                print(f"⚠ Lost {len(lost)} lease(s) to expiry; their unstarted rows are skipped")
+
+    def holds(self, row_number):
+        """
+        Whether this node may still submit a row: its lease is held, not known to
+        be lost, not past its expiry (e.g. heartbeats failing) and the row wasn't
+        revoked. Used as BatchRunner's should_submit, right before each submission.
+        """
+        with self._lock:
+            lease_id = self._row_lease.get(row_number)
+            ok = (lease_id in self._held and row_number not in self._revoked and
+                  time.monotonic() < self._expires.get(lease_id, 0))
+            if not ok:
+                # report() is never called for a dropped row; forget it here
+                self._row_lease.pop(row_number, None)
+                self._revoked.discard(row_number)
+                held = self._held.get(lease_id)
+                if held is not None:
+                    held.discard(row_number)
+                    if not held:
+                        del self._held[lease_id]
+                        self._expires.pop(lease_id, None)
+            return ok
+
+    def rows(self):
+        if self.lease_ttl is None:
+            self.hello()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name='lease-heartbeat',
+                                           daemon=True)
+        self._heartbeat.start()
+        try:
+            while True:
+                granted = time.monotonic()
+                try:
+                    reply = self._post('/lease', {'node': self.node})
+                except self._connection_errors:
+                    # The coordinator shuts down shortly after the last row is reported
+                    print("⚠ Coordinator unreachable, stopping")
+                    return
+                if reply.get('done'):
+                    return
+                if 'wait' in reply:
+                    time.sleep(reply['wait'])
+                    continue
+                lease_id = reply['lease']
+                print(f"📥 Lease {lease_id}: {len(reply['rows'])} row(s)")
+                with self._lock:
+                    self._held[lease_id] = {row_number for row_number, _ in reply['rows']}
+                    self._expires[lease_id] = granted + reply['ttl']
+                    for row_number, _ in reply['rows']:
+                        self._row_lease[row_number] = lease_id
+                for row_number, form_data in reply['rows']:
+                    with self._lock:
+                        if lease_id in self._lost:
+                            break
+                    yield row_number, form_data
+        finally:
+            self._stop.set()
+
+    def report(self, result):
+        """Send one finished RowResult to the coordinator"""
+        with self._lock:
+            lease_id = self._row_lease.pop(result.row_number, None)
+            held = self._held.get(lease_id)
+            if held is not None:
+                held.discard(result.row_number)
+                if not held:
+                    del self._held[lease_id]
+                    self._expires.pop(lease_id, None)
+        try:
+            self._post('/report', {'node': self.node, 'lease': lease_id,
+                                   'result': result.to_dict()})
+        except Exception as e:
+            # The lease will expire and the row will be retried elsewhere
+            print(f"⚠ Could not report row {result.row_number}: {e}")
+
+    def close(self):
+        self._stop.set()
+        self.session.close()
+
+
+def run_coordinator(form_url, input_path, host='127.0.0.1', port=DEFAULT_PORT, lease_size=10,
+                    lease_ttl=120.0, max_attempts=2, ledger=None, results_path=None, token=None,
+                    rows=None, retry_ambiguous=False):
+    """
+    Convenience function to serve a CSV/JSONL file to distributed workers
+    (or `rows`, an iterable of (row_number, form_data) pairs, when given)
+    """
+    from src.batch_runner import print_summary
+    rows = read_rows(input_path) if rows is None else rows
+    coordinator = Coordinator(form_url, rows, host=host, port=port,
+                              lease_size=lease_size, lease_ttl=lease_ttl,
+                              max_attempts=max_attempts, ledger=ledger,
+                              results_path=results_path, token=token,
+                              retry_ambiguous=retry_ambiguous)
+    summary = coordinator.run()
+    print_summary(summary)
+    print(f"Emails sent: {summary['emailed']}  Expired leases: {summary['expired_leases']}")
+    print("Rows per node: " + ", ".join(f"{n} {c}" for n, c in summary['nodes'].items()))
+    return summary
@@ -0,0 +1,251 @@
+"""
+Chrome Driver Management
+Cached chromedriver resolution, Chrome option profiles and a pool of
+pre-spawned browser sessions that can be warmed up before jobs arrive.
+"""
+import json
+import os
+import queue
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from src.browser_health import register_driver, unregister_driver
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'chromedriver.json')
+
+# URL patterns (Network.setBlockedURLs syntax) for each blockable resource type.
+# None of these are needed to fill text fields on a Google Form.
+RESOURCE_PATTERNS = {
+    'image': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico'],
+    'font': ['*.woff2', '*.woff', '*.ttf', '*.otf', '*fonts.gstatic.com*'],
+    'media': ['*.mp4', '*.webm', '*.mp3'],
+    'analytics': ['*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+                  '*/log?format=*', '*/gen_204*'],
+}
+
+# Driver paths already resolved by this process, keyed by cache path
+_resolved = {}
+_resolve_lock = threading.Lock()
+
+
+def get_chrome_version():
+    """Return the installed Chrome version (local command, no network), or None"""
+    try:
+        from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+        return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception:
+        return None
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def resolve_driver_path(cache_path=DEFAULT_CACHE_PATH):
+    """
+    Return a chromedriver path for the installed Chrome.
+    The path is cached on disk keyed by Chrome version, so webdriver_manager's
+    version checks only run again after Chrome is updated.
+    Returns None if no driver could be resolved (caller falls back to PATH).
+    """
+    with _resolve_lock:
+        if cache_path not in _resolved:
+            _resolved[cache_path] = _resolve_driver_path(cache_path)
+        return _resolved[cache_path]
+
+
+def _resolve_driver_path(cache_path):
+    version = get_chrome_version()
+    cache = _load_cache(cache_path)
+    cached = cache.get(version) if version else None
+    if cached and os.path.exists(cached):
+        return cached
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        from webdriver_manager.core.os_manager import ChromeType
+    except ImportError:
+        print("ℹ webdriver_manager not found. Assuming chromedriver is in PATH.")
+        return None
+    try:
+        driver_path = ChromeDriverManager(chrome_type=ChromeType.GOOGLE).install()
+    except Exception as e:
+        print(f"ℹ Webdriver manager failed ({e}). Assuming chromedriver is in PATH.")
+        return None
+
+    if version:
+        cache[version] = driver_path
+        try:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=2)
+        except OSError as e:
+            print(f"⚠ Could not write driver cache: {e}")
+    return driver_path
+
+
+def blocked_url_patterns(resource_types=(), urls=()):
+    """Combine the patterns for the given resource types with any extra URL patterns"""
+    patterns = []
+    for resource_type in resource_types:
+        if resource_type not in RESOURCE_PATTERNS:
+            raise ValueError(f"Unknown resource type to block: {resource_type} "
+                             f"(use {', '.join(RESOURCE_PATTERNS)})")
+        patterns.extend(RESOURCE_PATTERNS[resource_type])
+    patterns.extend(urls)
+    return patterns
+
+
+def build_chrome_options(headless=False, page_load_strategy='normal', blocked_resources=()):
+    """Chrome options; headless=True gives a low-footprint profile for display-less hosts"""
+    chrome_options = webdriver.ChromeOptions()
+    # 'eager' returns from driver.get() at DOMContentLoaded instead of waiting for every subresource
+    chrome_options.page_load_strategy = page_load_strategy
+    if 'image' in blocked_resources:
+        # Also stops images that have no file extension in their URL
+        chrome_options.add_experimental_option(
+            'prefs', {'profile.managed_default_content_settings.images': 2}
+        )
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if headless:
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--window-size=1280,2000')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_argument('--disable-default-apps')
+        chrome_options.add_argument('--disable-sync')
+        chrome_options.add_argument('--no-first-run')
+        chrome_options.add_argument('--mute-audio')
+    else:
+        chrome_options.add_argument('--start-maximized')
+    return chrome_options
+
+
+def create_driver(headless=False, cache_path=DEFAULT_CACHE_PATH, page_load_strategy='normal',
+                  blocked_resources=(), blocked_urls=()):
+    """Start a Chrome session using the cached driver path (or chromedriver from PATH)"""
+    chrome_options = build_chrome_options(headless, page_load_strategy, blocked_resources)
+    driver_path = resolve_driver_path(cache_path)
+    driver = None
+    if driver_path:
+        try:
+            driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+        except Exception as e:
+            print(f"ℹ Cached driver failed ({e}). Assuming chromedriver is in PATH.")
+    if driver is None:
+        driver = webdriver.Chrome(options=chrome_options)
+    block_urls(driver, blocked_url_patterns(blocked_resources, blocked_urls))
+    register_driver(driver)
+    return driver
+
+
+def block_urls(driver, patterns):
+    """Block matching requests through the Chrome DevTools Protocol"""
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+    except Exception as e:
+        print(f"⚠ Could not block URLs via CDP: {e}")
+
+
+# Navigation timing plus bytes transferred for the document and every subresource
+PAGE_LOAD_STATS_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? nav.transferSize : 0;
+for (var i = 0; i < resources.length; i++) bytes += resources[i].transferSize || 0;
+return {
+    dom_content_loaded_ms: nav ? Math.round(nav.domContentLoadedEventEnd - nav.startTime) : null,
+    load_ms: nav && nav.loadEventEnd ? Math.round(nav.loadEventEnd - nav.startTime) : null,
+    requests: resources.length + 1,
+    transfer_kb: Math.round(bytes / 102.4) / 10
+};
+"""
+
+
+def page_load_stats(driver):
+    """Return page-load timing and bandwidth for the current document, or None"""
+    try:
+        return driver.execute_script(PAGE_LOAD_STATS_JS)
+    except Exception:
+        return None
+
+
+class DriverPool:
+    """Pre-spawns Chrome sessions in the background so jobs don't wait for cold starts"""
+
+    def __init__(self, size=1, headless=False, warm_url=None, cache_path=DEFAULT_CACHE_PATH,
+                 page_load_strategy='normal', blocked_resources=(), blocked_urls=()):
+        self.size = max(0, int(size))
+        self.headless = headless
+        self.page_load_strategy = page_load_strategy
+        self.blocked_resources = blocked_resources
+        self.blocked_urls = blocked_urls
+        # Loading the form once warms DNS, TLS and the HTTP cache for the first real job
+        self.warm_url = warm_url
+        self.cache_path = cache_path
+        self._ready = queue.Queue()
+        self._threads = []
+        # Pre-spawned sessions not yet handed out by acquire()
+        self._remaining = 0
+        self._lock = threading.Lock()
+
+    def _create(self):
+        return create_driver(self.headless, self.cache_path, self.page_load_strategy,
+                             self.blocked_resources, self.blocked_urls)
+
+    def _spawn(self):
+        try:
+            driver = self._create()
+            if self.warm_url:
+                driver.get(self.warm_url)
+        except Exception as e:
+            print(f"⚠ Could not pre-spawn browser: {e}")
+            driver = None
+        self._ready.put(driver)
+
+    def start(self):
+        """Begin spawning `size` sessions in parallel; returns immediately"""
+        self._remaining = self.size
+        for i in range(self.size):
+            t = threading.Thread(target=self._spawn, name=f"driver-prespawn-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def acquire(self, timeout=60):
+        """Take a warm session, or start a fresh one if none were pre-spawned"""
+        with self._lock:
+            take = self._remaining > 0
+            if take:
+                self._remaining -= 1
+        if take:
+            try:
+                driver = self._ready.get(timeout=timeout)
+                if driver is not None:
+                    return driver
+            except queue.Empty:
+                pass
+        return self._create()
+
+    def close(self):
+        """Quit any pre-spawned sessions that were never handed out"""
+        for t in self._threads:
+            t.join()
+        while not self._ready.empty():
+            driver = self._ready.get_nowait()
+            if driver is not None:
+                driver.quit()
+                unregister_driver(driver)
@@ -1,39 +1,24 @@
 """
-Email Sender Module using Flask-Mail
-Handles automated email sending with attachments
+Email Sender Module
+Builds the submission email with the standard library (email + smtplib) and
+handles automated sending with attachments. Flask-Mail is still available as a
+transport (MAIL_TRANSPORT=flask) and is only imported when that is selected.
 """
+import mimetypes
 import os
-from flask import Flask
-from flask_mail import Mail, Message
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from email.utils import formatdate, getaddresses, make_msgid
 from config.config import Config
+from src.mail_templates import MailTemplate, default_attachment_cache, message_bytes
+from src.profiling import span
+from src.smtp_pool import SMTPConnection, SMTPPool
 
 
-class EmailSender:
-    """Class to handle email sending via Flask-Mail"""
-    
-    def __init__(self):
-        self.app = Flask(__name__)
-        self.configure_mail()
-        self.mail = Mail(self.app)
-    
-    def configure_mail(self):
-        """Configure Flask-Mail with settings from Config"""
-        self.app.config['MAIL_SERVER'] = Config.MAIL_SERVER
-        self.app.config['MAIL_PORT'] = Config.MAIL_PORT
-        self.app.config['MAIL_USERNAME'] = Config.MAIL_USERNAME
-        self.app.config['MAIL_PASSWORD'] = Config.MAIL_PASSWORD
-        self.app.config['MAIL_USE_TLS'] = Config.MAIL_USE_TLS
-        self.app.config['MAIL_USE_SSL'] = Config.MAIL_USE_SSL
-        self.app.config['MAIL_DEFAULT_SENDER'] = Config.MAIL_USERNAME
-    
-    def send_assignment_email(self, screenshot_path, github_repo, your_name, 
-                             resume_path=None, work_samples=None):
-        """Send assignment submission email with all requirements"""
-        with self.app.app_context():
-            try:
-                subject = f"Python (Selenium) Assignment - {your_name}"
-                
-                body = f"""
+# Compiled once; only the per-recipient values are filled in per message
+ASSIGNMENT_SUBJECT = MailTemplate("Python (Selenium) Assignment - {your_name}")
+
+ASSIGNMENT_BODY = MailTemplate("""
 Dear Team,
 
 Please find my submission for the Python (Selenium) Assignment below:
@@ -104,15 +89,7 @@ Please find my submission for the Python (Selenium) Assignment below:
    - Google Drive Link: https://drive.google.com/file/d/1WwSMp1mVCAT9qhhOriW47HjJb-bf3U8Z/view?usp=sharing
 
 5. Links to Past Projects/Work Samples:
-"""
-                
-                if work_samples:
-                    for i, sample in enumerate(work_samples, 1):
-                        body += f"\n   {i}. {sample}"
-                else:
-                    body += f"\n   - GitHub: {github_repo}"
-                
-                body += f"""
+{work_samples}
 
 6. Availability Confirmation:
    Yes, I confirm my availability to work full time (10 AM to 7 PM) 
@@ -133,69 +110,204 @@ Thank you for considering my submission. I look forward to hearing from you.
 
 Best regards,
 {your_name}
-                """
-                
-                # Create message
-                msg = Message(
-                    subject=subject,
-                    sender=Config.MAIL_USERNAME,
-                    recipients=[Config.TO_EMAIL],
-                    cc=[Config.CC_EMAIL],
-                    body=body
+                """)
+
+
+def work_samples_text(github_repo, work_samples=None):
+    """The numbered work-sample lines of the body"""
+    if work_samples:
+        return ''.join(f"\n   {i}. {sample}" for i, sample in enumerate(work_samples, 1))
+    return f"\n   - GitHub: {github_repo}"
+
+
+class EmailSender:
+    """Class to handle email sending over plain SMTP (no Flask app needed)"""
+    
+    def __init__(self, attachment_cache=None):
+        # Static attachments (resume) are read and encoded once for every sender
+        self.attachments = attachment_cache or default_attachment_cache()
+    
+    def build_assignment_message(self, screenshot_path, github_repo, your_name,
+                                 resume_path=None, work_samples=None):
+        """Build the assignment submission EmailMessage"""
+        if not Config.MAIL_USERNAME:
+            raise ValueError("MAIL_USERNAME is not set")
+        
+        subject = ASSIGNMENT_SUBJECT.render(your_name=your_name)
+        # The repo and work samples are the same for a whole batch: fill them in once
+        body = ASSIGNMENT_BODY.partial(
+            github_repo=github_repo,
+            work_samples=work_samples_text(github_repo, work_samples),
+        ).render(your_name=your_name)
+        
+        # Create message
+        msg = EmailMessage()
+        msg['Subject'] = subject
+        msg['From'] = Config.MAIL_USERNAME
+        msg['To'] = Config.TO_EMAIL
+        msg['Cc'] = Config.CC_EMAIL
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = make_msgid()
+        msg.set_content(body)
+        
+        # Attach screenshot (may have been re-encoded to jpeg/webp by post-processing)
+        if screenshot_path and os.path.exists(screenshot_path):
+            ext = os.path.splitext(screenshot_path)[1].lower() or '.png'
+            subtype = (mimetypes.guess_type(f'x{ext}')[0] or 'image/png').split('/')[1]
+            with open(screenshot_path, 'rb') as f:
+                msg.add_attachment(
+                    f.read(),
+                    maintype='image',
+                    subtype=subtype,
+                    filename=f'form_confirmation{ext}'
                 )
-                
-                # Attach screenshot
-                if screenshot_path and os.path.exists(screenshot_path):
-                    with open(screenshot_path, 'rb') as f:
-                        msg.attach(
-                            'form_confirmation.png',
-                            'image/png',
-                            f.read()
-                        )
-                    print("✓ Attached screenshot")
-                else:
-                    print("⚠ Warning: Screenshot file not found")
-                
-                # Attach resume if provided (local file)
-                if resume_path and os.path.exists(resume_path):
-                    filename = os.path.basename(resume_path)
-                    with open(resume_path, 'rb') as f:
-                        msg.attach(
-                            filename,
-                            'application/pdf',
-                            f.read()
-                        )
-                    print("✓ Attached resume")
-                
-                # Send email
-                self.mail.send(msg)
-                print(f"\n✓ Email sent successfully to {Config.TO_EMAIL}")
-                print(f"✓ CC: {Config.CC_EMAIL}")
-                
-                return True
-                
-            except Exception as e:
-                print(f"\n✗ Error sending email: {str(e)}")
-                print("\nPlease check:")
-                print("  1. MAIL_USERNAME and MAIL_PASSWORD in .env file")
-                print("  2. Gmail: Use 'App Password' (16 characters, not regular password)")
-                print("  3. Enable 2-Step Verification in Google Account")
-                print("  4. Generate App Password at: https://myaccount.google.com/apppasswords")
-                print("  5. Internet connection")
-                return False
+            print("✓ Attached screenshot")
+        else:
+            print("⚠ Warning: Screenshot file not found")
+        
+        # Attach resume if provided (local file): the same encoded part for every message
+        if resume_path and os.path.exists(resume_path):
+            if msg.get_content_type() != 'multipart/mixed':
+                # add_attachment() already made it mixed when a screenshot was attached
+                msg.make_mixed()
+            msg.attach(self.attachments.part(resume_path, 'application', 'pdf'))
+            print("✓ Attached resume")
+        
+        return msg
+    
+    @staticmethod
+    def envelope(msg):
+        """(from_addr, to_addrs) for an EmailMessage, including Cc/Bcc recipients"""
+        headers = msg.get_all('To', []) + msg.get_all('Cc', []) + msg.get_all('Bcc', [])
+        return msg['From'], [addr for _, addr in getaddresses(headers) if addr]
+    
+    def deliver(self, msg, pool=None):
+        """Send an EmailMessage over a pooled connection, or a one-off SMTP session"""
+        from_addr, to_addrs = self.envelope(msg)
+        if pool is not None:
+            pool.send(from_addr, to_addrs, message_bytes(msg))
+            return
+        conn = SMTPConnection(Config.MAIL_SERVER, Config.MAIL_PORT, Config.MAIL_USERNAME,
+                              Config.MAIL_PASSWORD, Config.MAIL_USE_TLS, Config.MAIL_USE_SSL)
+        try:
+            conn.connect()
+            conn.send(from_addr, to_addrs, message_bytes(msg))
+        finally:
+            conn.close()
+    
+    def send_assignment_email(self, screenshot_path, github_repo, your_name, 
+                             resume_path=None, work_samples=None, pool=None):
+        """
+        Send assignment submission email with all requirements.
+        With an SMTPPool the message goes over one of its persistent connections.
+        """
+        try:
+            with span('mail.build'):
+                msg = self.build_assignment_message(screenshot_path, github_repo, your_name,
+                                                    resume_path, work_samples)
+            
+            # Send email
+            with span('mail.send', pooled=pool is not None):
+                self.deliver(msg, pool)
+            print(f"\n✓ Email sent successfully to {Config.TO_EMAIL}")
+            print(f"✓ CC: {Config.CC_EMAIL}")
+            
+            return True
+            
+        except Exception as e:
+            print(f"\n✗ Error sending email: {str(e)}")
+            print("\nPlease check:")
+            print("  1. MAIL_USERNAME and MAIL_PASSWORD in .env file")
+            print("  2. Gmail: Use 'App Password' (16 characters, not regular password)")
+            print("  3. Enable 2-Step Verification in Google Account")
+            print("  4. Generate App Password at: https://myaccount.google.com/apppasswords")
+            print("  5. Internet connection")
+            return False
+    
+    def send_batch(self, submissions, pool=None, workers=None):
+        """
+        Send many assignment emails over persistent SMTP connections.
+        submissions: iterable of dicts with send_assignment_email() arguments.
+        Messages are built (MIME encoding included) by `workers` threads, each
+        handing its message to the pool; submissions are read as workers free up.
+        Returns a list of True/False per submission, in order.
+        """
+        own_pool = pool is None
+        if own_pool:
+            pool = SMTPPool.from_config()
+        workers = max(1, workers or pool.size)
+        results, pending = [], []
+        try:
+            with ThreadPoolExecutor(workers, thread_name_prefix='mail-build') as executor:
+                for kwargs in submissions:
+                    pending.append(executor.submit(self.send_assignment_email, pool=pool, **kwargs))
+                    # Keep a bounded window in flight so a huge batch isn't queued all at once
+                    while len(pending) > workers * 2:
+                        results.append(pending.pop(0).result())
+                results.extend(f.result() for f in pending)
+            return results
+        finally:
+            if own_pool:
+                pool.close()
+
+
+class FlaskMailSender(EmailSender):
+    """Same email sent through a Flask-Mail connection (MAIL_TRANSPORT=flask)"""
+    
+    def __init__(self, attachment_cache=None):
+        super().__init__(attachment_cache)
+        # Imported here so the default SMTP transport never loads Flask
+        from flask import Flask
+        from flask_mail import Mail
+        self.app = Flask(__name__)
+        self.configure_mail()
+        self.mail = Mail(self.app)
+    
+    def configure_mail(self):
+        """Configure Flask-Mail with settings from Config"""
+        self.app.config['MAIL_SERVER'] = Config.MAIL_SERVER
+        self.app.config['MAIL_PORT'] = Config.MAIL_PORT
+        self.app.config['MAIL_USERNAME'] = Config.MAIL_USERNAME
+        self.app.config['MAIL_PASSWORD'] = Config.MAIL_PASSWORD
+        self.app.config['MAIL_USE_TLS'] = Config.MAIL_USE_TLS
+        self.app.config['MAIL_USE_SSL'] = Config.MAIL_USE_SSL
+        self.app.config['MAIL_DEFAULT_SENDER'] = Config.MAIL_USERNAME
+    
+    def deliver(self, msg, pool=None):
+        if pool is not None:
+            return super().deliver(msg, pool)
+        from_addr, to_addrs = self.envelope(msg)
+        with self.app.app_context():
+            with self.mail.connect() as conn:
+                # conn.host is None when MAIL_SUPPRESS_SEND is on
+                if conn.host:
+                    conn.host.sendmail(from_addr, to_addrs, message_bytes(msg))
+
+
+def create_sender(transport=None):
+    """EmailSender for the configured MAIL_TRANSPORT ('smtp' or 'flask')"""
+    transport = transport or Config.MAIL_TRANSPORT
+    if transport not in ('smtp', 'flask'):
+        raise ValueError(f"Unknown mail transport: {transport} (use 'smtp' or 'flask')")
+    with span('mail.sender_init', transport=transport):
+        return FlaskMailSender() if transport == 'flask' else EmailSender()
 
 
 def send_assignment_submission(screenshot_path, github_repo=None, your_name=None,
-                               resume_path=None, work_samples=None):
-    """Convenience function to send assignment email"""
+                               resume_path=None, work_samples=None, pool=None, sender=None):
+    """
+    Convenience function to send assignment email.
+    Pass a shared SMTPPool (and EmailSender) when sending many emails.
+    """
     github_repo = github_repo or Config.GITHUB_REPO
     your_name = your_name or Config.YOUR_NAME
     
-    sender = EmailSender()
+    sender = sender or create_sender()
     return sender.send_assignment_email(
         screenshot_path=screenshot_path,
         github_repo=github_repo,
         your_name=your_name,
         resume_path=resume_path,
-        work_samples=work_samples
+        work_samples=work_samples,
+        pool=pool
     )
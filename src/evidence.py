@@ -0,0 +1,155 @@
+"""
+Evidence Archive
+Lightweight proof of submission for high-volume runs: instead of full-window
+PNGs, each confirmed response is recorded as the confirmation URL, the page's
+response text, a hash of the submitted values and (optionally) a compressed
+snapshot of the confirmation DOM.
+
+Records go into one append-only archive file, each compressed on its own
+(a gzip member or a zstd frame), with a JSON-lines index next to it holding
+the offset, length and searchable metadata of every record. Writes use
+O_APPEND, so several worker processes on one host can share an archive.
+PNGs are then only taken on failure, or for a sampled share of responses.
+"""
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+# Confirmation page text kept per record (the full page is in the DOM snapshot)
+MAX_TEXT = 2000
+
+_TAG_RE = re.compile(r'<(script|style)\b.*?</\1>|<[^>]+>', re.S | re.I)
+
+
+def values_hash(form_data):
+    """SHA-256 of the submitted values, independent of their order"""
+    canonical = json.dumps(sorted((str(k), str(v)) for k, v in form_data.items()),
+                           ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def html_text(source):
+    """Visible text of an HTML page, whitespace collapsed"""
+    return ' '.join(html.unescape(_TAG_RE.sub(' ', source)).split())
+
+
+def _codec(compression):
+    """(compress, decompress) functions for 'gzip', 'zstd' or 'none'"""
+    if compression == 'gzip':
+        return (lambda data: gzip.compress(data, compresslevel=6),
+                lambda blob: zlib.decompress(blob, wbits=31))
+    if compression == 'zstd':
+        # Optional dependency, only needed when zstd is selected
+        import zstandard
+        return zstandard.ZstdCompressor(level=6).compress, \
+            lambda blob: zstandard.ZstdDecompressor().decompress(blob)
+    if compression == 'none':
+        return (lambda data: data), (lambda blob: blob)
+    raise ValueError(f"Unknown evidence compression: {compression} (use gzip, zstd or none)")
+
+
+class EvidenceArchive:
+    """
+    Append-only archive of submission records plus its index (`<path>.idx`).
+    sample_rate: share of confirmed responses that also get a PNG (0 = failures only).
+    """
+
+    def __init__(self, path, compression='gzip', keep_dom=True, sample_rate=0.0):
+        self.path = path
+        self.index_path = path + '.idx'
+        if compression == 'zstd':
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                print("ℹ zstandard is not installed; evidence is gzip-compressed instead")
+                compression = 'gzip'
+        self.compression = compression
+        self._compress, self._decompress = _codec(compression)
+        self.keep_dom = keep_dom
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.stats = {'records': 0, 'raw_kb': 0.0, 'stored_kb': 0.0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def sampled(self, digest):
+        """
+        Whether this response also gets a PNG. Decided by the values hash, so the
+        same rows are sampled however the work is split between workers.
+        """
+        return self.sample_rate > 0 and int(digest[:8], 16) / 0xFFFFFFFF < self.sample_rate
+
+    @staticmethod
+    def _append(path, data):
+        """Append in one O_APPEND write; returns the offset the data landed at"""
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            # After an O_APPEND write the position is the end of *our* data,
+            # even if another process appended just before us
+            return os.lseek(fd, 0, os.SEEK_CUR) - len(data)
+        finally:
+            os.close(fd)
+
+    def record(self, url, text, digest, dom=None, row=None, screenshot=None, source=None):
+        """
+        Append one confirmed submission; returns a reference string
+        ('<archive>#<offset>+<length>') usable with load().
+        """
+        entry = {
+            'ts': time.time(),
+            'row': row,
+            'url': url,
+            'values_sha256': digest,
+            'screenshot': screenshot,
+            'source': source,
+        }
+        raw = json.dumps(dict(entry, text=(text or '')[:MAX_TEXT],
+                              dom=dom if self.keep_dom else None),
+                         ensure_ascii=False).encode('utf-8')
+        blob = self._compress(raw)
+        with self._lock:
+            offset = self._append(self.path, blob)
+            entry.update(offset=offset, length=len(blob), compression=self.compression)
+            self._append(self.index_path, (json.dumps(entry) + '\n').encode('utf-8'))
+            self.stats['records'] += 1
+            self.stats['raw_kb'] += len(raw) / 1024
+            self.stats['stored_kb'] += len(blob) / 1024
+        return f"{self.path}#{offset}+{len(blob)}"
+
+    def load(self, reference):
+        """The full record (text, DOM, metadata) behind a reference from record()"""
+        path, _, span = reference.rpartition('#')
+        offset, _, length = span.partition('+')
+        with open(path or self.path, 'rb') as f:
+            f.seek(int(offset))
+            blob = f.read(int(length))
+        return json.loads(self._decompress(blob))
+
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['raw_kb'] = round(stats['raw_kb'], 1)
+        stats['stored_kb'] = round(stats['stored_kb'], 1)
+        return stats
+
+
+def read_index(archive_path):
+    """Yield every index entry of an archive, oldest first"""
+    with open(archive_path + '.idx', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def print_evidence(summary, path):
+    if not summary['records']:
+        return
+    ratio = summary['raw_kb'] / summary['stored_kb'] if summary['stored_kb'] else 0
+    print(f"Evidence: {summary['records']} record(s) in {path}, "
+          f"{summary['stored_kb']} KB stored ({ratio:.1f}x compressed)")
@@ -0,0 +1,169 @@
+"""
+Field Mapping
+Turns input rows (CSV/JSONL columns, or the .env settings) into form_data
+{form label: value} from a declarative spec instead of hard-coded dicts.
+The spec is compiled once into a per-row function; rows are mapped lazily,
+one at a time, so a job file of any size streams in constant memory.
+
+A spec is a JSON list (or {"fields": [...]}) of entries, filled in list order:
+
+    {"label": "Full Name", "column": "name"}                      input column
+    {"label": "Gender", "value": "Female"}                        constant
+    {"label": "Full Address", "template": "{street}, {city}"}     other columns
+    {"label": "Date of Birth", "column": "dob", "date": "%Y-%m-%d"}
+
+Optional on any entry: "default" (used when the value is empty) and
+"transform" (one of TRANSFORMS). "date" parses the value with that strptime
+format and rewrites it as dd/mm/yyyy, the format both submitters expect.
+"""
+import functools
+import json
+import re
+import string
+from datetime import datetime
+
+# form_data date format shared by the browser and HTTP submitters
+DATE_FORMAT = '%d/%m/%Y'
+
+TRANSFORMS = {
+    'strip': str.strip,
+    'upper': str.upper,
+    'lower': str.lower,
+    'title': str.title,
+    'digits': functools.partial(re.compile(r'\D').sub, ''),
+}
+
+SOURCES = ('column', 'value', 'template')
+OPTIONS = ('default', 'transform', 'date')
+
+# The single-response run: form labels filled from the .env settings, in form order
+CONFIG_MAPPING = [
+    {'label': 'Full Name', 'column': 'YOUR_NAME'},
+    {'label': 'Contact Number', 'column': 'CONTACT_NUMBER'},
+    {'label': 'Email ID', 'column': 'YOUR_EMAIL'},
+    {'label': 'Full Address', 'column': 'YOUR_ADDRESS'},
+    {'label': 'Pin Code', 'column': 'PIN_CODE'},
+    {'label': 'Date of Birth', 'column': 'DATE_OF_BIRTH'},
+    {'label': 'Gender', 'column': 'GENDER'},
+    {'label': 'Verification Code', 'column': 'VERIFICATION_CODE'},
+]
+
+
+def load_mapping(path):
+    """Read a spec from a JSON file"""
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+    return spec.get('fields', []) if isinstance(spec, dict) else spec
+
+
+def _compile_template(template):
+    """'{a} x {b}' -> function(row) joining the literal parts and row values"""
+    parts = []
+    for literal, column, _, _ in string.Formatter().parse(template):
+        if literal:
+            parts.append((literal, None))
+        if column is not None:
+            if not column:
+                raise ValueError(f"Template needs column names, got: {template}")
+            parts.append((None, column))
+    parts = tuple(parts)
+    return lambda row: ''.join(literal if column is None else row.get(column, '')
+                               for literal, column in parts)
+
+
+def _compile_date(fmt):
+    # strptime is by far the slowest step, and dates repeat a lot across a job file
+    @functools.lru_cache(maxsize=4096)
+    def convert(value):
+        try:
+            return datetime.strptime(value, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            # Left as-is: validation / the submitters report it with the row
+            return value
+    return convert
+
+
+def _compile_entry(entry):
+    if not isinstance(entry, dict) or not entry.get('label'):
+        raise ValueError(f"Mapping entry needs a label: {entry!r}")
+    label = entry['label']
+    unknown = set(entry) - {'label', *SOURCES, *OPTIONS}
+    if unknown:
+        raise ValueError(f"{label}: unknown mapping key(s): {', '.join(sorted(unknown))}")
+    sources = [s for s in SOURCES if s in entry]
+    if len(sources) != 1:
+        raise ValueError(f"{label}: needs exactly one of {', '.join(SOURCES)}")
+
+    if 'column' in entry:
+        column = entry['column']
+        get = lambda row: row.get(column, '')
+    elif 'value' in entry:
+        constant = str(entry['value'])
+        get = lambda row: constant
+    else:
+        get = _compile_template(entry['template'])
+
+    steps = []
+    if entry.get('transform'):
+        if entry['transform'] not in TRANSFORMS:
+            raise ValueError(f"{label}: unknown transform {entry['transform']!r} "
+                             f"(use {', '.join(TRANSFORMS)})")
+        steps.append(TRANSFORMS[entry['transform']])
+    if entry.get('date'):
+        steps.append(_compile_date(entry['date']))
+    default = str(entry.get('default', ''))
+
+    # Specialize the common shapes so a plain column costs one dict lookup per row
+    if not steps and not default:
+        return label, get
+
+    def value(row):
+        v = get(row)
+        if not v:
+            return default
+        for step in steps:
+            v = step(v)
+        return v
+    return label, value
+
+
+class FieldMapping:
+    """A compiled spec: call it with an input row to get form_data"""
+
+    def __init__(self, spec):
+        self.spec = list(spec)
+        self._fields = tuple(_compile_entry(entry) for entry in self.spec)
+        labels = [label for label, _ in self._fields]
+        duplicates = sorted({label for label in labels if labels.count(label) > 1})
+        if duplicates:
+            raise ValueError(f"Mapped more than once: {', '.join(duplicates)}")
+        self.labels = labels
+        self.columns = sorted({entry['column'] for entry in self.spec if 'column' in entry} |
+                              {column for entry in self.spec if 'template' in entry
+                               for _, column, _, _ in string.Formatter().parse(entry['template'])
+                               if column})
+
+    def __call__(self, row):
+        return {label: get(row) for label, get in self._fields}
+
+    def missing_columns(self, row):
+        """Columns the spec reads that aren't in `row` (e.g. the file's first row)"""
+        return [column for column in self.columns if column not in row]
+
+    def map_rows(self, rows):
+        """Lazily map (row_number, row) pairs to (row_number, form_data)"""
+        first = True
+        for row_number, row in rows:
+            if first:
+                missing = self.missing_columns(row)
+                if missing:
+                    print(f"⚠ Mapping reads column(s) missing from the input: {', '.join(missing)}")
+                first = False
+            yield row_number, self(row)
+
+
+def compile_mapping(spec):
+    """Compile a spec (list of entries, or a path to a JSON file) into a FieldMapping"""
+    if isinstance(spec, str):
+        spec = load_mapping(spec)
+    return FieldMapping(spec)
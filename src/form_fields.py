@@ -0,0 +1,28 @@
+"""
+Form label helpers shared by the browser and HTTP submitters
+"""
+
+# form_data keys whose form label differs from the key
+FIELD_ALIASES = {
+    'Verification Code': 'Type this code',
+}
+
+
+def normalize_label(label):
+    """Lowercase, collapse whitespace and drop the required-field asterisk"""
+    return ' '.join(str(label).replace('*', ' ').split()).lower()
+
+
+def match_label(index, label):
+    """
+    Look a label up in a {normalized label: value} dict.
+    Tries an exact match first, then the first title that contains the label
+    (same semantics as the old contains(text(), label) XPath).
+    """
+    key = normalize_label(label)
+    if key in index:
+        return index[key]
+    for title, value in index.items():
+        if key in title:
+            return value
+    return None
@@ -1,215 +1,617 @@
 """
 Google Form Automation - FINAL WORKING VERSION
 Finds each question block and fills the input/textarea/date field inside it.
+Multi-section forms are filled one section at a time, following the Next buttons.
 """
-import time
 import os
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import TimeoutException
+from src.browser_health import RecyclePolicy, driver_rss_mb, unregister_driver
+from src.driver_manager import create_driver, page_load_stats
+from src.evidence import values_hash
+from src.form_fields import FIELD_ALIASES, match_label, normalize_label
+from src.form_schema import (INPUT_DATE_FORMAT, SchemaCache, definition_hash, format_date,
+                             parse_date)
+from src.profiling import span, timed
+from src.retry import RetryPolicy
+from src.waits import (CONFIRMED, INVALID, THROTTLED, Pacing, mark_section, page_throttled,
+                       wait_for_next_section, wait_for_scroll_settled, wait_for_submit_outcome,
+                       wait_for_value)
+
+# Collects [label, block, field, field_type] for every question block in one round-trip.
+# Radio/checkbox/hidden inputs are skipped so only fillable fields are recorded.
+INDEX_FIELDS_JS = """
+var items = document.querySelectorAll("div[role='listitem']");
+var out = [];
+for (var i = 0; i < items.length; i++) {
+    var block = items[i];
+    var heading = block.querySelector("[role='heading']");
+    var label = heading ? heading.innerText : (block.innerText || '').split('\\n')[0];
+    var field = block.querySelector(
+        "input:not([type='radio']):not([type='checkbox']):not([type='hidden'])"
+    ) || block.querySelector('textarea');
+    var fieldType = null;
+    if (field) {
+        fieldType = field.tagName === 'TEXTAREA' ? 'textarea' : (field.type || 'text');
+    }
+    out.push([label, block, field, fieldType]);
+}
+return out;
+"""
+
+# Sets each [element, value] pair through the native value setter (so framework
+# listeners see it) and fires the input/change events Google Forms validates on.
+# Returns the indexes of fields whose value didn't stick.
+BULK_FILL_JS = """
+var targets = arguments[0];
+var rejected = [];
+for (var i = 0; i < targets.length; i++) {
+    var el = targets[i][0], value = targets[i][1];
+    var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    var setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+    el.focus();
+    setter.call(el, value);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.blur();
+    if (el.value !== value) rejected.push(i);
+}
+return rejected;
+"""
+
+# The <script> holding FB_PUBLIC_LOAD_DATA_, for checking the cached schema is current
+DEFINITION_SCRIPT_JS = """
+var scripts = document.getElementsByTagName('script');
+for (var i = 0; i < scripts.length; i++) {
+    if (scripts[i].text.indexOf('FB_PUBLIC_LOAD_DATA_') !== -1) return scripts[i].outerHTML;
+}
+return null;
+"""
+
+# The "Next" button at the bottom of every section but the last
+NEXT_BUTTON_XPATH = "//div[@role='button']//span[normalize-space(text())='Next']"
+
+# Drops what the previous response left behind in the tab's origin
+CLEAR_STORAGE_JS = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
 
 class GoogleFormFiller:
-    def __init__(self, form_url, screenshot_dir='screenshots'):
+    def __init__(self, form_url, screenshot_dir='screenshots', min_delay=0.0,
+                 fill_strategy='keys', headless=False, driver_pool=None,
+                 page_load_strategy='normal', blocked_resources=(), blocked_urls=(),
+                 schema_cache=None, screenshot_element=None, field_retry=None,
+                 page_retry=None, recycle_policy=None, evidence=None):
+        if fill_strategy not in ('keys', 'bulk'):
+            raise ValueError(f"Unknown fill strategy: {fill_strategy} (use 'keys' or 'bulk')")
         self.form_url = form_url
+        # 'keys' types into each field; 'bulk' sets all values in one script call
+        self.fill_strategy = fill_strategy
         self.screenshot_dir = screenshot_dir
         self.driver = None
+        self.headless = headless
+        self.page_load_strategy = page_load_strategy
+        self.blocked_resources = blocked_resources
+        self.blocked_urls = blocked_urls
+        # Timing/bandwidth of the most recent form load (see driver_manager.page_load_stats)
+        self.last_load_stats = None
+        # Optional DriverPool handing out pre-spawned, already warm sessions
+        self.driver_pool = driver_pool
+        self.field_index = {}
+        # Cached form structure (labels, types, date format) shared with the HTTP submitter
+        self.schema_cache = schema_cache or SchemaCache()
+        self.schema = None
+        # Minimum gap between field actions; waits are otherwise condition-driven
+        self.pacing = Pacing(min_delay)
+        # Failed fields are retried in place; a failed fill reloads the page in the same session
+        self.field_retry = field_retry or RetryPolicy(attempts=3, base_delay=0.25)
+        self.page_retry = page_retry or RetryPolicy(attempts=2, base_delay=1.0)
+        # Optional suffix (e.g. "row42") so parallel batch workers don't overwrite each other's screenshots
+        self.screenshot_tag = None
+        # CSS selector of the confirmation element to capture instead of the whole viewport
+        self.screenshot_element = screenshot_element
+        # Whether the last failed submission hit a captcha / rate-limit page
+        self.last_throttled = False
+        # Per-field errors the form showed for the last submission: [{'field', 'message'}]
+        self.last_errors = []
+        # The browser is replaced after too many responses or too much memory
+        self.recycle_policy = recycle_policy or RecyclePolicy()
+        self.submissions = 0
+        self.browser_submissions = 0
+        self.recycles = 0
+        self.last_rss_mb = None
+        self.peak_rss_mb = None
+        self._recycle_reason = None
+        # Optional EvidenceArchive: confirmed responses are recorded there instead of
+        # screenshotted (PNGs only on failure, or for the archive's sampled share)
+        self.evidence = evidence
+        self._values_hash = None
         os.makedirs(self.screenshot_dir, exist_ok=True)
     
+    @timed('setup_driver')
     def setup_driver(self):
         try:
             print("\n🔧 Setting up Chrome...")
-            chrome_options = webdriver.ChromeOptions()
-            chrome_options.add_argument('--start-maximized')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            
-            try:
-                # Try to use webdriver_manager to automatically get the driver
-                from webdriver_manager.chrome import ChromeDriverManager
-                from webdriver_manager.core.os_manager import ChromeType
-                driver_path = ChromeDriverManager(chrome_type=ChromeType.GOOGLE).install()
-                service = Service(driver_path)
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            except ImportError:
-                # Fallback if webdriver_manager is not installed
-                print("ℹ webdriver_manager not found. Assuming chromedriver is in PATH.")
-                self.driver = webdriver.Chrome(options=chrome_options)
-            except Exception as e:
-                # Fallback for other manager errors
-                print(f"ℹ Webdriver manager failed ({e}). Assuming chromedriver is in PATH.")
-                self.driver = webdriver.Chrome(options=chrome_options)
-            
+            if self.driver_pool:
+                self.driver = self.driver_pool.acquire()
+            else:
+                self.driver = create_driver(headless=self.headless,
+                                            page_load_strategy=self.page_load_strategy,
+                                            blocked_resources=self.blocked_resources,
+                                            blocked_urls=self.blocked_urls)
             print("✓ Ready")
             return True
         except Exception as e:
             print(f"✗ Error setting up driver: {str(e)}")
             return False
     
+    def index_fields(self):
+        """
+        Index every question block in one JavaScript pass.
+        Builds {normalized label: (block, field, field_type)} so fill_field()
+        doesn't need a document-wide XPath scan per field.
+        """
+        entries = self.driver.execute_script(INDEX_FIELDS_JS)
+        self.field_index = {
+            normalize_label(label): (block, field, field_type)
+            for label, block, field, field_type in entries
+            if label
+        }
+        return self.field_index
+    
+    @timed('fill_field', lambda self, label, value: {'field': label})
     def fill_field(self, label, value):
         """
         Fill a text input, textarea, or date field.
-        Finds the question block by its label, then finds the input within it.
+        Looks the question block up in the field index, then fills the input within it.
+        A failed attempt is retried (with backoff) after re-indexing the page.
         """
         # Don't try to fill if no value is provided
         if not str(value):
             print(f"ℹ Skipping {label} (no value provided).")
             return True
         
+        for attempt in self.field_retry.tries():
+            if attempt > 1:
+                print(f"↻ Retrying {label} (attempt {attempt}/{self.field_retry.attempts})...")
+                # Elements from the old index may have gone stale if the form re-rendered
+                self.index_fields()
+            if self._fill_field_once(label, value):
+                return True
+        return False
+    
+    def _fill_field_once(self, label, value):
         try:
-            # 1. Find the main question block that contains the label text
-            xpath_base = f"//div[@role='listitem' and .//*[contains(text(), '{label}')]]"
-            question_block = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, xpath_base))
-            )
+            # 1. Find the question block whose label contains the text
+            entry = match_label(self.field_index, label)
+            if entry is None:
+                # The form may still be rendering; re-index once before giving up
+                entry = match_label(self.index_fields(), label)
+            if entry is None:
+                print(f"⚠ Could not find question block for: {label}")
+                return False
+            question_block, field, field_type = entry
+            if field is None:
+                print(f"⚠ Could not find an input or textarea for {label}.")
+                return False
             
             # 2. Scroll to the block
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", question_block)
-            time.sleep(0.7)
+            wait_for_scroll_settled(self.driver, question_block)
             
-            # 3. Find the input or textarea *within* that block
-            field = None
+            # 3. Fill the field
+            field.clear()
+            field.send_keys(str(value))
             try:
-                # Find any <input> that is NOT a radio button or checkbox
-                # This works for text, email, number, and date fields
-                field = question_block.find_element(By.XPATH, ".//input[not(@type='radio') and not(@type='checkbox')]")
-            except NoSuchElementException:
-                try:
-                    # If not, find a <textarea> (e.g., for "Full Address")
-                    field = question_block.find_element(By.XPATH, ".//textarea")
-                except NoSuchElementException:
-                    print(f"⚠ Could not find an input or textarea for {label}.")
-                    return False
-            
-            # 4. Fill the found field
-            if field:
-                field.clear()
-                field.send_keys(str(value))
-                print(f"✓ {label} = {value}")
-                return True
+                wait_for_value(self.driver, field, value)
+            except TimeoutException:
+                print(f"⚠ {label} did not accept the value: {value}")
+                return False
+            print(f"✓ {label} = {value}")
+            return True
             
-        except TimeoutException:
-            print(f"⚠ Could not find question block for: {label}")
-            return False
         except Exception as e:
             print(f"⚠ Error filling {label}: {str(e)}")
             return False
     
+    def load_schema(self):
+        """
+        Use the cached schema for this form, parsing the loaded page only on a miss
+        or when the page's form definition no longer matches the cached one.
+        """
+        if self.schema is None:
+            self.schema = self.schema_cache.load(self.form_url)
+        if self.schema is not None:
+            try:
+                # Only the definition script, not the whole page source, on every load
+                digest = definition_hash(self.driver.execute_script(DEFINITION_SCRIPT_JS))
+            except Exception:
+                digest = None
+            if digest is None or digest == self.schema.content_hash:
+                return self.schema
+        try:
+            response_url = self.driver.current_url.split('?')[0].replace('/viewform', '/formResponse')
+            self.schema = self.schema_cache.refresh(self.driver.page_source, self.form_url,
+                                                    response_url)
+        except ValueError as e:
+            # Not fatal: the DOM index still works without a schema
+            print(f"ℹ No form schema available ({e})")
+        return self.schema
+    
+    def report_page_load(self):
+        """Record and print how long the form took to load and how many bytes it pulled"""
+        self.last_load_stats = page_load_stats(self.driver)
+        stats = self.last_load_stats
+        if stats:
+            load_ms = stats['load_ms'] if stats['load_ms'] is not None else stats['dom_content_loaded_ms']
+            print(f"📶 Page load {load_ms} ms, {stats['transfer_kb']} KB "
+                  f"({stats['requests']} requests)")
+        return stats
+    
+    def field_values(self, form_data):
+        """
+        Return the (label, value) pairs to fill, in form_data order
+        (a FieldMapping produces it in form order). Date questions get their
+        dd/mm/yyyy value converted to the form's own date format.
+        """
+        fields = []
+        for label, value in form_data.items():
+            label = FIELD_ALIASES.get(label, label)
+            value = '' if value is None else str(value)
+            spec = self.schema.field(label) if self.schema else None
+            entry = match_label(self.field_index, label)
+            is_date = spec.type == 'date' if spec else bool(entry and entry[2] == 'date')
+            if value and is_date:
+                try:
+                    day, month, year = parse_date(value, INPUT_DATE_FORMAT)
+                except ValueError as e:
+                    print(f"⚠ Skipping {label}: {e}")
+                    continue
+                # The form expects its own format (mm/dd/yyyy by default)
+                value = format_date(day, month, year, spec.format if spec else None)
+            fields.append((label, value))
+        return fields
+    
+    def section_plan(self, fields):
+        """
+        Split the (label, value) pairs by the section their question is on, from
+        the schema, before the first page is filled - so each later page only
+        costs the Next click and one index_fields() round-trip. Without a schema
+        (or for a single-page form) everything is one section.
+        """
+        plan = [[] for _ in range(self.schema.sections if self.schema else 1)]
+        for label, value in fields:
+            spec = self.schema.field(label) if self.schema else None
+            # Labels the schema doesn't know stay on the first page, where
+            # fill_field() reports them as before
+            plan[spec.section if spec else 0].append((label, value))
+        return plan
+    
+    def fill_section(self, fields):
+        """Fill the fields of the section currently shown, in one pass"""
+        if self.fill_strategy == 'bulk':
+            return self.bulk_fill(fields)
+        for label, value in fields:
+            if not self.fill_field(label, value): return False
+            self.pacing.pause()
+        return True
+    
+    @timed('next_section', lambda self, number, total: {'section': number})
+    def next_section(self, number, total):
+        """
+        Click Next and wait for section `number` (0-based) to load, then index it.
+        Returns False if the form kept us on the current section.
+        """
+        print(f"\n➡ Section {number + 1}/{total}...")
+        next_button = WebDriverWait(self.driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, NEXT_BUTTON_XPATH))
+        )
+        mark_section(self.driver)
+        next_button.click()
+        outcome, self.last_errors = wait_for_next_section(self.driver)
+        if outcome == INVALID:
+            print("✗ The form rejected this section:")
+            for error in self.last_errors:
+                print(f"   • {error['field']}: {error['message']}")
+            self.capture_screenshot("3_section_error")
+            return False
+        if outcome == THROTTLED:
+            print("⚠ Next blocked by a captcha / rate-limit page")
+            self.last_throttled = True
+            self.capture_screenshot("3_section_error")
+            return False
+        self.index_fields()
+        return True
+    
+    @timed('bulk_fill')
+    def bulk_fill(self, fields):
+        """
+        Set every value with a single execute_script call.
+        Fields that reject programmatic input fall back to fill_field() keystrokes.
+        """
+        targets, labels = [], []
+        for label, value in fields:
+            if not str(value):
+                print(f"ℹ Skipping {label} (no value provided).")
+                continue
+            entry = match_label(self.field_index, label)
+            if entry is None or entry[1] is None:
+                # Let the keystroke path report (or recover from) the missing field
+                if not self.fill_field(label, value): return False
+                continue
+            _, field, field_type = entry
+            dom_value = str(value)
+            if field_type == 'date':
+                # field_values() wrote it in the form's format; the native date
+                # input only accepts yyyy-mm-dd through .value
+                spec = self.schema.field(label) if self.schema else None
+                try:
+                    day, month, year = parse_date(dom_value, spec.format if spec else None)
+                except ValueError as e:
+                    print(f"✗ {label}: {e}")
+                    return False
+                if year is None:
+                    # No year to build an ISO date from: type it as the form shows it
+                    if not self.fill_field(label, value): return False
+                    continue
+                dom_value = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+            targets.append([field, dom_value])
+            labels.append((label, value))
+        
+        rejected = self.driver.execute_script(BULK_FILL_JS, targets) if targets else []
+        for i, (label, value) in enumerate(labels):
+            if i in rejected:
+                print(f"ℹ {label} rejected bulk input, typing it instead...")
+                if not self.fill_field(label, value): return False
+            else:
+                print(f"✓ {label} = {value}")
+        return True
+    
     def fill_form(self, form_data):
         try:
             print(f"\n🌐 Opening form...")
-            self.driver.get(self.form_url)
-            # Wait for the first field to be ready
+            with span('driver.get'):
+                self.driver.get(self.form_url)
+            # Wait for the first question to be ready
             WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Full Name')]"))
+                EC.presence_of_element_located((By.CSS_SELECTOR, "div[role='listitem']"))
             )
+            self.load_schema()
+            self.index_fields()
+            self.report_page_load()
             
-            print("✓ Form loaded\n📝 Filling fields...\n")
-            
-            # Fill in order of appearance
-            if not self.fill_field("Full Name", form_data.get('Full Name', '')): return False
-            time.sleep(0.8)
-            
-            if not self.fill_field("Contact Number", form_data.get('Contact Number', '')): return False
-            time.sleep(0.8)
+            plan = self.section_plan(self.field_values(form_data))
+            sections = f", {len(plan)} sections" if len(plan) > 1 else ""
+            print(f"✓ Form loaded ({len(self.field_index)} questions{sections})\n📝 Filling fields...\n")
             
-            if not self.fill_field("Email ID", form_data.get('Email ID', '')): return False
-            time.sleep(0.8)
-            
-            if not self.fill_field("Full Address", form_data.get('Full Address', '')): return False
-            time.sleep(0.8)
-            
-            if not self.fill_field("Pin Code", form_data.get('Pin Code', '')): return False
-            time.sleep(0.8)
-            
-            # Date of Birth
-            dob = form_data.get('Date of Birth', '')
-            if '/' in dob:
-                parts = dob.split('/')
-                if len(parts) == 3:
-                    # Form placeholder is mm/dd/yyyy. This assumes input is dd/mm/yyyy
-                    formatted = f"{parts[1]}/{parts[0]}/{parts[2]}" # Reformat to mm/dd/yyyy
-                    if not self.fill_field("Date of Birth", formatted): return False
-                    time.sleep(0.8)
-            
-            # Gender (now treated as a text field)
-            if not self.fill_field("Gender", form_data.get('Gender', '')): return False
-            time.sleep(0.8)
-            
-            # Captcha (if it appears)
-            if not self.fill_field("Type this code", form_data.get('Verification Code', '')): return False
-            time.sleep(0.8)
+            for number, fields in enumerate(plan):
+                if number and not self.next_section(number, len(plan)): return False
+                if not self.fill_section(fields): return False
             
             print("\n✅ All fields filled\n")
             
-            # Screenshots
-            print("📸 Taking screenshots...")
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
-            self.capture_screenshot("2_filled")
+            if not self.evidence:
+                # Screenshots
+                print("📸 Taking screenshots...")
+                self.driver.execute_script("window.scrollTo(0, 0);")
+                wait_for_scroll_settled(self.driver)
+                self.capture_screenshot("2_filled")
             
             return True
         except Exception as e:
             print(f"✗ Error during form fill: {str(e)}")
             return False
     
-    def capture_screenshot(self, name):
+    @timed('capture_screenshot')
+    def capture_screenshot(self, name, selector=None):
+        """Save a PNG of the viewport, or of just the element matching `selector` if present"""
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            if self.screenshot_tag:
+                name = f"{name}_{self.screenshot_tag}"
             path = os.path.join(self.screenshot_dir, f'{name}_{timestamp}.png')
-            self.driver.save_screenshot(path)
+            elements = self.driver.find_elements(By.CSS_SELECTOR, selector) if selector else []
+            if elements:
+                # A single element is a fraction of the viewport's pixels and bytes
+                elements[0].screenshot(path)
+            else:
+                self.driver.save_screenshot(path)
             print(f"✓ Screenshot saved: {path}")
             return path
         except:
             print("⚠ Could not save screenshot.")
             return None
     
+    @timed('submit_form')
     def submit_form(self):
         try:
             print("\n🔍 Submitting...")
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
+            wait_for_scroll_settled(self.driver)
             
             submit_button = WebDriverWait(self.driver, 10).until(
                 EC.element_to_be_clickable((By.XPATH, "//span[contains(text(),'Submit')]"))
             )
             
             submit_button.click()
+            with span('submit.outcome') as outcome_span:
+                outcome, self.last_errors = wait_for_submit_outcome(self.driver)
+                outcome_span.ok = outcome == CONFIRMED
+            if outcome == INVALID:
+                print("✗ The form rejected the response:")
+                for error in self.last_errors:
+                    print(f"   • {error['field']}: {error['message']}")
+                # Keep the rejected page for reference, but this is not a confirmation
+                self.capture_screenshot("5_validation_error")
+                return None
+            if outcome == THROTTLED:
+                print("⚠ Submit blocked by a captcha / rate-limit page")
+                self.last_throttled = True
+                self.capture_screenshot("5_submit_error")
+                return None
             print("✓ Submitted!")
-            time.sleep(7) # Wait for confirmation page
+            if self.evidence:
+                return self.record_evidence()
             
             self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
-            return self.capture_screenshot("5_confirmation")
+            wait_for_scroll_settled(self.driver)
+            return self.capture_screenshot("5_confirmation", self.screenshot_element)
         except Exception as e:
             print(f"⚠ Submit error: {str(e)}")
-            # Capture what went wrong (e.g., validation error)
-            return self.capture_screenshot("5_submit_error")
+            self.last_throttled = page_throttled(self.driver)
+            # Capture what went wrong for reference; the submission did not go through
+            self.capture_screenshot("5_submit_error")
+            return None
+    
+    @timed('record_evidence')
+    def record_evidence(self):
+        """
+        Archive the confirmation page as proof of submission. Returns the sampled
+        screenshot path if this response was sampled, else the archive reference.
+        """
+        screenshot = None
+        if self.evidence.sampled(self._values_hash):
+            self.driver.execute_script("window.scrollTo(0, 0);")
+            wait_for_scroll_settled(self.driver)
+            screenshot = self.capture_screenshot("5_confirmation", self.screenshot_element)
+        text = self.driver.execute_script("return document.body ? document.body.innerText : '';")
+        dom = self.driver.page_source if self.evidence.keep_dom else None
+        reference = self.evidence.record(self.driver.current_url, text, self._values_hash, dom,
+                                         row=self.screenshot_tag, screenshot=screenshot,
+                                         source='browser')
+        print(f"🧾 Evidence recorded: {reference}")
+        return screenshot or reference
+    
+    def submit_response(self, form_data, on_filled=None):
+        """
+        Fill and submit one response using the already running driver.
+        Returns the confirmation screenshot path, or None on failure.
+        on_filled() is called once every field is filled, before submitting.
+        The driver is left open so it can be reused for the next response.
+        """
+        self.last_throttled = False
+        self.last_errors = []
+        self._values_hash = values_hash(form_data) if self.evidence else None
+        if self._recycle_reason:
+            self.recycle(self._recycle_reason)
+        if self.driver is None and not self.setup_driver():
+            return None
+        if self.browser_submissions:
+            self.reset_tab()
+        try:
+            for attempt in self.page_retry.tries():
+                if attempt > 1:
+                    print(f"↻ Reloading the form (attempt {attempt}/{self.page_retry.attempts})...")
+                if self.fill_form(form_data):
+                    break
+                if self.last_errors or self.last_throttled:
+                    # A section was rejected; the same answers would be rejected again
+                    return None
+            else:
+                self.capture_screenshot("4_fill_error")
+                return None
+            if on_filled:
+                on_filled()
+            return self.submit_form()
+        finally:
+            self.check_health()
+    
+    def reset_tab(self):
+        """
+        Start the next response from a clean tab: close any extra windows the last
+        one opened and clear the form origin's storage. Cookies are kept so Google
+        doesn't show its consent page again on every load.
+        """
+        try:
+            handles = self.driver.window_handles
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(handles[0])
+            self.driver.execute_script(CLEAR_STORAGE_JS)
+        except Exception as e:
+            print(f"⚠ Could not reset the tab: {e}")
+    
+    def check_health(self):
+        """
+        Count the response and sample the browser's memory. If it is over the
+        recycle policy's limits, the browser is replaced before the next response
+        (not now, so the last row of a run doesn't pay for a restart).
+        """
+        self.submissions += 1
+        self.browser_submissions += 1
+        self.last_rss_mb = driver_rss_mb(self.driver) if self.driver else None
+        if self.last_rss_mb is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0, self.last_rss_mb)
+        self._recycle_reason = self.recycle_policy.reason(self.browser_submissions,
+                                                          self.last_rss_mb)
+    
+    def recycle(self, reason):
+        """Quit the browser and start a fresh one in its place"""
+        print(f"♻ Recycling browser after {reason}...")
+        with span('browser.recycle', reason=reason):
+            self._recycle_reason = None
+            self.quit_driver()
+            self.browser_submissions = 0
+            self.recycles += 1
+            return self.setup_driver()
+    
+    def memory_stats(self):
+        """Responses, recycles and browser memory (MB) for this worker so far"""
+        return {
+            'submissions': self.submissions,
+            'recycles': self.recycles,
+            'last_mb': round(self.last_rss_mb, 1) if self.last_rss_mb is not None else None,
+            'peak_mb': round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+        }
+    
+    def was_throttled(self):
+        return self.last_throttled
+    
+    def validation_errors(self):
+        """Per-field errors shown by the form for the last submission"""
+        return self.last_errors
+    
+    def quit_driver(self):
+        driver, self.driver = self.driver, None
+        if driver:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"⚠ Browser did not quit cleanly: {e}")
+            finally:
+                unregister_driver(driver)
     
     def close(self):
         if self.driver:
             print("\nShutting down browser...")
-            time.sleep(3)
-            self.driver.quit()
+            self.quit_driver()
             print("✓ Done")
 
 
-def automate_google_form(form_url, form_data):
-    filler = GoogleFormFiller(form_url)
+def automate_google_form(form_url, form_data, min_delay=0.0, fill_strategy='keys',
+                         headless=False, page_load_strategy='normal', blocked_resources=(),
+                         blocked_urls=(), schema_cache=None, screenshot_element=None,
+                         on_filled=None, field_retry=None, page_retry=None, recycle_policy=None,
+                         evidence=None):
+    filler = GoogleFormFiller(form_url, min_delay=min_delay, fill_strategy=fill_strategy,
+                              headless=headless, page_load_strategy=page_load_strategy,
+                              blocked_resources=blocked_resources, blocked_urls=blocked_urls,
+                              schema_cache=schema_cache, screenshot_element=screenshot_element,
+                              field_retry=field_retry, page_retry=page_retry,
+                              recycle_policy=recycle_policy, evidence=evidence)
     try:
         if not filler.setup_driver():
             print("✗ Failed to setup driver. Exiting.")
             return None
-        if not filler.fill_form(form_data):
+        screenshot_path = filler.submit_response(form_data, on_filled=on_filled)
+        if not screenshot_path:
             print("✗ Failed to fill form. Exiting.")
-            filler.capture_screenshot("4_fill_error")
-            return None
-        
-        return filler.submit_form()
+        return screenshot_path
     except Exception as e:
         print(f"✗ An unexpected error occurred: {e}")
         filler.capture_screenshot("9_unexpected_error")
@@ -0,0 +1,280 @@
+"""
+Form Schema Extraction & Cache
+Parses a form's structure once from the FB_PUBLIC_LOAD_DATA_ JSON embedded in
+the viewform page and keeps it on disk, keyed by form URL, so later runs (browser
+or HTTP) don't have to rediscover labels, entry ids, types and formats.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date
+
+from src.form_fields import match_label, normalize_label
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'form_schema')
+
+# Date format of the values submitters receive (see validation.py)
+INPUT_DATE_FORMAT = 'dd/mm/yyyy'
+
+# Question type codes used in FB_PUBLIC_LOAD_DATA_
+TYPE_NAMES = {
+    0: 'text',
+    1: 'paragraph',
+    2: 'radio',
+    3: 'dropdown',
+    4: 'checkbox',
+    5: 'scale',
+    7: 'grid',
+    9: 'date',
+    10: 'time',
+}
+PAGE_BREAK = 8
+
+_LOAD_DATA_RE = re.compile(r'FB_PUBLIC_LOAD_DATA_\s*=\s*(.*?);\s*</script>', re.DOTALL)
+_FBZX_RE = re.compile(r'name="fbzx"\s+value="([^"]*)"')
+
+
+class FieldSpec:
+    """One answerable question on the form"""
+
+    def __init__(self, label, entry_id, type, required=False, format=None, options=None,
+                 section=0):
+        self.label = label
+        self.entry_id = entry_id
+        self.type = type
+        self.required = required
+        # Expected input format, e.g. 'mm/dd/yyyy' for date questions
+        self.format = format
+        self.options = options or []
+        self.section = section
+
+    def to_dict(self):
+        return {
+            'label': self.label,
+            'entry_id': self.entry_id,
+            'type': self.type,
+            'required': self.required,
+            'format': self.format,
+            'options': self.options,
+            'section': self.section,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class FormSchema:
+    """Parsed structure of one form plus what's needed to post to it"""
+
+    def __init__(self, form_url, fields, content_hash, response_url=None, fbzx=None,
+                 title=None, sections=1, fetched_at=None):
+        self.form_url = form_url
+        self.fields = fields
+        self.content_hash = content_hash
+        self.response_url = response_url
+        # Last seen fbzx token from the viewform page (sent back with HTTP submissions)
+        self.fbzx = fbzx
+        self.title = title
+        self.sections = sections
+        self.fetched_at = fetched_at or time.time()
+        self.by_label = {normalize_label(f.label): f for f in fields}
+
+    def field(self, label):
+        """O(1) lookup by normalized label, falling back to a contains match"""
+        return match_label(self.by_label, label)
+
+    def page_history(self):
+        """pageHistory of a response that went through every section, e.g. '0,1,2'"""
+        return ','.join(str(i) for i in range(self.sections))
+
+    def to_dict(self):
+        return {
+            'form_url': self.form_url,
+            'content_hash': self.content_hash,
+            'response_url': self.response_url,
+            'fbzx': self.fbzx,
+            'title': self.title,
+            'sections': self.sections,
+            'fetched_at': self.fetched_at,
+            'fields': [f.to_dict() for f in self.fields],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data['fields'] = [FieldSpec.from_dict(f) for f in data['fields']]
+        return cls(**data)
+
+
+def _date_format(answer):
+    """Google stores [include_time, include_year] flags on date questions"""
+    flags = answer[7] if len(answer) > 7 and isinstance(answer[7], list) else [0, 1]
+    include_time = bool(flags[0]) if flags else False
+    include_year = bool(flags[1]) if len(flags) > 1 else True
+    fmt = 'mm/dd/yyyy' if include_year else 'mm/dd'
+    return fmt + ' hh:mm' if include_time else fmt
+
+
+def format_date(day, month, year, fmt='mm/dd/yyyy'):
+    """Render a date the way a date question with the given format expects it typed"""
+    fmt = (fmt or 'mm/dd/yyyy').split(' ')[0]
+    return fmt.replace('mm', month).replace('dd', day).replace('yyyy', year)
+
+
+def parse_date(value, fmt='mm/dd/yyyy'):
+    """
+    Inverse of format_date(): (day, month, year) strings from a date written in
+    `fmt` (year is None for formats without one). Raises ValueError if the value
+    doesn't match the format or isn't a real date.
+    """
+    fmt = (fmt or 'mm/dd/yyyy').split(' ')[0]
+    order = fmt.split('/')
+    parts = str(value).strip().split('/')
+    if len(parts) != len(order) or not all(part.isdigit() for part in parts):
+        raise ValueError(f"expected {fmt}, got {value!r}")
+    fields = dict(zip(order, parts))
+    day, month, year = fields['dd'], fields['mm'], fields.get('yyyy')
+    try:
+        # 2000 is a leap year, so 29/02 passes when the form asks for no year
+        date(int(year) if year else 2000, int(month), int(day))
+    except ValueError:
+        raise ValueError(f"{value!r} is not a real date") from None
+    return day, month, year
+
+
+def definition_hash(html):
+    """
+    Content hash of the form definition in a page (same as FormSchema.content_hash),
+    or None if the page has no FB_PUBLIC_LOAD_DATA_ - a cheap check of whether a
+    cached schema still matches the live form.
+    """
+    match = _LOAD_DATA_RE.search(html or '')
+    return hashlib.sha256(match.group(1).encode('utf-8')).hexdigest() if match else None
+
+
+def parse_schema(html, form_url, response_url=None):
+    """
+    Build a FormSchema from a viewform page.
+    Raises ValueError if the page doesn't contain the embedded form data.
+    """
+    match = _LOAD_DATA_RE.search(html)
+    if not match:
+        raise ValueError("FB_PUBLIC_LOAD_DATA_ not found in form page")
+    raw = match.group(1)
+    data = json.loads(raw)
+
+    fields, section = [], 0
+    for item in data[1][1] or []:
+        if item[3] == PAGE_BREAK:
+            section += 1
+            continue
+        answers = item[4] if len(item) > 4 else None
+        if not answers:
+            # Descriptions, images, videos... have nothing to submit
+            continue
+        answer = answers[0]
+        type_name = TYPE_NAMES.get(item[3], 'text')
+        options = [opt[0] for opt in answer[1] or [] if opt and opt[0]] if len(answer) > 1 else []
+        fields.append(FieldSpec(
+            label=item[1] or '',
+            entry_id=answer[0],
+            type=type_name,
+            required=len(answer) > 2 and answer[2] == 1,
+            format=_date_format(answer) if type_name == 'date' else None,
+            options=options,
+            section=section,
+        ))
+
+    fbzx = _FBZX_RE.search(html)
+    title = data[1][8] if len(data[1]) > 8 else None
+    return FormSchema(
+        form_url=form_url,
+        fields=fields,
+        # Hash only the form definition: the rest of the page changes on every load
+        content_hash=hashlib.sha256(raw.encode('utf-8')).hexdigest(),
+        response_url=response_url,
+        fbzx=fbzx.group(1) if fbzx else None,
+        title=title,
+        sections=section + 1,
+    )
+
+
+class SchemaCache:
+    """On-disk schema cache keyed by form URL, with TTL and content-hash invalidation"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=86400):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        # Schemas already loaded by this process
+        self._memory = {}
+
+    def path_for(self, form_url):
+        key = hashlib.sha256(form_url.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def load(self, form_url):
+        """Return the cached schema, or None if missing or older than the TTL"""
+        schema = self._read(form_url)
+        if schema is None:
+            return None
+        if self.ttl is not None and time.time() - schema.fetched_at > self.ttl:
+            return None
+        self._memory[form_url] = schema
+        return schema
+
+    def _read(self, form_url):
+        """Cached schema regardless of age, or None"""
+        schema = self._memory.get(form_url)
+        if schema is not None:
+            return schema
+        try:
+            with open(self.path_for(form_url), encoding='utf-8') as f:
+                return FormSchema.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def store(self, schema):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(schema.form_url)
+        # Unique temp name so parallel workers never clobber each other's write
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(schema.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+        self._memory[schema.form_url] = schema
+        return schema
+
+    def refresh(self, html, form_url, response_url=None):
+        """
+        Re-check a freshly fetched page against the cache.
+        An unchanged content hash only renews the timestamp; a changed one replaces the schema.
+        """
+        schema = parse_schema(html, form_url, response_url)
+        cached = self._read(form_url)
+        if cached is not None and cached.content_hash != schema.content_hash:
+            print("ℹ Form structure changed, updating cached schema")
+        return self.store(schema)
+
+    def get(self, form_url, fetch_page):
+        """
+        Return the schema for form_url, calling fetch_page() -> (html, final_url)
+        only when there is no fresh cached copy.
+        """
+        schema = self.load(form_url)
+        if schema is not None:
+            return schema
+        html, final_url = fetch_page()
+        base_url = final_url.split('?')[0]
+        response_url = re.sub(r'/viewform$', '/formResponse', base_url)
+        return self.refresh(html, form_url, response_url)
+
+    def invalidate(self, form_url):
+        self._memory.pop(form_url, None)
+        try:
+            os.remove(self.path_for(form_url))
+        except OSError:
+            pass
@@ -0,0 +1,198 @@
+"""
+HTTP Form Submitter
+Submits Google Form responses with a plain POST to the form's formResponse
+endpoint instead of driving a browser. Works for text/choice/date questions.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.evidence import html_text, values_hash
+from src.form_fields import FIELD_ALIASES
+from src.form_schema import INPUT_DATE_FORMAT, SchemaCache, definition_hash, parse_date
+from src.profiling import timed
+from src.retry import RetryPolicy
+
+# Responses worth retrying: throttled or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpFormSubmitter:
+    """Submit responses over a pooled HTTP session (no browser needed)"""
+
+    def __init__(self, form_url, pool_size=10, timeout=15, schema_cache=None, retry=None,
+                 retry_statuses=RETRY_STATUSES, evidence=None):
+        self.form_url = form_url
+        self.retry = retry or RetryPolicy(attempts=3, base_delay=1.0)
+        self.retry_statuses = retry_statuses
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (X11; Linux x86_64) google-form-automation'
+        self.schema_cache = schema_cache or SchemaCache()
+        self.schema = None
+        self.screenshot_tag = None  # Unused; keeps the same interface as GoogleFormFiller
+        # Optional EvidenceArchive recording each confirmation page
+        self.evidence = evidence
+        self._lock = threading.Lock()
+        # Per-thread: the submitter is shared by every HTTP batch worker
+        self._local = threading.local()
+
+    def setup(self):
+        """Load the form schema once (from the cache when fresh) to resolve label -> entry id"""
+        with self._lock:
+            if self.schema is not None:
+                return True
+            try:
+                print("\n🔧 Resolving form entries over HTTP...")
+                self.schema = self.schema_cache.get(self.form_url, self._fetch_form)
+                print(f"✓ Resolved {len(self.schema.fields)} fields")
+                return True
+            except Exception as e:
+                print(f"✗ Error resolving form: {str(e)}")
+                return False
+
+    def _fetch_form(self):
+        resp = self.session.get(self.form_url, timeout=self.timeout)
+        resp.raise_for_status()
+        # forms.gle short links redirect to .../viewform; resp.url is where we post next to
+        return resp.text, resp.url
+
+    def find_entry(self, label):
+        """Return the FieldSpec for a label, matching like the browser filler"""
+        return self.schema.field(FIELD_ALIASES.get(label, label))
+
+    def missing_required(self, form_data):
+        """Required questions with no answer in form_data, as [{'field', 'message'}]"""
+        answered = set()
+        for label, value in form_data.items():
+            spec = self.find_entry(label) if str(value) else None
+            if spec is not None:
+                answered.add(spec.entry_id)
+        return [{'field': spec.label, 'message': 'This is a required question'}
+                for spec in self.schema.fields if spec.required and spec.entry_id not in answered]
+
+    def build_payload(self, form_data):
+        # Listing every section posts a multi-section form's answers in one request,
+        # instead of one round trip per Next page
+        payload = {'fvv': '1', 'pageHistory': self.schema.page_history()}
+        if self.schema.fbzx:
+            payload['fbzx'] = self.schema.fbzx
+        for label, value in form_data.items():
+            value = str(value)
+            if not value:
+                continue
+            spec = self.find_entry(label)
+            if spec is None:
+                raise ValueError(f"No form field found for: {label}")
+            entry_id = spec.entry_id
+            if spec.type == 'date':
+                # Input is dd/mm/yyyy, same as the browser path
+                try:
+                    day, month, year = parse_date(value, INPUT_DATE_FORMAT)
+                except ValueError as e:
+                    raise ValueError(f"{label}: {e}") from None
+                if not spec.format or 'yyyy' in spec.format:
+                    payload[f'entry.{entry_id}_year'] = year
+                payload[f'entry.{entry_id}_month'] = month
+                payload[f'entry.{entry_id}_day'] = day
+            else:
+                payload[f'entry.{entry_id}'] = value
+        return payload
+
+    @timed('http.submit')
+    def submit_response(self, form_data, on_filled=None):
+        """
+        POST one response. Returns the formResponse URL on success (the evidence
+        reference when an EvidenceArchive is set), else None.
+        on_filled() is called once the payload is built, before posting.
+        """
+        self._local.throttled = False
+        self._local.errors = []
+        if self.schema is None and not self.setup():
+            return None
+        try:
+            # Google would re-render the form for these; don't spend a POST finding out
+            missing = self.missing_required(form_data)
+            if missing:
+                self._local.errors = missing
+                print("✗ Missing required answers: " + ", ".join(e['field'] for e in missing))
+                return None
+            payload = self.build_payload(form_data)
+            if on_filled:
+                on_filled()
+            # Only connection failures are retried: after a read timeout the server may
+            # already have recorded the response, and a retry would duplicate it
+            resp = self.retry.call(self.session.post, self.schema.response_url, data=payload,
+                                   timeout=self.timeout,
+                                   retry_if=lambda r: r.status_code in self.retry_statuses,
+                                   retry_on=(requests.exceptions.ConnectionError,))
+            # On validation failure Google re-renders the form instead of the confirmation page
+            if resp.ok and 'FB_PUBLIC_LOAD_DATA_' not in resp.text:
+                if self.evidence:
+                    # Same result shape as the browser path: the archived record
+                    return self.evidence.record(resp.url, html_text(resp.text),
+                                                values_hash(form_data), resp.text, source='http')
+                return resp.url
+            print(f"⚠ Submit rejected (HTTP {resp.status_code})")
+            self._local.throttled = resp.status_code == 429
+            if resp.ok:
+                if self.schema_changed(resp.text):
+                    self._local.errors = [{'field': None, 'message': 'The form changed since '
+                                           'its schema was cached (schema refreshed)'}]
+                else:
+                    self._local.errors = [{'field': None, 'message': 'The form was shown again '
+                                           '(an answer did not pass validation)'}]
+            return None
+        except ValueError as e:
+            # An answer that can't be encoded (unknown label, malformed date)
+            self._local.errors = [{'field': None, 'message': str(e)}]
+            print(f"✗ Invalid answer: {e}")
+            return None
+        except Exception as e:
+            print(f"⚠ Submit error: {str(e)}")
+            return None
+
+    def schema_changed(self, html):
+        """
+        Check a re-rendered form page against the schema in use. If the form was
+        edited (entry ids / labels no longer match), the cached schema is replaced
+        so the next rows post with the new one. Returns True if it changed.
+        """
+        digest = definition_hash(html)
+        with self._lock:
+            if digest is None or digest == self.schema.content_hash:
+                return False
+            # The page holds a full definition (that's what was hashed), so it parses
+            self.schema = self.schema_cache.refresh(html, self.form_url, self.schema.response_url)
+            return True
+
+    def was_throttled(self):
+        """True if this thread's last submission was refused with HTTP 429"""
+        return getattr(self._local, 'throttled', False)
+
+    def validation_errors(self):
+        """This thread's errors for the last submission, as [{'field', 'message'}]"""
+        return getattr(self._local, 'errors', [])
+
+    def close(self):
+        self.session.close()
+
+
+def submit_google_form(form_url, form_data, schema_cache=None, on_filled=None, retry=None,
+                       evidence=None):
+    """Convenience function mirroring automate_google_form() for HTTP mode"""
+    submitter = HttpFormSubmitter(form_url, schema_cache=schema_cache, retry=retry,
+                                  evidence=evidence)
+    try:
+        if not submitter.setup():
+            return None
+        result = submitter.submit_response(form_data, on_filled=on_filled)
+        if result:
+            print("✓ Submitted!")
+        return result
+    finally:
+        submitter.close()
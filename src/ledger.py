@@ -0,0 +1,151 @@
+"""
+Submission Ledger
+Durable record of every job in a local SQLite database (WAL mode), so a run that
+dies halfway can be restarted without submitting or emailing anything twice.
+
+Each job is identified by an idempotency key derived from the form URL and the
+row's content, and moves forward through:
+
+    pending -> filled -> submitted -> emailed
+
+A restarted run skips jobs that are already submitted (or emailed) and only
+redoes what never finished. A job left in `filled` died between the submit click
+and its recorded outcome, so the form may or may not have it: such jobs are
+ambiguous and are held for reconciliation unless the caller opts to re-run them.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_LEDGER_PATH = os.path.join('.cache', 'ledger.db')
+
+PENDING = 'pending'
+FILLED = 'filled'
+SUBMITTED = 'submitted'
+EMAILED = 'emailed'
+STATES = (PENDING, FILLED, SUBMITTED, EMAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    form_url TEXT NOT NULL,
+    row_number INTEGER,
+    state TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+def job_key(form_url, form_data):
+    """Idempotency key: the same data for the same form always maps to the same job"""
+    canonical = json.dumps([form_url, sorted(form_data.items())], ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+
+def is_done(state, through=SUBMITTED):
+    """True if a job in `state` has already reached `through`"""
+    return state in STATES and STATES.index(state) >= STATES.index(through)
+
+
+def is_ambiguous(state):
+    """True if a job was filled but its submission was never confirmed"""
+    return state == FILLED
+
+
+class SubmissionLedger:
+    """
+    Thread-safe job ledger backed by one SQLite connection.
+    `result` holds the confirmation screenshot path (or the formResponse URL in HTTP mode).
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        # WAL keeps each commit cheap and crash-safe; NORMAL is durable enough in WAL mode
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE key = ?', (key,)).fetchone()
+        return dict(row) if row else None
+
+    def begin(self, key, form_url, row_number=None):
+        """
+        Register an attempt at a job and return its record.
+        Finished jobs are returned untouched so the caller can skip them.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO jobs (key, form_url, row_number, state, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, form_url, row_number, PENDING, now, now),
+            )
+            self._conn.execute(
+                'UPDATE jobs SET attempts = attempts + 1, row_number = ?, updated_at = ? '
+                'WHERE key = ? AND state NOT IN (?, ?)',
+                (row_number, now, key, SUBMITTED, EMAILED),
+            )
+            row = self._conn.execute('SELECT * FROM jobs WHERE key = ?', (key,)).fetchone()
+        return dict(row)
+
+    def advance(self, key, state, result=None):
+        """Move a job forward to `state` (never backwards), clearing any error"""
+        if state not in STATES:
+            raise ValueError(f"Unknown ledger state: {state} (use {', '.join(STATES)})")
+        earlier = STATES[:STATES.index(state)]
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE jobs SET state = ?, result = COALESCE(?, result), error = NULL, '
+                f'updated_at = ? WHERE key = ? AND state IN ({",".join("?" * len(earlier))})',
+                (state, result, time.time(), key, *earlier),
+            )
+
+    def set_result(self, key, result):
+        """Replace the stored result, e.g. with the post-processed screenshot path"""
+        with self._lock:
+            self._conn.execute('UPDATE jobs SET result = ?, updated_at = ? WHERE key = ?',
+                               (result, time.time(), key))
+
+    def fail(self, key, error):
+        """Record why the latest attempt failed; the state stays where it was"""
+        with self._lock:
+            self._conn.execute('UPDATE jobs SET error = ?, updated_at = ? WHERE key = ?',
+                               (str(error), time.time(), key))
+
+    def counts(self, form_url=None):
+        """{state: number of jobs}, optionally for one form"""
+        query = 'SELECT state, COUNT(*) FROM jobs'
+        params = ()
+        if form_url:
+            query += ' WHERE form_url = ?'
+            params = (form_url,)
+        with self._lock:
+            rows = self._conn.execute(query + ' GROUP BY state', params).fetchall()
+        return {state: count for state, count in rows}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,222 @@
+"""
+Mail Templates
+Precompiled subject/body templates and a shared attachment cache, so bulk
+sending doesn't re-render the same text or re-read the same files per email.
+
+Templates use {name} placeholders. They are split into literal text and
+placeholders once; the parts shared by a whole batch (repo link, work samples)
+are filled in once and cached, leaving only per-recipient values per message.
+Static attachments (e.g. the resume) are read once into a content-addressed,
+size-bounded LRU cache together with their base64-encoded body. Each message
+gets its own small part sharing that body; message_bytes() flattens the message
+with a short placeholder in place of each cached body and splices the encoded
+bytes in afterwards, instead of re-serializing a large payload per email.
+"""
+import collections
+import hashlib
+import io
+import os
+import string
+import threading
+import uuid
+from email.generator import BytesGenerator
+from email.message import MIMEPart
+
+
+class MailTemplate:
+    """A template split once into (literal, placeholder) parts"""
+
+    # Pre-filled variants kept per template (one per distinct set of shared values)
+    MAX_PARTIALS = 32
+
+    def __init__(self, text=None, parts=None):
+        if parts is None:
+            parts = []
+            for literal, name, _, _ in string.Formatter().parse(text):
+                if literal:
+                    parts.append((literal, None))
+                if name is not None:
+                    if not name:
+                        raise ValueError("Template placeholders need a name, e.g. {your_name}")
+                    parts.append((None, name))
+        self.parts = tuple(parts)
+        self.fields = {name for _, name in self.parts if name}
+        self._partials = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, **values):
+        try:
+            return ''.join(literal if name is None else str(values[name])
+                           for literal, name in self.parts)
+        except KeyError as e:
+            raise ValueError(f"Template value missing: {e.args[0]}") from None
+
+    def partial(self, **values):
+        """
+        Template with some placeholders already filled in (cached per value set),
+        e.g. fill the batch-wide values once and render only the per-recipient ones.
+        """
+        key = tuple(sorted((k, str(v)) for k, v in values.items() if k in self.fields))
+        with self._lock:
+            if key in self._partials:
+                self._partials.move_to_end(key)
+                return self._partials[key]
+        filled = dict(key)
+        parts = []
+        for literal, name in self.parts:
+            if name in filled:
+                literal, name = filled[name], None
+            if name is None and parts and parts[-1][1] is None:
+                # Merge adjacent literal text so render() joins fewer pieces
+                parts[-1] = (parts[-1][0] + literal, None)
+            else:
+                parts.append((literal, name))
+        template = MailTemplate(parts=parts)
+        with self._lock:
+            self._partials[key] = template
+            if len(self._partials) > self.MAX_PARTIALS:
+                self._partials.popitem(last=False)
+        return template
+
+
+class AttachmentCache:
+    """
+    Static attachment files, read once and kept by content hash (two paths with the
+    same bytes share one entry). Entries are evicted least-recently-used once the
+    cached bytes (raw + encoded MIME parts) exceed `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        # (path, mtime, size) -> digest, so an edited file is re-read
+        self._paths = {}
+        # digest -> {'data': bytes, 'parts': {(filename, type): MIMEPart}, 'size': int}
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _stat_key(self, path):
+        st = os.stat(path)
+        return os.path.realpath(path), st.st_mtime_ns, st.st_size
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry['size']
+            self.stats['evictions'] += 1
+        self._paths = {k: d for k, d in self._paths.items() if d in self._entries}
+
+    def _entry(self, path):
+        """The cache entry for a file, reading it on a miss (call with the lock held)"""
+        key = self._stat_key(path)
+        digest = self._paths.get(key)
+        if digest in self._entries:
+            self.stats['hits'] += 1
+            self._entries.move_to_end(digest)
+            return digest, self._entries[digest]
+        self.stats['misses'] += 1
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        self._paths[key] = digest
+        entry = self._entries.get(digest)
+        if entry is None:
+            entry = {'data': data, 'parts': {}, 'size': len(data)}
+            self._entries[digest] = entry
+            self._bytes += entry['size']
+            self._evict()
+        self._entries.move_to_end(digest)
+        return digest, entry
+
+    def read(self, path):
+        """File contents, from memory after the first read"""
+        with self._lock:
+            return self._entry(path)[1]['data']
+
+    def part(self, path, maintype, subtype, filename=None):
+        """
+        An attachment part for the file. The file is base64-encoded once per
+        file/name; every part returned shares that encoded body, so attaching
+        it costs a few headers per message.
+        """
+        filename = filename or os.path.basename(path)
+        key = (filename, maintype, subtype)
+        with self._lock:
+            digest, entry = self._entry(path)
+            template = entry['parts'].get(key)
+        if template is None:
+            template = MIMEPart()
+            template.set_content(entry['data'], maintype=maintype, subtype=subtype,
+                                 disposition='attachment', filename=filename)
+            template.cached_body = template.get_payload().encode('ascii')
+            with self._lock:
+                # Another thread may have encoded the same file meanwhile; keep the first one
+                existing = entry['parts'].get(key)
+                if existing is not None:
+                    template = existing
+                elif digest in self._entries:
+                    entry['parts'][key] = template
+                    size = len(template.cached_body) * 2
+                    entry['size'] += size
+                    self._bytes += size
+                    self._evict()
+        part = MIMEPart()
+        for name, value in template.items():
+            part[name] = value
+        # Shared str, not a copy; as_bytes() on the message still works as usual
+        part.set_payload(template.get_payload())
+        part.cached_body = template.cached_body
+        return part
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries),
+                        cached_kb=round(self._bytes / 1024, 1))
+
+
+def message_bytes(msg):
+    """
+    msg.as_bytes(), without re-serializing cached attachment bodies: each one is
+    flattened as a short placeholder, then replaced by its encoded bytes.
+    """
+    if msg.is_multipart() and msg.get_boundary() is None:
+        # A random boundary can't occur in the parts, so the generator skips
+        # scanning every part's text for a collision
+        msg.set_boundary(f"==============={uuid.uuid4().hex}==")
+    cached = [part for part in msg.walk() if getattr(part, 'cached_body', None) is not None]
+    swapped = []
+    try:
+        for part in cached:
+            # '<' and ':' never occur in base64, so the placeholder can't clash with a body
+            token = f"<cached-part:{uuid.uuid4().hex}>"
+            swapped.append((part, part.get_payload(), token))
+            part.set_payload(token)
+        buffer = io.BytesIO()
+        BytesGenerator(buffer, mangle_from_=False, policy=msg.policy).flatten(msg)
+    finally:
+        for part, payload, _ in swapped:
+            part.set_payload(payload)
+    data = buffer.getvalue()
+    linesep = msg.policy.linesep.encode('ascii')
+    for part, _, token in swapped:
+        body = part.cached_body
+        if linesep != b'\n':
+            # The generator rewrites line endings for the policy; do the same for the body
+            body = body.replace(b'\n', linesep)
+        data = data.replace(token.encode('ascii'), body, 1)
+    return data
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_attachment_cache():
+    """Process-wide AttachmentCache sized by MAIL_ATTACHMENT_CACHE_MB"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            from config.config import Config
+            _default_cache = AttachmentCache(int(Config.MAIL_ATTACHMENT_CACHE_MB * 1024 * 1024))
+        return _default_cache
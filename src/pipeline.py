@@ -0,0 +1,274 @@
+"""
+Asyncio Submission Pipeline
+Overlaps the three stages of a job so browser workers never wait on SMTP:
+
+    submit (fill + submit form) -> post-process screenshot -> send email
+
+Stages are joined by bounded queues (backpressure: a slow stage makes the one
+before it wait instead of piling up work in memory). Blocking Selenium and SMTP
+calls run in thread pool executors.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.batch_runner import RowResult, print_summary, read_rows
+from src.ledger import EMAILED
+
+# Sentinel passed down a queue to tell a stage's tasks to shut down
+_STOP = object()
+
+
+class StageStats:
+    """Counters for one pipeline stage"""
+
+    def __init__(self, name, queue):
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0
+        # Number of times an upstream stage had to wait because this queue was full
+        self.backpressure_waits = 0
+
+    def to_dict(self):
+        return {
+            'depth': self.queue.qsize(),
+            'capacity': self.queue.maxsize,
+            'busy': self.busy,
+            'processed': self.processed,
+            'failed': self.failed,
+            'backpressure_waits': self.backpressure_waits,
+        }
+
+
+class SubmissionPipeline:
+    """
+    Runs rows through submit -> post-process -> email with bounded queues between stages.
+
+    runner: a BatchRunner, used to create/close submit workers and record results
+    postprocess_fn(screenshot_path) -> path to attach (None = pass through)
+    email_fn(screenshot_path, form_data) -> bool (None = skip the email stage)
+    """
+
+    def __init__(self, runner, postprocess_fn=None, email_fn=None, email_workers=2,
+                 postprocess_workers=2, queue_size=None, report_interval=None):
+        self.runner = runner
+        self.postprocess_fn = postprocess_fn
+        self.email_fn = email_fn
+        self.submit_workers = runner.workers
+        self.postprocess_workers = max(1, postprocess_workers)
+        self.email_workers = max(1, email_workers)
+        self.queue_size = queue_size or self.submit_workers * 2
+        # Seconds between queue-depth reports while running (None = no reports)
+        self.report_interval = report_interval
+        self.stages = {}
+
+    async def _put(self, stage, item):
+        """Put with backpressure accounting"""
+        if stage.queue.full():
+            stage.backpressure_waits += 1
+        await stage.queue.put(item)
+
+    async def _feed(self, rows, stage):
+        loop = asyncio.get_running_loop()
+        rows = iter(rows)
+        try:
+            while True:
+                # Reading may block (disk, or waiting on a coordinator lease); keep it off the loop
+                job = await loop.run_in_executor(None, next, rows, _STOP)
+                if job is _STOP:
+                    break
+                await self._put(stage, job)
+        finally:
+            # Always release the submit workers, even if reading the job file failed
+            for _ in range(self.submit_workers):
+                await stage.queue.put(_STOP)
+
+    async def _submit_worker(self, worker_id, executor, inbox, outbox):
+        loop = asyncio.get_running_loop()
+        filler = await loop.run_in_executor(executor, self.runner.create_worker, worker_id)
+        try:
+            while True:
+                job = await inbox.queue.get()
+                if job is _STOP:
+                    break
+                row_number, form_data = job
+                inbox.busy += 1
+                if filler is None:
+                    result = RowResult(row_number, False, error='driver setup failed',
+                                       worker_id=worker_id)
+                else:
+                    result = await loop.run_in_executor(
+                        executor, self.runner.submit_row, filler, worker_id, row_number, form_data
+                    )
+                inbox.busy -= 1
+                inbox.processed += 1
+                if not result.success:
+                    if not (result.dropped or result.held):
+                        inbox.failed += 1
+                    self.runner.record(result)
+                    continue
+                await self._put(outbox, (result, form_data))
+        finally:
+            await loop.run_in_executor(executor, self.runner.close_worker, filler)
+
+    async def _postprocess_worker(self, executor, inbox, outbox):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inbox.queue.get()
+            if item is _STOP:
+                break
+            result, form_data = item
+            # Rows resumed from the ledger were post-processed by the run that submitted them
+            if self.postprocess_fn and result.screenshot_path and not result.skipped:
+                inbox.busy += 1
+                try:
+                    result.screenshot_path = await loop.run_in_executor(
+                        executor, self.postprocess_fn, result.screenshot_path
+                    ) or result.screenshot_path
+                    self.runner.mark_processed(result)
+                except Exception as e:
+                    # Keep the original screenshot; a failed resize shouldn't lose the email
+                    inbox.failed += 1
+                    print(f"⚠ Post-processing failed for row {result.row_number}: {e}")
+                inbox.busy -= 1
+            inbox.processed += 1
+            if outbox is None:
+                self.runner.record(result)
+            else:
+                await self._put(outbox, (result, form_data))
+
+    async def _email_worker(self, executor, inbox):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inbox.queue.get()
+            if item is _STOP:
+                break
+            result, form_data = item
+            if result.ledger_state == EMAILED:
+                # Sent by an earlier run; never email the same row twice
+                result.emailed = True
+                self.runner.record(result)
+                continue
+            inbox.busy += 1
+            try:
+                result.emailed = bool(await loop.run_in_executor(
+                    executor, self.email_fn, result.screenshot_path, form_data
+                ))
+                if result.emailed:
+                    self.runner.mark_emailed(result)
+            except Exception as e:
+                result.emailed = False
+                result.error = f"email failed: {e}"
+            inbox.busy -= 1
+            inbox.processed += 1
+            if not result.emailed:
+                inbox.failed += 1
+            self.runner.record(result)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            print("📊 " + "  ".join(
+                f"{name}: {s.queue.qsize()}/{s.queue.maxsize} queued, {s.busy} busy"
+                for name, s in self.stages.items()
+            ))
+
+    def stats(self):
+        """Per-stage queue depth, in-flight work and backpressure counters"""
+        return {name: stage.to_dict() for name, stage in self.stages.items()}
+
+    async def run_async(self, rows):
+        submit = StageStats('submit', asyncio.Queue(self.queue_size))
+        post = StageStats('postprocess', asyncio.Queue(self.queue_size))
+        email = StageStats('email', asyncio.Queue(self.queue_size)) if self.email_fn else None
+        self.stages = {'submit': submit, 'postprocess': post}
+        if email:
+            self.stages['email'] = email
+
+        submit_pool = ThreadPoolExecutor(self.submit_workers, thread_name_prefix='submit')
+        post_pool = ThreadPoolExecutor(self.postprocess_workers, thread_name_prefix='postprocess')
+        email_pool = ThreadPoolExecutor(self.email_workers, thread_name_prefix='email')
+        reporter = asyncio.create_task(self._report()) if self.report_interval else None
+        try:
+            feeder = asyncio.create_task(self._feed(rows, submit))
+            submitters = [
+                asyncio.create_task(self._submit_worker(i, submit_pool, submit, post))
+                for i in range(1, self.submit_workers + 1)
+            ]
+            post_tasks = [
+                asyncio.create_task(self._postprocess_worker(post_pool, post, email))
+                for _ in range(self.postprocess_workers)
+            ]
+            email_tasks = [
+                asyncio.create_task(self._email_worker(email_pool, email))
+                for _ in range(self.email_workers)
+            ] if email else []
+
+            # Shut stages down in order, each once everything upstream has drained
+            feed_error = None
+            try:
+                await feeder
+            except Exception as e:
+                # Finish the rows already queued before reporting the bad input
+                feed_error = e
+            await asyncio.gather(*submitters)
+            for _ in post_tasks:
+                await post.queue.put(_STOP)
+            await asyncio.gather(*post_tasks)
+            for _ in email_tasks:
+                await email.queue.put(_STOP)
+            await asyncio.gather(*email_tasks)
+            if feed_error:
+                raise feed_error
+        finally:
+            if reporter:
+                reporter.cancel()
+            for pool in (submit_pool, post_pool, email_pool):
+                pool.shutdown(wait=True)
+
+    def run(self, rows):
+        """Run the whole pipeline and return the runner's summary plus stage stats"""
+        print(f"\n🚀 Starting pipeline: {self.submit_workers} submit, "
+              f"{self.postprocess_workers} post-process, "
+              f"{self.email_workers if self.email_fn else 0} email worker(s)...")
+        self.runner.open_results()
+        self.runner.reap_orphans()
+        if self.runner.prewarm:
+            self.runner.start_prewarm()
+        start = time.perf_counter()
+        try:
+            asyncio.run(self.run_async(rows))
+        finally:
+            self.runner.shutdown()
+        summary = self.runner.summary(time.perf_counter() - start)
+        summary['emailed'] = self.runner.counts['emailed']
+        summary['stages'] = self.stats()
+        return summary
+
+
+def print_stage_stats(stats):
+    print("PIPELINE STAGES:")
+    for name, s in stats.items():
+        print(f"  {name:<12} processed {s['processed']:>6}  failed {s['failed']:>4}  "
+              f"queue {s['depth']}/{s['capacity']}  backpressure waits {s['backpressure_waits']}")
+    print("-" * 80)
+
+
+def run_pipeline(runner, input_path, postprocess_fn=None, email_fn=None, email_workers=2,
+                 report_interval=None, postprocess_workers=2, rows=None):
+    """
+    Convenience function to push a CSV/JSONL file through the full pipeline
+    (or `rows`, an iterable of (row_number, form_data) pairs, when given)
+    """
+    pipeline = SubmissionPipeline(runner, postprocess_fn=postprocess_fn, email_fn=email_fn,
+                                  email_workers=email_workers,
+                                  postprocess_workers=postprocess_workers,
+                                  report_interval=report_interval)
+    summary = pipeline.run(read_rows(input_path) if rows is None else rows)
+    print_summary(summary)
+    if email_fn:
+        print(f"Emails sent: {summary['emailed']}")
+    print_stage_stats(summary['stages'])
+    return summary
@@ -0,0 +1,249 @@
+"""
+Step Timing & Profiling
+A small span/timer API for finding where a run's time goes. Instrumented code
+calls span()/timed() unconditionally; they cost one global lookup until
+enable_profiling() is called (main.py does that for --profile / --metrics).
+
+Each finished span becomes a JSON line (run id, step, duration, ok, thread and any
+attributes). The summary aggregates p50/p95/p99 per step, and long batch runs can
+keep a Prometheus text-format file up to date for node_exporter's textfile collector.
+Per step, memory is bounded: count, sum and max are exact, and quantiles come from
+a fixed-size uniform sample of the durations (like a Prometheus client summary).
+"""
+import functools
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# The active Profiler, or None when profiling is off
+_profiler = None
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Span:
+    """One timed step; set `ok = False` when the step failed without raising"""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.ok = True
+
+
+class StepStats:
+    """Exact count/sum/max plus a reservoir sample of one step's durations"""
+
+    # Samples kept per step; quantiles are exact up to this many spans
+    RESERVOIR_SIZE = 2048
+
+    def __init__(self, rng):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.failed = 0
+        self.sample = []
+        self._rng = rng
+
+    def add(self, seconds, ok=True):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if not ok:
+            self.failed += 1
+        if len(self.sample) < self.RESERVOIR_SIZE:
+            self.sample.append(seconds)
+        else:
+            # Algorithm R: every duration so far is in the sample with equal probability
+            i = self._rng.randrange(self.count)
+            if i < self.RESERVOIR_SIZE:
+                self.sample[i] = seconds
+
+
+class Profiler:
+    """Collects span durations per step and optionally streams them to a JSONL file"""
+
+    def __init__(self, records_path=None, metrics_path=None, metrics_interval=15):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records_path = records_path
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self._steps = {}
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self._file = open(records_path, 'a', encoding='utf-8') if records_path else None
+        self._stop = threading.Event()
+        self._exporter = None
+
+    def record(self, name, seconds, ok=True, attrs=None):
+        with self._lock:
+            stats = self._steps.get(name)
+            if stats is None:
+                stats = self._steps[name] = StepStats(self._rng)
+            stats.add(seconds, ok)
+            if self._file:
+                record = {
+                    'run_id': self.run_id,
+                    'ts': round(time.time(), 3),
+                    'step': name,
+                    'ms': round(seconds * 1000, 2),
+                    'ok': ok,
+                    'thread': threading.current_thread().name,
+                }
+                if attrs:
+                    record.update(attrs)
+                self._file.write(json.dumps(record) + '\n')
+
+    def summary(self):
+        """{step: {count, failed, total_s, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self._lock:
+            steps = {name: (st.count, st.failed, st.total, st.max, list(st.sample))
+                     for name, st in self._steps.items()}
+        summary = {}
+        for name, (count, failed, total, longest, values) in steps.items():
+            # At most RESERVOIR_SIZE values to sort, however long the run
+            values.sort()
+            summary[name] = {
+                'count': count,
+                'failed': failed,
+                'total_s': round(total, 3),
+                'mean_ms': round(total / count * 1000, 1),
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1),
+                'p99_ms': round(percentile(values, 99) * 1000, 1),
+                'max_ms': round(longest * 1000, 1),
+            }
+        return summary
+
+    def prometheus_text(self):
+        """Current totals in the Prometheus text exposition format"""
+        lines = [
+            '# HELP form_automation_step_seconds Duration of each automation step.',
+            '# TYPE form_automation_step_seconds summary',
+        ]
+        summary = self.summary()
+        for name, s in sorted(summary.items()):
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                lines.append(f'form_automation_step_seconds{{step="{name}",quantile="{quantile}"}} '
+                             f'{round(s[key] / 1000, 6)}')
+            lines.append(f'form_automation_step_seconds_sum{{step="{name}"}} {s["total_s"]}')
+            lines.append(f'form_automation_step_seconds_count{{step="{name}"}} {s["count"]}')
+        lines.append('# HELP form_automation_step_failures_total Steps that failed.')
+        lines.append('# TYPE form_automation_step_failures_total counter')
+        for name, s in sorted(summary.items()):
+            lines.append(f'form_automation_step_failures_total{{step="{name}"}} {s["failed"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        path = path or self.metrics_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Write then rename so a scraper never reads a half-written file
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def _export_loop(self):
+        while not self._stop.wait(self.metrics_interval):
+            try:
+                self.write_prometheus()
+            except OSError as e:
+                print(f"⚠ Could not write metrics: {e}")
+
+    def start_export(self):
+        """Rewrite the metrics file every metrics_interval seconds until close()"""
+        if self.metrics_path and self._exporter is None:
+            self._exporter = threading.Thread(target=self._export_loop, name='metrics-export',
+                                              daemon=True)
+            self._exporter.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._exporter:
+            self._exporter.join()
+            self._exporter = None
+        if self.metrics_path:
+            self.write_prometheus()
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def enable_profiling(records_path=None, metrics_path=None, metrics_interval=15):
+    """Install a process-wide Profiler and return it"""
+    global _profiler
+    _profiler = Profiler(records_path, metrics_path, metrics_interval).start_export()
+    return _profiler
+
+
+def disable_profiling():
+    """Remove the active Profiler (closing it) and return it"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler:
+        profiler.close()
+    return profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as step `name`; an exception marks it failed"""
+    profiler = _profiler
+    current = Span(name, attrs)
+    if profiler is None:
+        yield current
+        return
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.ok = False
+        raise
+    finally:
+        profiler.record(name, time.perf_counter() - start, current.ok, current.attrs)
+
+
+def timed(name, attrs=None):
+    """
+    Decorator timing every call as step `name`. A falsy return value (the
+    repo's usual False/None failure signal) or an exception counts as failed.
+    attrs(*args, **kwargs) -> dict adds attributes to the record.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with span(name, **(attrs(*args, **kwargs) if attrs else {})) as current:
+                result = func(*args, **kwargs)
+                current.ok = bool(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def print_profile(summary):
+    """Print the per-step latency table"""
+    print("\n" + "-" * 80)
+    print("PROFILE (ms):")
+    print(f"  {'step':<22}{'count':>7}{'failed':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'total s':>11}")
+    for name, s in sorted(summary.items(), key=lambda item: -item[1]['total_s']):
+        print(f"  {name:<22}{s['count']:>7}{s['failed']:>8}{s['p50_ms']:>10}{s['p95_ms']:>10}"
+              f"{s['p99_ms']:>10}{s['total_s']:>11}")
+    print("-" * 80)
@@ -0,0 +1,128 @@
+"""
+Adaptive Rate Limiting
+Token buckets shared by every worker, one budget for form submissions and one for
+outgoing mail. Each bucket adapts its own rate (AIMD): it backs off multiplicatively
+when errors or throttling responses pile up and creeps back up additively while
+things succeed, settling near the highest rate the provider tolerates.
+"""
+import collections
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst` saved up"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate moves between min_rate and max_rate based on outcomes.
+    record(success, throttled) after each operation:
+    - a throttled outcome (HTTP 429, captcha page, SMTP 421/45x) multiplies the rate by `decrease`
+    - so does an error rate above `high_error_rate` over the last `window` outcomes
+    - an error rate below `low_error_rate` (over at least half a window) adds
+      `max_rate * increase` to it
+    Adjustments are at most one per `cooldown` seconds, so one burst of failures
+    from requests already in flight only counts once.
+    """
+
+    def __init__(self, name, max_rate, burst=1, min_rate=None, window=20, high_error_rate=0.2,
+                 low_error_rate=0.05, increase=0.05, decrease=0.5, cooldown=2.0):
+        super().__init__(max_rate, burst)
+        self.name = name
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 20
+        self.high_error_rate = high_error_rate
+        self.low_error_rate = low_error_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._outcomes = collections.deque(maxlen=window)
+        self._last_adjust = 0.0
+        self.stats = {'acquired': 0, 'waited_s': 0.0, 'errors': 0, 'throttled': 0,
+                      'slowdowns': 0, 'speedups': 0, 'lowest_rate': self.rate}
+
+    def acquire(self, tokens=1):
+        waited = super().acquire(tokens)
+        with self._lock:
+            self.stats['acquired'] += 1
+            self.stats['waited_s'] += waited
+        return waited
+
+    def _set_rate(self, rate, now):
+        # Bank what accrued at the old rate before switching
+        self._refill(now)
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+        # Don't let tokens saved up at the old rate burst out after a slowdown
+        self._tokens = min(self._tokens, 1.0)
+        self.stats['lowest_rate'] = min(self.stats['lowest_rate'], self.rate)
+        self._last_adjust = now
+
+    def record(self, success, throttled=False):
+        with self._lock:
+            now = time.monotonic()
+            self._outcomes.append(bool(success))
+            if not success:
+                self.stats['errors'] += 1
+            if throttled:
+                self.stats['throttled'] += 1
+            if now - self._last_adjust < self.cooldown:
+                return
+            error_rate = self._outcomes.count(False) / len(self._outcomes)
+            if throttled or (len(self._outcomes) >= 5 and error_rate > self.high_error_rate):
+                if self.rate > self.min_rate:
+                    self._set_rate(self.rate * self.decrease, now)
+                    self.stats['slowdowns'] += 1
+                    print(f"🐢 {self.name}: slowing to {self.rate:.2f}/s "
+                          f"({'throttled' if throttled else f'{error_rate:.0%} errors'})")
+                # Judge the new rate on fresh outcomes only
+                self._outcomes.clear()
+            elif (len(self._outcomes) >= self._outcomes.maxlen // 2
+                  and error_rate < self.low_error_rate and self.rate < self.max_rate):
+                self._set_rate(self.rate + self.max_rate * self.increase, now)
+                self.stats['speedups'] += 1
+
+    def summary(self):
+        with self._lock:
+            summary = dict(self.stats, rate=round(self.rate, 3), max_rate=self.max_rate)
+        summary['waited_s'] = round(summary['waited_s'], 2)
+        summary['lowest_rate'] = round(summary['lowest_rate'], 3)
+        return summary
+
+
+def create_limiter(name, rate, burst=1):
+    """AdaptiveRateLimiter for a configured rate per second, or None when rate is 0 (unlimited)"""
+    if not rate:
+        return None
+    return AdaptiveRateLimiter(name, rate, burst)
+
+
+def print_limiter(summary, name):
+    print(f"Rate limit ({name}): now {summary['rate']}/s of {summary['max_rate']}/s max, "
+          f"lowest {summary['lowest_rate']}/s, {summary['slowdowns']} slowdowns, "
+          f"{summary['throttled']} throttled, waited {summary['waited_s']}s")
@@ -0,0 +1,123 @@
+"""
+Retry Policy & Circuit Breaker
+Recover from flaky steps inside the running browser session instead of tearing
+it down: retry a field, reload the page, and back off with jittered exponential
+delays. A circuit breaker shared by all workers pauses submissions when the form
+keeps failing, instead of hammering it.
+"""
+import random
+import threading
+import time
+
+
+class RetryPolicy:
+    """
+    Up to `attempts` tries with exponential backoff and full jitter between them:
+    retry n sleeps uniform(0, min(max_delay, base_delay * 2 ** (n - 1))).
+    """
+
+    def __init__(self, attempts=3, base_delay=0.5, max_delay=8.0, jitter=True):
+        self.attempts = max(1, int(attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Jitter keeps parallel workers from retrying in lockstep
+        self.jitter = jitter
+
+    def delay(self, retry_number):
+        cap = min(self.max_delay, self.base_delay * 2 ** (retry_number - 1))
+        return random.uniform(0, cap) if self.jitter else cap
+
+    def tries(self):
+        """Yield attempt numbers 1..attempts, sleeping the backoff before each retry"""
+        for attempt in range(1, self.attempts + 1):
+            if attempt > 1:
+                time.sleep(self.delay(attempt - 1))
+            yield attempt
+
+    def call(self, func, *args, retry_if=None, retry_on=(Exception,), **kwargs):
+        """
+        Call func until it succeeds. A falsy result or any `retry_on` exception is
+        retried; retry_if(result) -> bool overrides the check on results.
+        The last result is returned (or the last exception re-raised).
+        """
+        retry_if = retry_if or (lambda result: not result)
+        for attempt in self.tries():
+            try:
+                result = func(*args, **kwargs)
+            except retry_on:
+                if attempt == self.attempts:
+                    raise
+                continue
+            if attempt == self.attempts or not retry_if(result):
+                return result
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures across all workers.
+    closed: jobs run normally
+    open: after `failure_threshold` failures in a row, wait() blocks for `reset_timeout`
+    half-open: then a single probe job runs; success closes the circuit, failure reopens it
+    Only the probe's own result (passed back with the token wait() returned) ends the
+    half-open state; jobs that started before the circuit opened can't decide it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        # Token of the probe job running while half-open (None = no probe out)
+        self._probe = None
+        self._cond = threading.Condition()
+
+    def wait(self):
+        """
+        Block until a job may run. Returns a probe token if the job is the half-open
+        probe (else None); pass it to record() with the job's result.
+        """
+        with self._cond:
+            while True:
+                if self.state == self.CLOSED:
+                    break
+                if self.state == self.OPEN:
+                    remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                    if remaining <= 0:
+                        self.state = self.HALF_OPEN
+                        continue
+                    self._cond.wait(remaining)
+                    continue
+                # Half-open: let exactly one probe through at a time
+                if self._probe is None:
+                    self._probe = object()
+                    return self._probe
+                self._cond.wait()
+        return None
+
+    def record(self, success, probe=None):
+        """Record a job's result; `probe` is the token wait() returned for it"""
+        with self._cond:
+            probe = probe is not None and probe is self._probe
+            if probe:
+                self._probe = None
+            elif self.state != self.CLOSED:
+                # Started before the circuit opened: only the probe decides from here
+                return
+            if success:
+                if self.state != self.CLOSED:
+                    print("✓ Form is responding again, resuming submissions")
+                self.state = self.CLOSED
+                self.failures = 0
+            else:
+                self.failures += 1
+                if probe or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                    self.state = self.OPEN
+                    self.opened_at = time.monotonic()
+                    self.trips += 1
+                    print(f"⚠ {self.failures} failures in a row, pausing submissions for "
+                          f"{self.reset_timeout:g}s")
+            self._cond.notify_all()
@@ -0,0 +1,125 @@
+"""
+Screenshot Post-Processing
+Shrinks confirmation screenshots (downscale, colour quantization, re-encode and
+an optional size budget) in a thread or process pool, so browser workers hand
+the file off and move on to the next form instead of compressing it themselves.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from config.config import Config
+from src.profiling import span
+
+FORMATS = {'png': ('PNG', '.png'), 'jpeg': ('JPEG', '.jpg'), 'webp': ('WEBP', '.webp')}
+
+# Never downscale below this width while chasing the size budget
+_MIN_WIDTH = 320
+
+
+def _encode(image, path, fmt, quality):
+    pil_format, _ = FORMATS[fmt]
+    if fmt == 'png':
+        image.save(path, pil_format, optimize=True)
+    else:
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(path, pil_format, quality=quality, optimize=True)
+    return os.path.getsize(path)
+
+
+def optimize_screenshot(path, max_width=0, colors=0, fmt='png', quality=80, max_kb=0,
+                        keep_original=False):
+    """
+    Re-encode one screenshot and return the path of the result.
+    max_width: downscale wider images to this width (0 = keep size)
+    colors: quantize PNGs to this many colours (0 = keep true colour)
+    max_kb: keep shrinking the width by 20% until the file fits (0 = no budget)
+    Module-level (not a method) so it can run in a ProcessPoolExecutor.
+    """
+    # Imported here so runs that never post-process don't pay for Pillow
+    from PIL import Image
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown screenshot format: {fmt} (use {', '.join(FORMATS)})")
+    out_path = os.path.splitext(path)[0] + FORMATS[fmt][1]
+    tmp_path = out_path + '.tmp'
+
+    with Image.open(path) as original:
+        original.load()
+    image = original
+    if max_width and image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)),
+                             Image.LANCZOS)
+
+    while True:
+        encoded = image
+        if fmt == 'png' and colors:
+            encoded = image.convert('RGB').quantize(colors=colors)
+        size = _encode(encoded, tmp_path, fmt, quality)
+        if not max_kb or size <= max_kb * 1024 or image.width <= _MIN_WIDTH:
+            break
+        width = max(_MIN_WIDTH, int(image.width * 0.8))
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+    os.replace(tmp_path, out_path)
+    if out_path != path and not keep_original:
+        os.remove(path)
+    return out_path
+
+
+class ScreenshotProcessor:
+    """Runs optimize_screenshot() for many files in a thread or process pool"""
+
+    def __init__(self, max_width=0, colors=0, fmt='png', quality=80, max_kb=0,
+                 keep_original=False, workers=2, use_processes=False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown screenshot format: {fmt} (use {', '.join(FORMATS)})")
+        self.options = dict(max_width=max_width, colors=colors, fmt=fmt, quality=quality,
+                            max_kb=max_kb, keep_original=keep_original)
+        self.workers = max(1, int(workers))
+        # Processes sidestep the GIL for large batches; threads are cheaper to start
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        return cls(max_width=Config.SCREENSHOT_MAX_WIDTH, colors=Config.SCREENSHOT_COLORS,
+                   fmt=Config.SCREENSHOT_FORMAT, quality=Config.SCREENSHOT_QUALITY,
+                   max_kb=Config.SCREENSHOT_MAX_KB, keep_original=Config.SCREENSHOT_KEEP_ORIGINAL,
+                   workers=Config.SCREENSHOT_WORKERS,
+                   use_processes=Config.SCREENSHOT_POOL == 'process')
+
+    def process(self, path):
+        """Optimize one file and wait for it (in a worker process if use_processes); returns the new path"""
+        if not path or not os.path.exists(path):
+            return path
+        before = os.path.getsize(path)
+        with span('screenshot.optimize'):
+            if self.use_processes:
+                new_path = self.submit(path).result()
+            else:
+                new_path = optimize_screenshot(path, **self.options)
+        print(f"🗜 Screenshot {before // 1024} KB -> {os.path.getsize(new_path) // 1024} KB: "
+              f"{new_path}")
+        return new_path
+
+    def submit(self, path):
+        """Optimize in the background; returns a Future resolving to the new path"""
+        with self._lock:
+            if self._executor is None:
+                pool_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                self._executor = pool_class(self.workers)
+        return self._executor.submit(optimize_screenshot, path, **self.options)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,212 @@
+"""
+Pooled SMTP Connections
+Keeps a few authenticated SMTP connections open so bulk sending pays the
+connect + TLS handshake + login once per connection instead of once per message.
+"""
+import queue
+import smtplib
+import threading
+
+from config.config import Config
+
+# Errors after which a connection is considered dead and is reopened (and the message
+# resent, but only if it never reached the DATA stage)
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+# Reply codes providers use for "slow down" (too many connections / messages, try later)
+THROTTLE_CODES = {421, 450, 451, 452, 454}
+
+
+def is_throttle_error(error):
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code in THROTTLE_CODES
+
+
+class SMTPConnection:
+    """One authenticated SMTP connection that knows how many messages it has sent"""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True, use_ssl=False,
+                 timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.smtp = None
+        self.sent = 0
+        # True once the current message was handed to the server (DATA); a failure after
+        # that point may still have delivered it
+        self.data_started = False
+
+    def connect(self):
+        self.close()
+        if self.use_ssl:
+            self.smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            self.smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                self.smtp.starttls()
+        if self.username and self.password:
+            self.smtp.login(self.username, self.password)
+        self.sent = 0
+        return self
+
+    def send(self, from_addr, to_addrs, message_bytes):
+        """
+        Send one message with explicit MAIL / RCPT / DATA steps (what sendmail() does),
+        so a failure can be told apart by `data_started`. Returns the refused recipients.
+        """
+        if self.smtp is None:
+            self.connect()
+        self.data_started = False
+        smtp = self.smtp
+        smtp.ehlo_or_helo_if_needed()
+        options = [f'size={len(message_bytes)}'] if smtp.has_extn('size') else []
+        code, resp = smtp.mail(from_addr, options)
+        if code != 250:
+            self._abort(code)
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        refused = {}
+        for addr in to_addrs:
+            code, resp = smtp.rcpt(addr)
+            if code not in (250, 251):
+                refused[addr] = (code, resp)
+            if code == 421:
+                self._abort(code)
+                raise smtplib.SMTPRecipientsRefused(refused)
+        if len(refused) == len(to_addrs):
+            self._abort(code)
+            raise smtplib.SMTPRecipientsRefused(refused)
+        self.data_started = True
+        code, resp = smtp.data(message_bytes)
+        if code != 250:
+            self._abort(code)
+            raise smtplib.SMTPDataError(code, resp)
+        self.sent += 1
+        return refused
+
+    def _abort(self, code):
+        """Reset the transaction after a refusal (421 means the server is closing)"""
+        if code == 421:
+            self.smtp.close()
+            self.smtp = None
+            return
+        try:
+            self.smtp.rset()
+        except smtplib.SMTPServerDisconnected:
+            self.smtp.close()
+            self.smtp = None
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                # Already dropped by the server; nothing left to close cleanly
+                pass
+            self.smtp = None
+
+
+class SMTPPool:
+    """
+    Thread-safe pool of persistent SMTP connections.
+    Connections are opened lazily, reopened after `max_messages` sends (providers
+    cap messages per session) and reconnected once if the server dropped them before
+    the message was handed over. A connection lost during or after DATA is reported,
+    not resent: the server may already have accepted the message.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True, use_ssl=False,
+                 size=2, max_messages=100, timeout=30, limiter=None):
+        self.size = max(1, int(size))
+        self.max_messages = max_messages
+        self._settings = dict(host=host, port=port, username=username, password=password,
+                              use_tls=use_tls, use_ssl=use_ssl, timeout=timeout)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.stats = {'sent': 0, 'connects': 0, 'reconnects': 0}
+        # Optional AdaptiveRateLimiter shared by every thread sending through this pool
+        self.limiter = limiter
+
+    @classmethod
+    def from_config(cls, size=None, max_messages=None):
+        """Pool using the MAIL_* settings from Config (rate limited by MAIL_RATE)"""
+        from src.rate_limit import create_limiter
+        return cls(Config.MAIL_SERVER, Config.MAIL_PORT, Config.MAIL_USERNAME,
+                   Config.MAIL_PASSWORD, Config.MAIL_USE_TLS, Config.MAIL_USE_SSL,
+                   size=size or Config.SMTP_POOL_SIZE,
+                   max_messages=max_messages or Config.SMTP_MAX_MESSAGES,
+                   limiter=create_limiter('mail', Config.MAIL_RATE, Config.MAIL_BURST))
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return SMTPConnection(**self._settings)
+        # Every connection is busy: wait for one to come back
+        return self._idle.get()
+
+    def _release(self, conn):
+        self._idle.put(conn)
+
+    def _count_connect(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def send(self, from_addr, to_addrs, message_bytes):
+        """Send one already-rendered message through a pooled connection"""
+        if self.limiter is None:
+            return self._send(from_addr, to_addrs, message_bytes)
+        self.limiter.acquire()
+        try:
+            self._send(from_addr, to_addrs, message_bytes)
+        except Exception as e:
+            self.limiter.record(False, is_throttle_error(e))
+            raise
+        self.limiter.record(True)
+
+    def _send(self, from_addr, to_addrs, message_bytes):
+        conn = self._acquire()
+        try:
+            if conn.smtp is None or (self.max_messages and conn.sent >= self.max_messages):
+                conn.connect()
+                self._count_connect('connects')
+            try:
+                conn.send(from_addr, to_addrs, message_bytes)
+            except _RECONNECT_ERRORS:
+                if conn.data_started:
+                    # Resending could deliver the message twice
+                    raise
+                # Idle connections get dropped by the server (found at MAIL/RCPT);
+                # reopen once and retry
+                conn.connect()
+                self._count_connect('reconnects')
+                conn.send(from_addr, to_addrs, message_bytes)
+            with self._lock:
+                self.stats['sent'] += 1
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            self._release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,334 @@
+"""
+Pre-flight Validation
+Checks and normalizes a whole job file before any worker starts, so rows that
+the form can never accept don't cost a browser session. Rows are read in chunks
+and checked column by column (one pass per column with precompiled patterns),
+then split into a valid file for the batch and a rejected file with the reasons.
+
+Checks come from the form schema (required questions, date questions, choice
+options) plus label-based formats (PREFLIGHT_LABEL_FORMATS), e.g. emails, or
+contact numbers and pin codes where a form opts in.
+Dates are normalized to dd/mm/yyyy, the format every submitter expects.
+"""
+import collections
+import csv
+import json
+import os
+import re
+from datetime import date
+
+from src.batch_runner import ROW_COLUMN, read_rows
+from src.form_fields import FIELD_ALIASES, normalize_label
+from src.profiling import span
+
+# Column of the rejected file explaining why a row was rejected
+ERRORS_COLUMN = '_errors'
+
+# Default "label fragment=format" rules for questions whose format isn't in the schema.
+# Only formats that hold for any form; 'phone' (10 digits, +91) and 'pin' (6 digits)
+# are India-specific and must be opted into, e.g. "contact number=phone,pin code=pin"
+DEFAULT_LABEL_FORMATS = 'email=email,date of birth=date'
+
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+# 10 digits, optionally prefixed with +91 / 91 / 0
+_PHONE_RE = re.compile(r'^(?:\+?91|0)?(\d{10})$')
+_PIN_RE = re.compile(r'^\d{6}$')
+_SEPARATORS_RE = re.compile(r'[\s\-().]')
+# dd/mm/yyyy with /, - or . separators, or ISO yyyy-mm-dd
+_DMY_RE = re.compile(r'^(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{4})$')
+_ISO_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+
+
+def check_email(values):
+    return [(v, None if _EMAIL_RE.match(v) else 'not a valid email address') for v in values]
+
+
+def check_phone(values):
+    out = []
+    for v in values:
+        match = _PHONE_RE.match(_SEPARATORS_RE.sub('', v))
+        out.append((match.group(1), None) if match else (v, 'must be a 10-digit number'))
+    return out
+
+
+def check_pin(values):
+    out = []
+    for v in values:
+        compact = v.replace(' ', '')
+        out.append((compact, None) if _PIN_RE.match(compact) else (v, 'must be 6 digits'))
+    return out
+
+
+def _check_date(value, past_only):
+    match = _DMY_RE.match(value)
+    if match:
+        day, month, year = match.groups()
+    else:
+        match = _ISO_RE.match(value)
+        if not match:
+            return value, 'must be a date like dd/mm/yyyy'
+        year, month, day = match.groups()
+    try:
+        parsed = date(int(year), int(month), int(day))
+    except ValueError:
+        return value, 'is not a real date'
+    if past_only and parsed > date.today():
+        return value, 'is in the future'
+    return parsed.strftime('%d/%m/%Y'), None
+
+
+def check_date(values, past_only=False):
+    return [_check_date(v, past_only) for v in values]
+
+
+def check_options(values, options):
+    canonical = {normalize_label(o): o for o in options}
+    allowed = ', '.join(options)
+    return [(canonical[normalize_label(v)], None) if normalize_label(v) in canonical
+            else (v, f'must be one of: {allowed}') for v in values]
+
+
+FORMAT_CHECKS = {
+    'email': check_email,
+    'phone': check_phone,
+    'pin': check_pin,
+    'date': check_date,
+}
+
+
+def parse_label_formats(text):
+    """'contact number=phone, pin code=pin' -> [(label fragment, format), ...]"""
+    rules = []
+    for item in (text or '').split(','):
+        if not item.strip():
+            continue
+        fragment, _, fmt = item.partition('=')
+        fragment, fmt = normalize_label(fragment), fmt.strip().lower()
+        if not fragment or fmt not in FORMAT_CHECKS:
+            raise ValueError(f"Bad label format rule {item.strip()!r} "
+                             f"(use 'label fragment=format', format one of "
+                             f"{', '.join(FORMAT_CHECKS)})")
+        rules.append((fragment, fmt))
+    return rules
+
+
+class ColumnRule:
+    """How one input column is checked: required or not, plus an optional format check"""
+
+    def __init__(self, column, label, required=False, check=None):
+        self.column = column
+        self.label = label
+        self.required = required
+        self.check = check
+
+    def apply(self, values):
+        """Check a whole column; returns (normalized values, error or None per row)"""
+        present = [i for i, v in enumerate(values) if v]
+        normalized, errors = list(values), [None] * len(values)
+        if self.required:
+            for i, v in enumerate(values):
+                if not v:
+                    errors[i] = 'is required'
+        if self.check and present:
+            # Only non-empty cells go through the format check
+            for i, (value, error) in zip(present, self.check([values[i] for i in present])):
+                normalized[i] = value
+                errors[i] = error
+        return normalized, errors
+
+
+class PreflightValidator:
+    """
+    Builds one ColumnRule per input column from the form schema (may be None,
+    in which case only the label-based formats are checked).
+    label_formats: [(label fragment, format)], see parse_label_formats().
+    """
+
+    def __init__(self, schema=None, label_formats=None):
+        self.schema = schema
+        if label_formats is None:
+            label_formats = parse_label_formats(DEFAULT_LABEL_FORMATS)
+        self.label_formats = label_formats
+        self.rules = {}
+        self.unknown_columns = []
+
+    def _label_format(self, label):
+        key = normalize_label(label)
+        for fragment, fmt in self.label_formats:
+            if fragment in key:
+                return fmt
+        return None
+
+    def rule_for(self, column):
+        label = FIELD_ALIASES.get(column, column)
+        spec = None
+        if self.schema:
+            spec = self.schema.field(label)
+            if spec is None:
+                self.unknown_columns.append(column)
+        fmt = 'date' if spec and spec.type == 'date' else self._label_format(label)
+        check = FORMAT_CHECKS.get(fmt)
+        if fmt == 'date':
+            past_only = 'birth' in normalize_label(label)
+            check = lambda values: check_date(values, past_only)
+        elif spec and spec.options and spec.type in ('radio', 'dropdown'):
+            check = lambda values: check_options(values, spec.options)
+        return ColumnRule(column, spec.label if spec else label,
+                          required=bool(spec and spec.required), check=check)
+
+    def missing_columns(self, columns):
+        """Required questions with no column at all in the input"""
+        if not self.schema:
+            return []
+        # Same matching as the submitters: a column label contained in the question title
+        keys = [normalize_label(FIELD_ALIASES.get(c, c)) for c in columns]
+        return [spec.label for spec in self.schema.fields
+                if spec.required and not any(key and key in normalize_label(spec.label)
+                                             for key in keys)]
+
+    def validate_chunk(self, rows):
+        """
+        Validate a list of (row_number, form_data) pairs.
+        Returns (valid rows, rejected rows); rejected rows carry their errors.
+        """
+        columns = list(dict.fromkeys(k for _, data in rows for k in data))
+        # A required question without a column fails every row the same way
+        missing = [f"{label} is required" for label in self.missing_columns(columns)]
+        errors = [list(missing) for _ in rows]
+        values_by_column = {}
+        for column in columns:
+            rule = self.rules.get(column)
+            if rule is None:
+                rule = self.rules[column] = self.rule_for(column)
+            values, column_errors = rule.apply([data.get(column, '') for _, data in rows])
+            values_by_column[column] = values
+            for i, error in enumerate(column_errors):
+                if error:
+                    errors[i].append(f"{rule.label} {error}")
+        valid, rejected = [], []
+        for i, (row_number, _) in enumerate(rows):
+            data = {column: values_by_column[column][i] for column in columns}
+            if errors[i]:
+                rejected.append((row_number, rows[i][1], errors[i]))
+            else:
+                valid.append((row_number, data))
+        return valid, rejected
+
+
+class _RowWriter:
+    """Writes rows in the input file's format (.csv or .jsonl)"""
+
+    def __init__(self, path, extra_columns=()):
+        self.path = path
+        self.csv = os.path.splitext(path)[1].lower() == '.csv'
+        self.extra_columns = list(extra_columns)
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = None
+
+    def write(self, row):
+        if not self.csv:
+            self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+            return
+        if self._writer is None:
+            fieldnames = self.extra_columns + [k for k in row if k not in self.extra_columns]
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+
+def split_paths(input_path, output_dir=None):
+    """
+    responses.csv -> (responses.valid.csv, responses.rejected.csv), next to the
+    input or in `output_dir`
+    """
+    root, ext = os.path.splitext(input_path)
+    if output_dir:
+        root = os.path.join(output_dir, os.path.basename(root))
+    return f"{root}.valid{ext}", f"{root}.rejected{ext}"
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def preflight(input_path, schema=None, valid_path=None, rejected_path=None, chunk_size=5000,
+              mapping=None, label_formats=None, output_dir=None):
+    """
+    Validate and normalize every row of a CSV/JSONL file, writing valid rows (with
+    a _row column) to `valid_path` and rejected ones (with _row and _errors columns)
+    to `rejected_path`. read_rows() numbers the valid file's rows by _row.
+    With a FieldMapping, rows are mapped to form labels first and written that way.
+    label_formats overrides DEFAULT_LABEL_FORMATS (see parse_label_formats()).
+    Paths not given are split_paths(input_path, output_dir). Returns a summary dict.
+    """
+    default_valid, default_rejected = split_paths(input_path, output_dir)
+    valid_path = valid_path or default_valid
+    rejected_path = rejected_path or default_rejected
+    for path in (valid_path, rejected_path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    validator = PreflightValidator(schema, label_formats)
+    counts = collections.Counter()
+    reasons = collections.Counter()
+    missing = None
+    valid_out = _RowWriter(valid_path, extra_columns=(ROW_COLUMN,))
+    rejected_out = _RowWriter(rejected_path, extra_columns=(ROW_COLUMN, ERRORS_COLUMN))
+    try:
+        with span('preflight', path=input_path):
+            rows = read_rows(input_path)
+            if mapping is not None:
+                rows = mapping.map_rows(rows)
+            for chunk in _chunks(rows, chunk_size):
+                if missing is None:
+                    missing = validator.missing_columns(list(chunk[0][1]))
+                valid, rejected = validator.validate_chunk(chunk)
+                for row_number, data in valid:
+                    valid_out.write(dict({ROW_COLUMN: row_number}, **data))
+                for row_number, data, errors in rejected:
+                    rejected_out.write(dict({ROW_COLUMN: row_number,
+                                             ERRORS_COLUMN: '; '.join(errors)}, **data))
+                    reasons.update(errors)
+                counts['valid'] += len(valid)
+                counts['rejected'] += len(rejected)
+    finally:
+        valid_out.close()
+        rejected_out.close()
+    return {
+        'total': counts['valid'] + counts['rejected'],
+        'valid': counts['valid'],
+        'rejected': counts['rejected'],
+        'valid_path': valid_path,
+        'rejected_path': rejected_path,
+        'missing_columns': missing or [],
+        'unknown_columns': validator.unknown_columns,
+        'top_errors': reasons.most_common(5),
+        'schema': schema is not None,
+    }
+
+
+def print_preflight(summary):
+    print("\n" + "-" * 80)
+    print("PRE-FLIGHT VALIDATION:")
+    print("-" * 80)
+    print(f"Rows: {summary['total']}  ✓ {summary['valid']} valid  ✗ {summary['rejected']} rejected")
+    if not summary['schema']:
+        print("ℹ Form schema unavailable: checked formats only, not required questions")
+    if summary['missing_columns']:
+        print(f"⚠ No column for required question(s): {', '.join(summary['missing_columns'])}")
+    if summary['unknown_columns']:
+        print(f"⚠ Columns that match no form question: {', '.join(summary['unknown_columns'])}")
+    for reason, count in summary['top_errors']:
+        print(f"  {count:>6} × {reason}")
+    print(f"Valid rows: {summary['valid_path']}")
+    if summary['rejected']:
+        print(f"Rejected rows: {summary['rejected_path']}")
+    print("-" * 80)
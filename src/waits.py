@@ -0,0 +1,171 @@
+"""
+Condition-driven waits for Google Form automation
+Replaces fixed time.sleep() pacing with waits on what actually matters
+(value committed, scroll settled, submit outcome known), while keeping
+an optional minimum delay between actions for anti-throttling.
+"""
+import time
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Text Google shows on the default confirmation page
+CONFIRMATION_TEXT = 'Your response has been recorded'
+
+# Signs that Google is rate limiting us (captcha interstitial / "unusual traffic" page)
+THROTTLE_MARKERS = ('unusual traffic', 'g-recaptcha', 'recaptcha/api')
+
+
+class Pacing:
+    """Optional minimum delay between browser actions (0 = as fast as the page allows)"""
+
+    def __init__(self, min_delay=0.0):
+        self.min_delay = max(0.0, float(min_delay))
+        self._last_action = 0.0
+
+    def pause(self):
+        """Sleep only for whatever is left of min_delay since the previous action"""
+        if self.min_delay:
+            remaining = self._last_action + self.min_delay - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+        self._last_action = time.monotonic()
+
+
+def wait_for_value(driver, element, value, timeout=5):
+    """Wait until a field reports the value we typed (date inputs just need to be non-empty)"""
+    expected = str(value)
+
+    def committed(_):
+        current = element.get_attribute('value') or ''
+        if element.get_attribute('type') == 'date':
+            return bool(current)
+        return current == expected
+
+    return WebDriverWait(driver, timeout, poll_frequency=0.05).until(committed)
+
+
+def wait_for_scroll_settled(driver, element=None, timeout=3):
+    """Wait until the element (or the page) stops moving between two polls"""
+    script = (
+        "return arguments[0] ? arguments[0].getBoundingClientRect().top : window.scrollY;"
+    )
+    last = {'pos': None}
+
+    def settled(_):
+        pos = driver.execute_script(script, element)
+        done = last['pos'] is not None and abs(pos - last['pos']) < 1
+        last['pos'] = pos
+        return done
+
+    return WebDriverWait(driver, timeout, poll_frequency=0.05).until(settled)
+
+
+# Outcomes of wait_for_submit_outcome()
+CONFIRMED = 'confirmed'
+INVALID = 'invalid'
+THROTTLED = 'throttled'
+NEXT_SECTION = 'next'
+
+# Collects [[label, message], ...] for questions showing an error. Per-question errors
+# are read from the question's alert text, aria-invalid, or the browser's own
+# constraint validation.
+FIELD_ERRORS_JS = """
+var errors = [];
+var items = document.querySelectorAll("div[role='listitem']");
+for (var i = 0; i < items.length; i++) {
+    var block = items[i];
+    var heading = block.querySelector("[role='heading']");
+    var label = heading ? heading.innerText : (block.innerText || '').split('\\n')[0];
+    var alert = block.querySelector("[role='alert']");
+    var message = alert ? (alert.innerText || '').trim() : '';
+    var field = block.querySelector("input:not([type='hidden']), textarea");
+    if (!message && field) {
+        if (field.getAttribute('aria-invalid') === 'true') {
+            message = 'Invalid answer';
+        } else if (field.willValidate && !field.validity.valid) {
+            message = field.validationMessage || 'Invalid answer';
+        }
+    }
+    if (message) errors.push([label.replace(/\\s*\\*\\s*$/, '').trim(), message]);
+}
+"""
+
+# One probe per poll after clicking Submit. Returns [outcome, [[label, message], ...]]
+# or null while the page is still deciding.
+SUBMIT_OUTCOME_JS = FIELD_ERRORS_JS + """
+if (errors.length) return ['invalid', errors];
+var text = document.body ? document.body.innerText : '';
+if (text.indexOf(arguments[0]) !== -1) return ['confirmed', []];
+if (window.location.href.indexOf('formResponse') !== -1 && !items.length) return ['confirmed', []];
+if (text.toLowerCase().indexOf('unusual traffic') !== -1 ||
+        document.querySelector(".g-recaptcha, iframe[src*='recaptcha/api']")) {
+    return ['throttled', []];
+}
+return null;
+"""
+
+
+def wait_for_submit_outcome(driver, timeout=15):
+    """
+    Wait after clicking Submit until the response is confirmed, the form shows
+    validation errors, or a captcha page appears - whichever comes first.
+    Returns (outcome, errors) with errors as [{'field': label, 'message': text}].
+    Raises TimeoutException if none of them shows up in time.
+    """
+
+    def outcome(d):
+        return d.execute_script(SUBMIT_OUTCOME_JS, CONFIRMATION_TEXT)
+
+    # The probe can hit the page mid-navigation; just poll again
+    status, errors = WebDriverWait(driver, timeout, poll_frequency=0.05,
+                                   ignored_exceptions=(WebDriverException,)).until(outcome)
+    return status, [{'field': field, 'message': message} for field, message in errors]
+
+
+# Flags the current page before Next is clicked, so the probe below can tell
+# the next section's document from the one we just left
+MARK_SECTION_JS = "document.documentElement.setAttribute('data-section-left', '1');"
+
+# One probe per poll after clicking Next: the same page with errors, a captcha,
+# or a new (unflagged, loaded) document holding the next section
+SECTION_OUTCOME_JS = FIELD_ERRORS_JS + """
+if (errors.length) return ['invalid', errors];
+if (document.documentElement.hasAttribute('data-section-left')) return null;
+if (document.readyState !== 'complete') return null;
+var text = document.body ? document.body.innerText : '';
+if (text.toLowerCase().indexOf('unusual traffic') !== -1 ||
+        document.querySelector(".g-recaptcha, iframe[src*='recaptcha/api']")) {
+    return ['throttled', []];
+}
+return ['next', []];
+"""
+
+
+def mark_section(driver):
+    """Flag the current section's page; call right before clicking Next"""
+    driver.execute_script(MARK_SECTION_JS)
+
+
+def wait_for_next_section(driver, timeout=15):
+    """
+    Wait after clicking Next until the next section has loaded, the section shows
+    validation errors, or a captcha page appears. Returns (outcome, errors) like
+    wait_for_submit_outcome(), with outcome NEXT_SECTION, INVALID or THROTTLED.
+    """
+
+    def outcome(d):
+        return d.execute_script(SECTION_OUTCOME_JS)
+
+    status, errors = WebDriverWait(driver, timeout, poll_frequency=0.05,
+                                   ignored_exceptions=(WebDriverException,)).until(outcome)
+    return status, [{'field': field, 'message': message} for field, message in errors]
+
+
+def page_throttled(driver):
+    """True if the current page looks like a captcha or rate-limit interstitial"""
+    try:
+        source = driver.page_source.lower()
+    except Exception:
+        return False
+    return any(marker in source for marker in THROTTLE_MARKERS)
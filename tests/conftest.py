@@ -0,0 +1,12 @@
+import pytest
+
+from config.config import Config
+
+
+@pytest.fixture
+def mail_config(monkeypatch):
+    """Mail settings for building messages without a real account"""
+    monkeypatch.setattr(Config, 'MAIL_USERNAME', 'sender@example.com')
+    monkeypatch.setattr(Config, 'TO_EMAIL', 'to@example.com')
+    monkeypatch.setattr(Config, 'CC_EMAIL', 'cc@example.com')
+    return Config
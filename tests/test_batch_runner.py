@@ -0,0 +1,13 @@
+from src.batch_runner import BatchRunner, RowResult
+
+FORM_URL = 'https://docs.google.com/forms/d/e/test/viewform'
+
+
+def test_failed_rows_are_capped(monkeypatch):
+    monkeypatch.setattr('src.batch_runner.FAILED_ROWS_SAMPLE', 3)
+    runner = BatchRunner(FORM_URL, mode='http')
+    for row_number in range(2, 12):
+        runner.tally(RowResult(row_number, False, error='fill or submit failed'))
+    summary = runner.summary(1.0)
+    assert summary['failed'] == 10
+    assert summary['failed_rows'] == [2, 3, 4]
@@ -0,0 +1,50 @@
+import pytest
+
+from src.form_filler import GoogleFormFiller
+from src.form_schema import FieldSpec, FormSchema, format_date, parse_date
+
+
+def test_parse_date_follows_the_format():
+    assert parse_date('25/12/1990', 'dd/mm/yyyy') == ('25', '12', '1990')
+    assert parse_date('12/25/1990', 'mm/dd/yyyy') == ('25', '12', '1990')
+    assert parse_date('02/29', 'mm/dd hh:mm') == ('29', '02', None)
+    assert format_date(*parse_date('12/25/1990'), 'mm/dd/yyyy') == '12/25/1990'
+
+
+@pytest.mark.parametrize('value', ['25/12/1990', '1990-12-25', '12/25', 'ab/cd/efgh'])
+def test_parse_date_rejects_bad_values(value):
+    with pytest.raises(ValueError):
+        parse_date(value, 'mm/dd/yyyy')
+
+
+class FakeDriver:
+    def __init__(self):
+        self.targets = None
+
+    def execute_script(self, script, targets):
+        self.targets = targets
+        return []
+
+
+def bulk_filler(date_format):
+    """A filler on an already indexed page with one date question"""
+    filler = GoogleFormFiller.__new__(GoogleFormFiller)
+    filler.driver = FakeDriver()
+    filler.schema = FormSchema('https://example.com/form', [
+        FieldSpec('Date of Birth', '1', 'date', format=date_format)], 'hash')
+    filler.field_index = {'date of birth': ('Date of Birth', 'input-element', 'date')}
+    return filler
+
+
+@pytest.mark.parametrize('date_format', ['mm/dd/yyyy', 'dd/mm/yyyy'])
+def test_bulk_fill_converts_dates_in_the_form_format(date_format):
+    filler = bulk_filler(date_format)
+    fields = filler.field_values({'Date of Birth': '25/12/1990'})
+    assert filler.bulk_fill(fields)
+    assert filler.driver.targets == [['input-element', '1990-12-25']]
+
+
+def test_bulk_fill_rejects_unparseable_dates():
+    filler = bulk_filler('mm/dd/yyyy')
+    assert not filler.bulk_fill([('Date of Birth', '1990-12-25')])
+    assert filler.driver.targets is None
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from src.distributed import Coordinator, LeaseClient
+from src.retry import RetryPolicy
+
+FORM_URL = 'https://docs.google.com/forms/d/e/test/viewform'
+
+
+def job_rows(count=4):
+    return [(n, {'Full Name': f'User {n}'}) for n in range(1, count + 1)]
+
+
+def result(row_number, success=True):
+    return {'row': row_number, 'success': success, 'screenshot': f'row{row_number}.png',
+            'error': None if success else 'fill or submit failed'}
+
+
+def test_expired_lease_is_reassigned():
+    coordinator = Coordinator(FORM_URL, job_rows(2), lease_size=2, lease_ttl=0.05)
+    first = coordinator.lease('n1')
+    time.sleep(0.1)
+
+    second = coordinator.lease('n2')
+
+    assert second['rows'] == first['rows']
+    assert coordinator.expired == 1
+    assert coordinator.heartbeat([first['lease'], second['lease']]) == {
+        'lost': [first['lease']], 'revoked': []}
+
+
+def test_late_success_revokes_the_reassigned_row():
+    coordinator = Coordinator(FORM_URL, job_rows(2), lease_size=2, lease_ttl=0.05)
+    first = coordinator.lease('n1')
+    time.sleep(0.1)
+    second = coordinator.lease('n2')
+    coordinator.lease_ttl = 60.0
+
+    # n1 finished row 1 after all: n2 must not submit it again
+    coordinator.report('n1', first['lease'], result(1))
+
+    assert coordinator.heartbeat([second['lease']]) == {'lost': [], 'revoked': [1]}
+    coordinator.report('n2', second['lease'], result(2))
+    summary = coordinator.summary(1.0)
+    assert (summary['total'], summary['succeeded']) == (2, 2)
+    assert coordinator.lease('n3') == {'done': True}
+
+
+@pytest.fixture
+def served():
+    coordinator = Coordinator(FORM_URL, job_rows(), port=0, lease_size=4, lease_ttl=0.3)
+    coordinator.start()
+    client = LeaseClient(coordinator.url, node='worker', retry=RetryPolicy(1))
+    yield coordinator, client
+    client.close()
+    coordinator.stop()
+
+
+def test_worker_stops_holding_revoked_and_expired_rows(served):
+    coordinator, client = served
+    rows = client.rows()
+    assert next(rows)[0] == 1
+    assert client.holds(1)
+
+    # Another node reports row 1 as done: the next heartbeat revokes it here
+    coordinator.report('other', None, result(1))
+    time.sleep(0.25)
+    assert not client.holds(1)
+    assert client.holds(2)
+
+    # The lease expires on the coordinator (say heartbeats were delayed) and its
+    # rows go to another node: the next heartbeat reports it lost
+    for lease in coordinator.leases.values():
+        lease.expires = 0
+    assert [row for row, _ in coordinator.lease('other')['rows']] == [2, 3, 4]
+    time.sleep(0.25)
+    assert not client.holds(3)
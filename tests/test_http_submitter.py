@@ -0,0 +1,66 @@
+import pytest
+
+from benchmarks.replica import FormReplica
+from benchmarks.run import sample_row
+from src.batch_runner import BatchRunner
+from src.form_schema import SchemaCache
+from src.http_submitter import HttpFormSubmitter
+from src.ledger import SUBMITTED, SubmissionLedger, job_key
+
+
+@pytest.fixture(params=[1, 3], ids=['one-section', 'three-sections'])
+def replica(request):
+    with FormReplica(sections=request.param) as replica:
+        yield replica
+
+
+@pytest.fixture
+def submitter(replica, tmp_path):
+    submitter = HttpFormSubmitter(replica.url, schema_cache=SchemaCache(str(tmp_path / 'schema')))
+    assert submitter.setup()
+    yield submitter
+    submitter.close()
+
+
+def test_payload_covers_every_section(replica, submitter):
+    payload = submitter.build_payload(sample_row(1))
+    assert payload['pageHistory'] == ','.join(map(str, range(replica.sections)))
+    assert payload['entry.1001'] == 'Bench User 1'
+    # Date questions go out as parts, from the dd/mm/yyyy input
+    assert (payload['entry.1006_day'], payload['entry.1006_month'],
+            payload['entry.1006_year']) == ('15', '08', '1995')
+
+
+def test_payload_rejects_bad_dates(submitter):
+    with pytest.raises(ValueError):
+        submitter.build_payload(dict(sample_row(1), **{'Date of Birth': '1995-08-15'}))
+
+
+def test_submission_is_accepted(replica, submitter):
+    assert submitter.submit_response(sample_row(1))
+    assert len(replica.submissions) == 1
+    assert replica.rejected == 0
+
+
+def test_incomplete_page_history_is_rejected(replica, submitter, monkeypatch):
+    if replica.sections == 1:
+        pytest.skip('a single-section form has nothing to skip')
+    monkeypatch.setattr(submitter.schema, 'sections', 1)
+    assert not submitter.submit_response(sample_row(1))
+    assert replica.rejected == 1
+    assert submitter.validation_errors()
+
+
+def test_ledger_skips_rows_on_rerun(replica, tmp_path):
+    rows = [(n, sample_row(n)) for n in range(1, 4)]
+    ledger = SubmissionLedger(str(tmp_path / 'ledger.db'))
+    cache = SchemaCache(str(tmp_path / 'schema'))
+
+    first = BatchRunner(replica.url, mode='http', ledger=ledger, schema_cache=cache).run(rows)
+    assert (first['succeeded'], first['skipped']) == (3, 0)
+    assert ledger.get(job_key(replica.url, rows[0][1]))['state'] == SUBMITTED
+
+    second = BatchRunner(replica.url, mode='http', ledger=ledger, schema_cache=cache).run(rows)
+    assert (second['succeeded'], second['skipped']) == (3, 3)
+    assert len(replica.submissions) == 3
+    ledger.close()
@@ -0,0 +1,51 @@
+from src.batch_runner import BatchRunner
+from src.ledger import FILLED, SUBMITTED, SubmissionLedger, job_key
+
+FORM_URL = 'https://docs.google.com/forms/d/e/test/viewform'
+ROW = {'Full Name': 'Ada Lovelace'}
+
+
+class FakeFiller:
+    """Stands in for a GoogleFormFiller / HttpFormSubmitter worker"""
+
+    screenshot_tag = None
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit_response(self, form_data, on_filled=None):
+        if on_filled:
+            on_filled()
+        self.submitted += 1
+        return f'row{self.submitted}.png'
+
+    def was_throttled(self):
+        return False
+
+    def validation_errors(self):
+        return []
+
+
+def submit(ledger, filler, **kwargs):
+    runner = BatchRunner(FORM_URL, mode='http', ledger=ledger, **kwargs)
+    runner.record(runner.submit_row(filler, 0, 2, ROW))
+    return runner.summary(1.0)
+
+
+def test_filled_job_is_held_on_restart(tmp_path):
+    ledger = SubmissionLedger(str(tmp_path / 'ledger.db'))
+    key = job_key(FORM_URL, ROW)
+    ledger.begin(key, FORM_URL, 2)
+    ledger.advance(key, FILLED)  # crashed after the submit click
+    filler = FakeFiller()
+
+    summary = submit(ledger, filler)
+    assert filler.submitted == 0
+    assert (summary['held'], summary['failed']) == (1, 0)
+    assert ledger.get(key)['state'] == FILLED
+
+    summary = submit(ledger, filler, retry_ambiguous=True)
+    assert filler.submitted == 1
+    assert summary['succeeded'] == 1
+    assert ledger.get(key)['state'] == SUBMITTED
+    ledger.close()
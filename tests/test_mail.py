@@ -0,0 +1,83 @@
+import email
+from email import policy
+
+from src.email_sender import EmailSender
+from src.mail_templates import AttachmentCache, message_bytes
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+PDF = b'%PDF-1.4\n' + bytes(range(256)) * 300
+
+
+def attachments(parsed):
+    return {part.get_filename(): part.get_payload(decode=True)
+            for part in parsed.iter_attachments()}
+
+
+def test_message_with_screenshot_and_resume(tmp_path, mail_config):
+    shot, resume = tmp_path / 'shot.png', tmp_path / 'resume.pdf'
+    shot.write_bytes(PNG)
+    resume.write_bytes(PDF)
+    sender = EmailSender(attachment_cache=AttachmentCache())
+
+    msg = sender.build_assignment_message(str(shot), 'https://github.com/x/y', 'Test User',
+                                          resume_path=str(resume))
+
+    parsed = email.message_from_bytes(message_bytes(msg), policy=policy.default)
+    assert parsed.get_content_type() == 'multipart/mixed'
+    assert attachments(parsed) == {'form_confirmation.png': PNG, 'resume.pdf': PDF}
+    assert 'Test User' in parsed.get_body(('plain',)).get_content()
+
+
+def test_message_bytes_matches_as_bytes(tmp_path):
+    # message_bytes() splices cached bodies into the generator's output; it must
+    # produce exactly what the standard library would
+    from email.message import EmailMessage
+    from email.policy import SMTP
+
+    resume = tmp_path / 'resume.pdf'
+    resume.write_bytes(PDF)
+    cache = AttachmentCache()
+    for msg_policy in (policy.default, SMTP):
+        msg = EmailMessage(policy=msg_policy)
+        msg['Subject'] = 'Test'
+        msg.set_content('body\n')
+        msg.add_attachment(PNG, maintype='image', subtype='png', filename='shot.png')
+        msg.attach(cache.part(str(resume), 'application', 'pdf'))
+
+        data = message_bytes(msg)
+
+        assert data == msg.as_bytes()
+        parsed = email.message_from_bytes(data, policy=policy.default)
+        assert attachments(parsed) == {'shot.png': PNG, 'resume.pdf': PDF}
+
+
+def test_cached_part_is_encoded_once(tmp_path):
+    resume = tmp_path / 'resume.pdf'
+    resume.write_bytes(PDF)
+    cache = AttachmentCache()
+
+    first = cache.part(str(resume), 'application', 'pdf')
+    second = cache.part(str(resume), 'application', 'pdf')
+
+    assert first is not second
+    assert first.cached_body is second.cached_body
+    assert cache.summary()['misses'] == 1
+
+
+def test_pooled_send_with_both_attachments(tmp_path, mail_config):
+    from benchmarks.smtp_sink import SMTPSink
+    from src.email_sender import send_assignment_submission
+    from src.smtp_pool import SMTPPool
+
+    shot, resume = tmp_path / 'shot.png', tmp_path / 'resume.pdf'
+    shot.write_bytes(PNG)
+    resume.write_bytes(PDF)
+    sender = EmailSender(attachment_cache=AttachmentCache())
+
+    with SMTPSink() as sink, SMTPPool('127.0.0.1', sink.port, use_tls=False, size=1) as pool:
+        for _ in range(2):
+            assert send_assignment_submission(str(shot), 'https://github.com/x/y', 'Test User',
+                                              resume_path=str(resume), pool=pool, sender=sender)
+    assert (sink.messages, sink.connections) == (2, 1)
+    # Both attachments went out base64-encoded in each message
+    assert sink.bytes > 2 * (len(PNG) + len(PDF)) * 4 / 3
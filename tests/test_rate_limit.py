@@ -0,0 +1,39 @@
+from src.rate_limit import AdaptiveRateLimiter, create_limiter
+
+
+def limiter(**kwargs):
+    # No cooldown, so every record() may adjust the rate
+    return AdaptiveRateLimiter('test', 10.0, cooldown=0.0, window=10, **kwargs)
+
+
+def test_throttling_halves_the_rate_down_to_the_floor():
+    bucket = limiter(min_rate=2.0)
+    bucket.record(False, throttled=True)
+    assert bucket.rate == 5.0
+    for _ in range(5):
+        bucket.record(False, throttled=True)
+    assert bucket.rate == 2.0
+    assert bucket.summary()['slowdowns'] == 3
+
+
+def test_high_error_rate_slows_down():
+    bucket = limiter()
+    for _ in range(4):
+        bucket.record(True)
+    bucket.record(False)
+    bucket.record(False)
+    assert bucket.rate < 10.0
+    assert bucket.stats['errors'] == 2
+
+
+def test_successes_speed_back_up():
+    bucket = limiter()
+    bucket.record(False, throttled=True)
+    for _ in range(10):
+        bucket.record(True)
+    assert 5.0 < bucket.rate <= 10.0
+    assert bucket.stats['speedups'] > 0
+
+
+def test_zero_rate_means_unlimited():
+    assert create_limiter('mail', 0) is None
@@ -0,0 +1,49 @@
+from src.retry import CircuitBreaker
+
+
+def tripped(reset_timeout=0.0):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_breaker_opens_and_probe_closes_it():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    assert breaker.wait() is None
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(False)
+    assert (breaker.state, breaker.trips) == (CircuitBreaker.OPEN, 1)
+
+    probe = breaker.wait()
+    assert probe is not None
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(True, probe)
+    assert (breaker.state, breaker.failures) == (CircuitBreaker.CLOSED, 0)
+
+
+def test_failed_probe_reopens():
+    breaker = tripped()
+    probe = breaker.wait()
+    breaker.record(False, probe)
+    assert (breaker.state, breaker.trips) == (CircuitBreaker.OPEN, 2)
+
+
+def test_only_the_probe_ends_half_open():
+    breaker = tripped()
+    probe = breaker.wait()
+    # Jobs admitted before the circuit opened finish while the probe is out
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker._probe is probe
+    breaker.record(True, probe)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stale_results_do_not_reset_an_open_circuit():
+    breaker = tripped(reset_timeout=60.0)
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,39 @@
+import smtplib
+
+import pytest
+
+from benchmarks.smtp_sink import SMTPSink
+from src.smtp_pool import SMTPPool
+
+MESSAGE = b'Subject: test\r\n\r\nhello\r\n'
+
+
+@pytest.fixture
+def sink():
+    with SMTPSink() as sink:
+        yield sink
+
+
+def pool_for(sink):
+    return SMTPPool('127.0.0.1', sink.port, use_tls=False, size=1, timeout=5)
+
+
+def test_dropped_connection_before_data_is_resent(sink):
+    with pool_for(sink) as pool:
+        pool.send('a@example.com', ['b@example.com'], MESSAGE)
+        sink.drop = 'MAIL'
+        pool.send('a@example.com', ['b@example.com'], MESSAGE)
+    assert sink.messages == 2
+    assert pool.stats['reconnects'] == 1
+
+
+def test_dropped_connection_after_data_is_not_resent(sink):
+    with pool_for(sink) as pool:
+        sink.drop = 'DATA'
+        with pytest.raises(smtplib.SMTPServerDisconnected):
+            pool.send('a@example.com', ['b@example.com'], MESSAGE)
+        assert sink.messages == 1
+        assert pool.stats['reconnects'] == 0
+        # The pool recovers for the next message
+        pool.send('a@example.com', ['b@example.com'], MESSAGE)
+    assert sink.messages == 2
@@ -0,0 +1,24 @@
+import csv
+
+from src.form_schema import FieldSpec, FormSchema
+from src.validation import preflight
+
+
+def test_preflight_writes_split_files_to_the_output_dir(tmp_path):
+    inputs, output = tmp_path / 'in', tmp_path / 'out'
+    inputs.mkdir()
+    job = inputs / 'responses.csv'
+    job.write_text('Full Name,Date of Birth\nAda,25/12/1990\n,31/02/1990\n')
+    schema = FormSchema('https://example.com/form', [
+        FieldSpec('Full Name', '1', 'text', required=True),
+        FieldSpec('Date of Birth', '2', 'date', format='mm/dd/yyyy')], 'hash')
+
+    summary = preflight(str(job), schema, output_dir=str(output))
+
+    assert (summary['valid'], summary['rejected']) == (1, 1)
+    assert sorted(p.name for p in inputs.iterdir()) == ['responses.csv']
+    assert summary['valid_path'] == str(output / 'responses.valid.csv')
+    with open(summary['rejected_path'], newline='') as f:
+        rejected = list(csv.DictReader(f))
+    assert rejected[0]['_row'] == '2'
+    assert 'Full Name' in rejected[0]['_errors']